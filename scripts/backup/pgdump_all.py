@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Dump the Postgres databases of the stack for the weekly backup.
+
+The databases are dumped concurrently (at most ``PGDUMP_PARALLELISM`` at a
+time), so the dump stage lasts as long as the slowest database rather than
+the sum of all of them. Each dump is compressed by ``pigz`` (multi-threaded
+gzip, same ``.sql.gz`` format as before) and its SHA-256 is computed while
+the compressed stream is written, so the archive is never read back.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_PARALLELISM = 3
+
+
+class DumpError(Exception):
+    """A database could not be dumped."""
+
+
+@dataclass(frozen=True)
+class Dump:
+    """One database to dump: the whole cluster (globals included) or one database."""
+
+    container: str
+    name: str
+    whole_cluster: bool
+
+    def command(self) -> list[str]:
+        # Expanded by the container's shell, from the container's own environment.
+        if self.whole_cluster:
+            dump = 'pg_dumpall -U "${POSTGRES_USER:-postgres}"'
+        else:
+            dump = 'pg_dump -U "${POSTGRES_USER:-postgres}" "${POSTGRES_DB:-postgres}"'
+        return ["docker", "exec", self.container, "sh", "-c", dump]
+
+
+DUMPS = (
+    Dump("authentik-postgresql", "authentik-postgresql", whole_cluster=True),
+    Dump("infisical-db", "infisical-db", whole_cluster=True),
+    Dump("jellystat-db", "jellystat-db", whole_cluster=False),
+)
+
+
+def running_containers() -> set[str]:
+    """Return the names of the running containers.
+
+    Raises:
+        DumpError: if docker cannot be queried.
+    """
+    try:
+        result = subprocess.run(
+            ["docker", "ps", "--format", "{{.Names}}"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise DumpError(f"Cannot list running containers: {e}") from e
+    return set(result.stdout.split())
+
+
+def compressor(threads: int) -> list[str]:
+    """Gzip command reading stdin, multi-threaded when pigz is installed."""
+    if shutil.which("pigz"):
+        return ["pigz", "-c", "-p", str(threads)]
+    logger.warning("pigz not found, compressing with single-threaded gzip")
+    return ["gzip", "-c"]
+
+
+def dump(job: Dump, output_dir: Path, timestamp: str, compress: list[str]) -> Path:
+    """Stream one dump through the compressor into ``output_dir``, hashing as it is written.
+
+    The archive and its ``.sha256`` only appear once the dump has succeeded.
+
+    Raises:
+        DumpError: if pg_dump, the compressor or the write fails.
+    """
+    out = output_dir / f"{job.name}-{timestamp}.sql.gz"
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_name = tempfile.mkstemp(dir=output_dir, prefix=f".{out.name}.", suffix=".tmp")
+    processes: list[subprocess.Popen[bytes]] = []
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            dump_process = subprocess.Popen(job.command(), stdout=subprocess.PIPE)
+            processes.append(dump_process)
+            assert dump_process.stdout is not None
+            compress_process = subprocess.Popen(
+                compress, stdin=dump_process.stdout, stdout=subprocess.PIPE
+            )
+            processes.append(compress_process)
+            assert compress_process.stdout is not None
+            # The compressor owns the pipe now; closing our end lets it see EOF.
+            dump_process.stdout.close()
+
+            while chunk := compress_process.stdout.read(CHUNK_SIZE):
+                digest.update(chunk)
+                handle.write(chunk)
+                size += len(chunk)
+            compress_process.stdout.close()
+
+            for step, process in zip(("dump", compress[0]), processes, strict=True):
+                if process.wait() != 0:
+                    raise DumpError(f"{job.container}: {step} exited with {process.returncode}")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, out)
+    except OSError as e:
+        raise DumpError(f"{job.container}: {e}") from e
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        Path(tmp_name).unlink(missing_ok=True)
+
+    # Same line as `sha256sum "$out"`, so `sha256sum -c` keeps working.
+    Path(f"{out}.sha256").write_text(f"{digest.hexdigest()}  {out}\n")
+    logger.info(
+        "Dumped %s: %.1f MiB in %.1fs",
+        job.container,
+        size / 1024 / 1024,
+        time.perf_counter() - start,
+    )
+    return out
+
+
+def dump_all(
+    jobs: tuple[Dump, ...], output_dir: Path, timestamp: str, parallelism: int
+) -> list[str]:
+    """Run the dumps concurrently and return the errors, empty when all succeeded."""
+    # Share the cores between the compressors running at the same time.
+    threads = max(1, (os.cpu_count() or 1) // max(1, min(parallelism, len(jobs))))
+    compress = compressor(threads)
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        futures = {
+            job.container: pool.submit(dump, job, output_dir, timestamp, compress) for job in jobs
+        }
+        for container, future in futures.items():
+            try:
+                future.result()
+            except DumpError as e:
+                errors.append(str(e))
+            except Exception as e:
+                errors.append(f"{container}: {e}")
+    return errors
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=int(os.environ.get("PGDUMP_PARALLELISM", DEFAULT_PARALLELISM)),
+        help=f"databases dumped at the same time (default: {DEFAULT_PARALLELISM})",
+    )
+    args = parser.parse_args(argv)
+    if args.parallelism < 1:
+        parser.error("--parallelism must be at least 1")
+    return args
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    output_dir = os.environ.get("BACKUP_OUTPUT_DIR")
+    timestamp = os.environ.get("BACKUP_TIMESTAMP")
+    if not output_dir or not timestamp:
+        logger.error("BACKUP_OUTPUT_DIR and BACKUP_TIMESTAMP are required")
+        sys.exit(1)
+
+    postgres_dir = Path(output_dir) / "postgres"
+    postgres_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        running = running_containers()
+    except DumpError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+    missing = [job.container for job in DUMPS if job.container not in running]
+    if missing:
+        for container in missing:
+            logger.error("Container not running: %s", container)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    errors = dump_all(DUMPS, postgres_dir, timestamp, args.parallelism)
+    for error in errors:
+        logger.error("%s", error)
+    if errors:
+        sys.exit(1)
+    logger.info("Dumped %d databases in %.1fs", len(DUMPS), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,7 @@ export BACKUP_OUTPUT_DIR="$STAGING_DIR"
 export RESTIC_REPOSITORY
 export RESTIC_PASSWORD
 
-"$SCRIPT_DIR/pgdump-all.sh"
+python3 "$SCRIPT_DIR/pgdump_all.py"
 "$SCRIPT_DIR/export-infisical-secrets.sh"
 
 if ! restic snapshots >/dev/null 2>&1; then
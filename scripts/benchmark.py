@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Benchmark the compose tools on synthetic repositories of 100 to 10k stacks.
+
+Each tool is timed end to end in its own process, with its peak RSS, and the
+shared pipeline is timed phase by phase (discovery, parse, rules,
+cross-stack checks, write). Results can be saved as a JSON baseline and
+compared against one; a regression makes the comparison fail.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any
+
+from compose_lib.discovery import discover_compose_files
+from compose_lib.document import DocumentStore, write_document
+from compose_lib.engine import RuleEngine
+from compose_lib.index import build_index, conflict_findings
+from compose_lib.rules import EXTERNAL_NETWORKS_FIXER, KEY_ORDER_FIXER
+from compose_lib.synthetic import generate_repo
+from compose_lib.traefik import build_graph, collect_routes, graph_findings
+from compose_lib.yaml_backend import YAML_BACKEND
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BASELINE_VERSION = 1
+DEFAULT_SIZES = (100, 1000, 10000)
+
+# Tools timed end to end, with the arguments that make runs comparable.
+TOOLS: dict[str, list[str]] = {
+    "validate_all": ["validate_all.py", "--no-cache"],
+    "check_compose_order": ["check_compose_order.py"],
+    "fix_compose_order": ["fix_compose_order.py"],
+    "update_networks": ["update_networks.py"],
+}
+# Tools that, like pre-commit hooks, take the compose files as arguments.
+FILE_ARGUMENT_TOOLS = {"check_compose_order"}
+
+# Differences below these floors are noise, whatever the relative change.
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_MB_DELTA = 5.0
+
+
+def _rss_mb(maxrss: int) -> float:
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# --- Measurements -------------------------------------------------------------
+
+
+def run_tool(name: str, root: Path, files: list[Path]) -> dict[str, float]:
+    """Run one tool on a repository and return its wall time and peak RSS."""
+    command = [sys.executable, str(SCRIPTS_DIR / TOOLS[name][0]), *TOOLS[name][1:]]
+    if name in FILE_ARGUMENT_TOOLS:
+        command += [str(path.relative_to(root)) for path in files]
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # wait4 reports the rusage of this child only, unlike RUSAGE_CHILDREN.
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    # Findings make some tools exit non-zero; only the cost matters here.
+    process.returncode = os.waitstatus_to_exitcode(status)
+    logger.debug("%s exited with %d", name, process.returncode)
+    return {"seconds": seconds, "peak_rss_mb": _rss_mb(usage.ru_maxrss)}
+
+
+def measure_phases(root: Path) -> dict[str, float]:
+    """Time the shared pipeline phase by phase; runs in a fresh worker process."""
+    os.chdir(root)
+    # The fixers log every file they change, which would drown the report.
+    logging.getLogger().setLevel(logging.WARNING)
+    timings: dict[str, float] = {}
+
+    start = time.perf_counter()
+    compose_files = discover_compose_files()
+    timings["discovery"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = DocumentStore()
+    for filepath in compose_files:
+        store.load(filepath)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = RuleEngine()
+    for filepath in compose_files:
+        engine.check(store.load(filepath))
+    timings["rules"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    conflict_findings(build_index(compose_files, store))
+    graph_findings(build_graph(collect_routes(compose_files, store)))
+    timings["cross_stack"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fixer = RuleEngine(rules=(), fixers=[KEY_ORDER_FIXER, EXTERNAL_NETWORKS_FIXER])
+    for filepath in compose_files:
+        document = store.load(filepath)
+        if not document.is_infrastructure and fixer.fix(document):
+            write_document(document)
+    timings["write"] = time.perf_counter() - start
+
+    timings["peak_rss_mb"] = _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return timings
+
+
+def benchmark(sizes: list[int], workdir: Path, tools: list[str], seed: int) -> dict[str, float]:
+    """Benchmark every size and return flat ``size/what/metric`` measurements."""
+    metrics: dict[str, float] = {}
+    context = get_context("spawn")
+
+    for size in sizes:
+        root = workdir / f"repo-{size}"
+
+        generate_repo(root, size, seed)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            phases = executor.submit(measure_phases, root).result()
+        for phase, value in phases.items():
+            if phase == "peak_rss_mb":
+                metrics[f"{size}/phases/peak_rss_mb"] = value
+            else:
+                metrics[f"{size}/phase:{phase}/seconds"] = value
+
+        for name in tools:
+            # Fixers rewrite the tree: every tool starts from the same files.
+            files = generate_repo(root, size, seed)
+            for metric, value in run_tool(name, root, files).items():
+                metrics[f"{size}/{name}/{metric}"] = value
+
+        logger.info("Benchmarked %d stacks", size)
+
+    return metrics
+
+
+# --- Baselines ----------------------------------------------------------------
+
+
+def compare(baseline: dict[str, float], current: dict[str, float], tolerance: float) -> list[str]:
+    """Return the metrics that got worse than the baseline by more than ``tolerance``."""
+    regressions = []
+    for key, value in current.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        floor = MIN_RSS_MB_DELTA if key.endswith("_mb") else MIN_SECONDS_DELTA
+        if value > previous * (1 + tolerance) and value - previous > floor:
+            change = (value - previous) / previous * 100 if previous else float("inf")
+            regressions.append(f"{key}: {previous:.3f} -> {value:.3f} (+{change:.0f}%)")
+    return regressions
+
+
+def print_table(metrics: dict[str, float], baseline: dict[str, float] | None) -> None:
+    """Print the measurements, with the baseline value when there is one."""
+    width = max((len(key) for key in metrics), default=0)
+    for key, value in metrics.items():
+        line = f"{key:<{width}}  {value:>10.3f}"
+        previous = baseline.get(key) if baseline else None
+        if previous:
+            line += f"  (baseline {previous:.3f}, {(value - previous) / previous * 100:+.0f}%)"
+        print(line)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=list(DEFAULT_SIZES),
+        help="comma-separated numbers of stacks to generate (default: 100,1000,10000)",
+    )
+    parser.add_argument(
+        "--tools",
+        type=lambda value: value.split(","),
+        default=list(TOOLS),
+        help=f"comma-separated tools to run end to end (default: {','.join(TOOLS)})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (default: 0)")
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        help="where to generate the repositories (default: a temporary directory)",
+    )
+    parser.add_argument("--save", type=Path, metavar="FILE", help="write results as a baseline")
+    parser.add_argument(
+        "--compare", type=Path, metavar="FILE", help="fail if results regress from this baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown or memory growth (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.tools) - set(TOOLS))
+    if unknown:
+        parser.error(f"unknown tools: {', '.join(unknown)}")
+    return args
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+
+    baseline = None
+    if args.compare is not None:
+        try:
+            baseline = json.loads(args.compare.read_text())["metrics"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Cannot read baseline %s: %s", args.compare, e)
+            sys.exit(1)
+
+    logger.info("YAML backend: %s", YAML_BACKEND)
+    if args.workdir is not None:
+        metrics = benchmark(args.sizes, args.workdir, args.tools, args.seed)
+    else:
+        with tempfile.TemporaryDirectory(prefix="compose-bench-") as tmp:
+            metrics = benchmark(args.sizes, Path(tmp), args.tools, args.seed)
+
+    print_table(metrics, baseline)
+
+    if args.save is not None:
+        results: dict[str, Any] = {
+            "version": BASELINE_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "yaml_backend": YAML_BACKEND,
+            "seed": args.seed,
+            "metrics": metrics,
+        }
+        args.save.write_text(json.dumps(results, indent=2) + "\n")
+        logger.info("Baseline written to %s", args.save)
+
+    if baseline is not None:
+        regressions = compare(baseline, metrics, args.tolerance)
+        for regression in regressions:
+            logger.error("Regression: %s", regression)
+        if regressions:
+            sys.exit(1)
+        logger.info("No regression against %s", args.compare)
+
+
+if __name__ == "__main__":
+    main()
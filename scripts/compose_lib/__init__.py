@@ -0,0 +1,17 @@
+"""Shared helpers for the Docker Compose maintenance scripts."""
+
+from compose_lib.document import ComposeDocument, DocumentStore, load_document
+from compose_lib.engine import FileResult, RuleEngine
+from compose_lib.rules import DEFAULT_RULES, Finding, FixRule, Rule
+
+__all__ = [
+    "DEFAULT_RULES",
+    "ComposeDocument",
+    "DocumentStore",
+    "FileResult",
+    "Finding",
+    "FixRule",
+    "Rule",
+    "RuleEngine",
+    "load_document",
+]
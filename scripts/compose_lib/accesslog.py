@@ -0,0 +1,390 @@
+"""Incremental Traefik access-log statistics per router and per service.
+
+The log is memory-mapped and read from the offset reached by the previous
+run, in batches of whole lines, so each run only parses what Traefik wrote
+since; a line still being written is left for the next run. Lines are in
+Traefik's ``json`` or ``common`` (CLF) format. Latency and response size are
+kept in mergeable log-bucketed sketches (relative error under 1%), whose
+state is saved along with the offset. A log that shrank or was replaced is
+read again from the start.
+
+Router and service names (``komga-secure@docker``) are resolved to the
+compose service carrying the labels that define them.
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import re
+from collections import defaultdict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from compose_lib.document import write_atomic
+from compose_lib.index import ServiceRef
+from compose_lib.traefik import TraefikGraph
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_FILE = Path("/var/log/traefik/access.log")
+DEFAULT_STATE_FILE = Path(".cache/compose_lib/accesslog.json")
+LOG_FILE_ENV = "TRAEFIK_ACCESSLOG_FILEPATH"
+LOG_FORMAT_ENV = "TRAEFIK_ACCESSLOG_FORMAT"
+FORMATS = ("auto", "json", "common")
+STATE_VERSION = 1
+# Bytes of log parsed at once; a batch always ends on a line boundary.
+BATCH_BYTES = 4 * 1024**2
+SKETCH_ACCURACY = 0.01
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Traefik's CLF line ends with: "<router>" "<server URL>" <duration>ms
+_COMMON = re.compile(
+    rb'^\S+ \S+ \S+ \[[^\]]*\] "[^"]*" (\d{3}|-) (\d+|-) "[^"]*" "[^"]*" \d+ '
+    rb'"([^"]*)" "([^"]*)" (\d+)ms$'
+)
+
+
+class QuantileSketch:
+    """Streaming quantiles of positive values with a bounded relative error.
+
+    Values fall in logarithmic buckets ``(gamma**(i-1), gamma**i]``; a
+    quantile is read back within ``accuracy`` of the true value. Sketches of
+    the same accuracy merge exactly, so runs can be added up.
+    """
+
+    def __init__(self, accuracy: float = SKETCH_ACCURACY) -> None:
+        self.accuracy = accuracy
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.count = 0
+        self.total = 0.0
+        self.zeros = 0
+        self.buckets: dict[int, int] = defaultdict(int)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value <= 0:
+            self.zeros += 1
+            return
+        self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches of different accuracy")
+        self.count += other.count
+        self.total += other.total
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] += count
+
+    def quantile(self, q: float) -> float | None:
+        """Return the ``q`` quantile (0 to 1), or None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self._gamma**index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "accuracy": self.accuracy,
+            "count": self.count,
+            "total": self.total,
+            "zeros": self.zeros,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["accuracy"])
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.zeros = data["zeros"]
+        sketch.buckets.update({int(index): count for index, count in data["buckets"].items()})
+        return sketch
+
+
+@dataclass(frozen=True)
+class Request:
+    """The fields of one access-log line the statistics use."""
+
+    router: str | None
+    service: str | None
+    status: int | None
+    # Milliseconds from Traefik receiving the request to the end of the response.
+    duration: float
+    size: int
+
+
+def parse_json(line: bytes) -> Request | None:
+    """Read one line of Traefik's ``json`` format, None if it is not one."""
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return _json_request(entry) if isinstance(entry, dict) else None
+
+
+def _json_request(entry: dict[str, Any]) -> Request | None:
+    duration = entry.get("Duration")
+    if not isinstance(duration, (int, float)):
+        return None
+    status = entry.get("DownstreamStatus")
+    size = entry.get("DownstreamContentSize")
+    return Request(
+        entry.get("RouterName") or None,
+        entry.get("ServiceName") or None,
+        status if isinstance(status, int) else None,
+        # Traefik logs durations in nanoseconds.
+        duration / 1e6,
+        size if isinstance(size, int) else 0,
+    )
+
+
+def parse_common(line: bytes) -> Request | None:
+    """Read one line of Traefik's ``common`` format, None if it is not one.
+
+    CLF has no service name, only the URL of the server that answered.
+    """
+    match = _COMMON.match(line.rstrip(b"\r"))
+    if match is None:
+        return None
+    status, size, router, _, duration = match.groups()
+    return Request(
+        router.decode(errors="replace") if router not in (b"", b"-") else None,
+        None,
+        int(status) if status != b"-" else None,
+        float(duration),
+        int(size) if size != b"-" else 0,
+    )
+
+
+def parse_batch(lines: list[bytes], log_format: str = "auto") -> tuple[list[Request], int]:
+    """Parse a batch of lines; return the requests and the number of unreadable lines.
+
+    JSON lines are decoded together, with one ``json.loads`` call for the
+    whole batch; a batch holding a broken line is parsed again line by line.
+    """
+    lines = [line for line in lines if line.strip()]
+    if log_format == "auto":
+        json_lines = [line for line in lines if line.lstrip().startswith(b"{")]
+        common_lines = [line for line in lines if not line.lstrip().startswith(b"{")]
+    elif log_format == "json":
+        json_lines, common_lines = lines, []
+    else:
+        json_lines, common_lines = [], lines
+
+    parsed: list[Request | None] = []
+    if json_lines:
+        try:
+            entries = json.loads(b"[" + b",".join(json_lines) + b"]")
+            parsed += [_json_request(e) if isinstance(e, dict) else None for e in entries]
+        except ValueError:
+            parsed += [parse_json(line) for line in json_lines]
+    parsed += [parse_common(line) for line in common_lines]
+
+    requests = [request for request in parsed if request is not None]
+    return requests, len(parsed) - len(requests)
+
+
+def read_batches(
+    path: Path, offset: int, batch_bytes: int = BATCH_BYTES
+) -> Iterator[tuple[list[bytes], int]]:
+    """Yield the complete lines after ``offset`` in batches, with the offset after each.
+
+    Raises:
+        OSError: if the log cannot be read.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= offset:
+            return
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+            position = offset
+            while position < size:
+                end = mapped.rfind(b"\n", position, min(position + batch_bytes, size))
+                if end < 0:
+                    # A line longer than a batch: take it whole.
+                    end = mapped.find(b"\n", position + batch_bytes, size)
+                if end < 0:
+                    # Traefik is still writing the last line.
+                    return
+                yield mapped[position:end].split(b"\n"), end + 1
+                position = end + 1
+
+
+@dataclass
+class RouteStats:
+    """Requests, latency and response size seen for one router or service."""
+
+    latency: QuantileSketch = field(default_factory=QuantileSketch)
+    size: QuantileSketch = field(default_factory=QuantileSketch)
+    server_errors: int = 0
+
+    def add(self, request: Request) -> None:
+        self.latency.add(request.duration)
+        self.size.add(request.size)
+        if request.status is not None and request.status >= 500:
+            self.server_errors += 1
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "latency": self.latency.to_json(),
+            "size": self.size.to_json(),
+            "server_errors": self.server_errors,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "RouteStats":
+        return cls(
+            QuantileSketch.from_json(data["latency"]),
+            QuantileSketch.from_json(data["size"]),
+            data["server_errors"],
+        )
+
+
+@dataclass
+class LogState:
+    """How far a log was read, and the statistics of everything read so far."""
+
+    inode: int | None = None
+    offset: int = 0
+    lines: int = 0
+    unreadable: int = 0
+    routers: dict[str, RouteStats] = field(default_factory=lambda: defaultdict(RouteStats))
+    services: dict[str, RouteStats] = field(default_factory=lambda: defaultdict(RouteStats))
+
+    def add(self, request: Request) -> None:
+        self.routers[request.router or "-"].add(request)
+        if request.service is not None:
+            self.services[request.service].add(request)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "inode": self.inode,
+            "offset": self.offset,
+            "lines": self.lines,
+            "unreadable": self.unreadable,
+            "routers": {name: stats.to_json() for name, stats in self.routers.items()},
+            "services": {name: stats.to_json() for name, stats in self.services.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "LogState":
+        state = cls(data["inode"], data["offset"], data["lines"], data["unreadable"])
+        for name, stats in data["routers"].items():
+            state.routers[name] = RouteStats.from_json(stats)
+        for name, stats in data["services"].items():
+            state.services[name] = RouteStats.from_json(stats)
+        return state
+
+
+def load_state(state_file: Path, log: Path) -> LogState:
+    """Return the saved state of a log, or a fresh one if there is none."""
+    try:
+        data = json.loads(state_file.read_text())
+        if data.get("version") == STATE_VERSION:
+            return LogState.from_json(data["logs"][str(log)])
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning("Ignoring unreadable state %s: %s", state_file, e)
+    return LogState()
+
+
+def save_state(state_file: Path, log: Path, state: LogState) -> None:
+    """Save the state of a log, keeping those of the other logs.
+
+    Raises:
+        OSError: if the state file cannot be written.
+    """
+    logs: dict[str, Any] = {}
+    try:
+        data = json.loads(state_file.read_text())
+        if data.get("version") == STATE_VERSION and isinstance(data.get("logs"), dict):
+            logs = data["logs"]
+    except (OSError, ValueError, AttributeError):
+        pass
+    logs[str(log)] = state.to_json()
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(state_file, json.dumps({"version": STATE_VERSION, "logs": logs}))
+
+
+def update(state: LogState, log: Path, log_format: str = "auto") -> tuple[int, int]:
+    """Add the lines written to ``log`` since the saved offset.
+
+    Returns the number of lines read and of lines that could not be parsed
+    by this call; ``state`` keeps the running totals.
+
+    Raises:
+        OSError: if the log cannot be read.
+    """
+    stat = log.stat()
+    if state.inode is not None and (stat.st_ino != state.inode or stat.st_size < state.offset):
+        logger.info("%s was rotated, reading it from the start", log)
+        state.offset = 0
+    state.inode = stat.st_ino
+
+    read = failed = 0
+    for lines, offset in read_batches(log, state.offset):
+        requests, unreadable = parse_batch(lines, log_format)
+        for request in requests:
+            state.add(request)
+        failed += unreadable
+        read += len(requests) + unreadable
+        state.offset = offset
+    state.lines += read
+    state.unreadable += failed
+    return read, failed
+
+
+@dataclass(frozen=True)
+class Owner:
+    """Where a router or service name seen in the log is defined."""
+
+    refs: tuple[ServiceRef, ...]
+    # Set for names not defined by compose labels: file provider, internal...
+    provider: str | None = None
+
+    def __str__(self) -> str:
+        if self.refs:
+            return ", ".join(str(ref) for ref in self.refs)
+        return f"({self.provider})" if self.provider else "(unknown)"
+
+
+def resolve(name: str, graph: TraefikGraph, by: str = "router") -> Owner:
+    """Find the compose services whose labels define a router or a service name."""
+    base, _, provider = name.partition("@")
+    if provider not in ("", "docker"):
+        return Owner((), provider)
+    if by == "router":
+        refs = {ref for ref, router in graph.routers if router.name == base}
+    else:
+        refs = {
+            ref
+            for (_, lb_name), found in graph.services.items()
+            if lb_name == base
+            for ref, _ in found
+        }
+    return Owner(tuple(sorted(refs)))
+
+
+def summary(stats: RouteStats) -> dict[str, Any]:
+    """Requests, server errors and percentiles of latency (ms) and size (bytes)."""
+    return {
+        "requests": stats.latency.count,
+        "server_errors": stats.server_errors,
+        "latency_ms": {f"p{round(q * 100)}": stats.latency.quantile(q) for q in PERCENTILES},
+        "bytes": {f"p{round(q * 100)}": stats.size.quantile(q) for q in PERCENTILES},
+    }
@@ -0,0 +1,234 @@
+"""Persistent validation result cache keyed by file content hash."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import astuple
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from compose_lib.infrastructure import load_infrastructure
+from compose_lib.policy import POLICY
+from compose_lib.rules import Finding
+from compose_lib.yaml_backend import safe_load
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FILE = Path(".cache/compose_lib/results.json")
+DEFAULT_MAX_ENTRIES = 4096
+CACHE_VERSION = 2
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+def content_key(filepath: Path, data: bytes) -> str:
+    """Build the cache key for a file: its path plus the hash of its bytes."""
+    return f"{filepath.as_posix()}:{hashlib.sha256(data).hexdigest()}"
+
+
+def _extends_targets(filepath: Path, data: bytes, cache: "JsonCache") -> list[Path]:
+    # A file's targets only depend on its content: remember them to skip parsing it.
+    key = f"extends:{content_key(filepath, data)}"
+    targets = cache.get_value(key)
+    if targets is None:
+        try:
+            content = safe_load(data.decode())
+        except (UnicodeDecodeError, yaml.YAMLError):
+            content = None
+        services = content.get("services") if isinstance(content, dict) else None
+        found = set()
+        for service in services.values() if isinstance(services, dict) else ():
+            extends = service.get("extends") if isinstance(service, dict) else None
+            if isinstance(extends, dict) and isinstance(extends.get("file"), str):
+                found.add((filepath.parent / extends["file"]).as_posix())
+        targets = sorted(found)
+        cache.put_value(key, targets)
+    return [Path(target) for target in targets]
+
+
+def dependency_key(filepath: Path, data: bytes, cache: "JsonCache") -> str:
+    """Build the cache key for what a file yields once ``extends`` is applied.
+
+    Like :func:`content_key`, but the hash also covers every file it
+    extends, transitively, so editing a base file invalidates its users.
+    """
+    digest = hashlib.sha256(data)
+    seen = {filepath.resolve()}
+    pending = [(filepath, data)]
+    while pending:
+        path, content = pending.pop()
+        for target in _extends_targets(path, content, cache):
+            if target.resolve() in seen:
+                continue
+            seen.add(target.resolve())
+            digest.update(target.as_posix().encode())
+            try:
+                target_data = target.read_bytes()
+            except OSError:
+                digest.update(b"<missing>")
+                continue
+            digest.update(hashlib.sha256(target_data).digest())
+            pending.append((target, target_data))
+    return f"{filepath.as_posix()}:{digest.hexdigest()}"
+
+
+def cached_by_content(
+    kind: str,
+    paths: Iterable[Path],
+    cache: "JsonCache | None",
+    compute: Callable[[Path, str | None], Any],
+) -> Iterator[tuple[Path, Any]]:
+    """Yield ``(path, compute(path, text))``, reusing the JSON value of unchanged files.
+
+    ``kind`` keeps the values of different extractions apart in a shared
+    cache; values are keyed by :func:`dependency_key`, since extractions see
+    services with ``extends`` applied. Files are only read, and ``compute`` only called, on a miss;
+    without a cache ``compute`` gets no text and loads the file itself.
+    """
+    for path in paths:
+        if cache is None:
+            yield path, compute(path, None)
+            continue
+        data = path.read_bytes()
+        key = f"{kind}:{dependency_key(path, data, cache)}"
+        value = cache.get_value(key)
+        if value is None:
+            value = compute(path, data.decode())
+            cache.put_value(key, value)
+        yield path, value
+
+
+def rules_fingerprint(*extra_files: Path) -> str:
+    """Hash everything a cached result depends on besides the file itself.
+
+    This covers the ordering policy, the infrastructure networks, the source
+    of this package and any extra files (the calling script, ``common.yml``...).
+    Files pulled in by ``extends`` are covered by :func:`dependency_key`.
+    Missing files are hashed as absent so that creating them later also
+    invalidates the cache.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(CACHE_VERSION).encode())
+    digest.update(repr(POLICY).encode())
+    digest.update(load_infrastructure().digest.encode())
+
+    sources = sorted(PACKAGE_DIR.glob("*.py")) + list(extra_files)
+    for source in sources:
+        digest.update(str(source).encode())
+        try:
+            digest.update(source.read_bytes())
+        except OSError:
+            digest.update(b"<missing>")
+
+    return digest.hexdigest()
+
+
+def _decode(fields: list[Any]) -> Finding:
+    rule_id, severity, message, service, key_path, line, column = fields
+    return Finding(rule_id, severity, message, service, tuple(key_path), line, column)
+
+
+class JsonCache:
+    """Least-recently-used cache of JSON values stored on disk.
+
+    Entries are dropped wholesale when the fingerprint they were computed
+    under changes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fingerprint: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, Any] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cache %s: %s", self.path, e)
+            return
+
+        if not isinstance(data, dict) or data.get("fingerprint") != self.fingerprint:
+            # Rules, validator code or common.yml changed: start from scratch.
+            self._dirty = True
+            return
+
+        entries = data.get("entries", {})
+        if isinstance(entries, dict):
+            self._entries = entries
+
+    def get_value(self, key: str) -> Any:
+        """Return the cached value for a key, or None on a miss."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        # Re-insert to mark the entry as most recently used.
+        self._entries[key] = entry
+        self._dirty = True
+        self.hits += 1
+        return entry
+
+    def put_value(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value for a key."""
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache back to disk, evicting the least recently used entries."""
+        if not self._dirty:
+            return
+
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for key in list(self._entries)[:overflow]:
+                del self._entries[key]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"fingerprint": self.fingerprint, "entries": self._entries}
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.stem}-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_name, self.path)
+        except OSError as e:
+            logger.warning("Could not write cache %s: %s", self.path, e)
+            Path(tmp_name).unlink(missing_ok=True)
+            return
+
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResultCache(JsonCache):
+    """Cache of per-file findings."""
+
+    def get(self, key: str) -> list[Finding] | None:
+        """Return cached findings for a key, or None on a miss."""
+        entry = self.get_value(key)
+        return None if entry is None else [_decode(fields) for fields in entry]
+
+    def put(self, key: str, findings: list[Finding]) -> None:
+        """Store findings for a key."""
+        self.put_value(key, [list(astuple(f)) for f in findings])
@@ -0,0 +1,274 @@
+"""Find the compose files of the repository without walking ignored trees.
+
+Directories are pruned during the walk when they are in :data:`SKIP_DIRS`,
+ignored by a ``.gitignore`` or excluded by ``.pre-commit-config.yaml``, so
+virtualenvs, caches and large bind-mount checkouts are never listed.
+Set ``COMPOSE_LIB_DISCOVERY=git`` to take the file list from
+``git ls-files`` instead of walking the tree.
+"""
+
+import logging
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+from compose_lib.yaml_backend import safe_load
+
+logger = logging.getLogger(__name__)
+
+# In Docker Compose's order of preference when a directory has several.
+COMPOSE_FILENAMES = ("compose.yaml", "compose.yml", "docker-compose.yaml", "docker-compose.yml")
+
+SKIP_DIRS = frozenset(
+    {
+        ".git",
+        ".venv",
+        "venv",
+        "node_modules",
+        "__pycache__",
+        ".cache",
+        ".mypy_cache",
+        ".ruff_cache",
+        ".pytest_cache",
+        ".tox",
+        ".nox",
+    }
+)
+
+PRE_COMMIT_CONFIG = ".pre-commit-config.yaml"
+
+_USE_GIT = os.environ.get("COMPOSE_LIB_DISCOVERY", "walk") == "git"
+
+
+# --- .gitignore ---------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class IgnorePattern:
+    """One line of a ``.gitignore``, relative to the directory holding it."""
+
+    base: str
+    regex: re.Pattern[str]
+    negated: bool
+    directory_only: bool
+    # Patterns without a slash match the name at any depth below ``base``.
+    basename_only: bool
+
+    def matches(self, relative: str, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+        if self.base:
+            if not relative.startswith(self.base + "/"):
+                return False
+            relative = relative[len(self.base) + 1 :]
+        if self.basename_only:
+            relative = relative.rsplit("/", 1)[-1]
+        return self.regex.fullmatch(relative) is not None
+
+
+def _glob_regex(pattern: str) -> str:
+    parts: list[str] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1 : end].replace("\\", "\\\\")
+                parts.append(f"[^{body[1:]}]" if body.startswith("!") else f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+def parse_gitignore(text: str, base: str = "") -> list[IgnorePattern]:
+    """Parse the lines of a ``.gitignore`` found in directory ``base``."""
+    patterns = []
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        basename_only = "/" not in line
+        line = line.lstrip("/")
+        if not line:
+            continue
+        patterns.append(
+            IgnorePattern(
+                base,
+                re.compile(_glob_regex(line)),
+                negated,
+                directory_only,
+                basename_only,
+            )
+        )
+    return patterns
+
+
+def is_ignored(patterns: list[IgnorePattern], relative: str, is_dir: bool) -> bool:
+    """Apply patterns in order; the last matching one decides."""
+    ignored = False
+    for pattern in patterns:
+        if pattern.matches(relative, is_dir):
+            ignored = not pattern.negated
+    return ignored
+
+
+# --- pre-commit ---------------------------------------------------------------
+
+
+def pre_commit_excludes(root: Path) -> list[re.Pattern[str]]:
+    """Exclude patterns that keep files away from the compose hooks.
+
+    These are the global ``exclude`` and those of the local hooks whose
+    ``files`` pattern selects compose files.
+    """
+    try:
+        config = safe_load((root / PRE_COMMIT_CONFIG).read_text())
+    except FileNotFoundError:
+        return []
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning("Cannot read %s: %s", PRE_COMMIT_CONFIG, e)
+        return []
+    if not isinstance(config, dict):
+        return []
+
+    sources = [config.get("exclude")]
+    for repo in config.get("repos") or []:
+        if not isinstance(repo, dict) or repo.get("repo") != "local":
+            continue
+        for hook in repo.get("hooks") or []:
+            files = hook.get("files") if isinstance(hook, dict) else None
+            if isinstance(files, str) and any(re.search(files, n) for n in COMPOSE_FILENAMES):
+                sources.append(hook.get("exclude"))
+
+    excludes = []
+    for source in sources:
+        if isinstance(source, str) and source.strip():
+            try:
+                excludes.append(re.compile(source))
+            except re.error as e:
+                logger.warning("Invalid exclude pattern in %s: %s", PRE_COMMIT_CONFIG, e)
+    return excludes
+
+
+# --- Discovery ----------------------------------------------------------------
+
+
+def _preferred(names: list[str]) -> str | None:
+    for candidate in COMPOSE_FILENAMES:
+        if candidate in names:
+            if len(names) > 1:
+                logger.debug("Several compose files, using %s: %s", candidate, names)
+            return candidate
+    return None
+
+
+def walk_compose_files(root: Path = Path("."), skip: frozenset[str] = SKIP_DIRS) -> list[Path]:
+    """Walk ``root`` for compose files, pruning skipped and ignored directories."""
+    excludes = pre_commit_excludes(root)
+    patterns: list[IgnorePattern] = []
+    found: list[Path] = []
+
+    def excluded(relative: str, is_dir: bool) -> bool:
+        probe = relative + "/" if is_dir else relative
+        return is_ignored(patterns, relative, is_dir) or any(e.search(probe) for e in excludes)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        relative_dir = os.path.relpath(dirpath, root)
+        base = "" if relative_dir == "." else relative_dir.replace(os.sep, "/")
+        if ".gitignore" in filenames:
+            try:
+                patterns.extend(parse_gitignore((Path(dirpath) / ".gitignore").read_text(), base))
+            except OSError as e:
+                logger.warning("Cannot read %s/.gitignore: %s", dirpath, e)
+
+        prefix = base + "/" if base else ""
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if name not in skip and not excluded(prefix + name, is_dir=True)
+        )
+
+        names = [n for n in filenames if n in COMPOSE_FILENAMES]
+        names = [n for n in names if not excluded(prefix + n, is_dir=False)]
+        chosen = _preferred(names)
+        if chosen is not None:
+            found.append(Path(dirpath, chosen))
+
+    return sorted(found)
+
+
+def git_compose_files(root: Path = Path("."), skip: frozenset[str] = SKIP_DIRS) -> list[Path]:
+    """List tracked and untracked, non-ignored compose files with ``git ls-files``.
+
+    Raises:
+        subprocess.CalledProcessError: if git fails (e.g. not a work tree).
+        FileNotFoundError: if git is not installed.
+    """
+    output = subprocess.run(
+        ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard", "--"]
+        + [f"*{name}" for name in COMPOSE_FILENAMES],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    excludes = pre_commit_excludes(root)
+
+    by_directory: dict[str, list[str]] = {}
+    for relative in output.split("\0"):
+        directory, _, name = relative.rpartition("/")
+        if name not in COMPOSE_FILENAMES or skip.intersection(directory.split("/")):
+            continue
+        if any(e.search(relative) for e in excludes) or not (root / relative).exists():
+            continue
+        by_directory.setdefault(directory, []).append(name)
+
+    found = []
+    for directory, names in by_directory.items():
+        chosen = _preferred(names)
+        if chosen is not None:
+            found.append(root / directory / chosen if directory else root / chosen)
+    return sorted(found)
+
+
+def discover_compose_files(root: Path = Path("."), use_git: bool | None = None) -> list[Path]:
+    """List the compose files under ``root``, one per directory, in sorted order.
+
+    ``use_git`` defaults to the ``COMPOSE_LIB_DISCOVERY`` setting; when git
+    cannot list the files, the tree is walked instead.
+    """
+    if use_git if use_git is not None else _USE_GIT:
+        try:
+            return git_compose_files(root)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning("git ls-files failed (%s), walking the tree instead", e)
+    return walk_compose_files(root)
@@ -0,0 +1,140 @@
+"""Parse-once loading of Docker Compose files."""
+
+import difflib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from compose_lib.yaml_backend import safe_load
+
+
+@dataclass
+class ComposeDocument:
+    """A parsed compose file shared by every rule of a run."""
+
+    path: Path
+    content: dict[str, Any] | None
+    error: str | None = None
+    text: str = ""
+    modified: bool = False
+    error_position: tuple[int, int] | None = None
+    # Values computed from the content by rules, dropped when the text changes.
+    derived: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def services(self) -> dict[str, Any]:
+        """Return the services mapping, or an empty dict when missing or malformed."""
+        if not self.content:
+            return {}
+        services = self.content.get("services", {})
+        return services if isinstance(services, dict) else {}
+
+    @property
+    def is_infrastructure(self) -> bool:
+        """Return True for the infrastructure stack that owns the shared networks."""
+        return "infrastructure" in str(self.path)
+
+    def replace_text(self, text: str) -> None:
+        """Swap in rewritten source text and re-parse it."""
+        if text == self.text:
+            return
+        self.content = safe_load(text)
+        self.text = text
+        self.modified = True
+        self.derived.clear()
+
+
+def parse_document(filepath: Path, text: str) -> ComposeDocument:
+    """Parse already-read compose file contents."""
+    try:
+        content: dict[str, Any] | None = safe_load(text)
+    except yaml.YAMLError as e:
+        mark = getattr(e, "problem_mark", None)
+        position = (mark.line + 1, mark.column + 1) if mark is not None else None
+        return ComposeDocument(filepath, None, f"YAML parsing error: {e}", text, False, position)
+
+    return ComposeDocument(filepath, content, text=text)
+
+
+def write_atomic(filepath: Path, text: str) -> bool:
+    """Replace a file's content through a temporary file renamed over it.
+
+    Readers, and a run interrupted midway, see either the old or the new
+    content, never a truncated file. Nothing is written when the file
+    already holds these bytes. Returns True when the file was written.
+
+    Raises:
+        OSError: if the file cannot be written.
+    """
+    data = text.encode()
+    try:
+        if filepath.read_bytes() == data:
+            return False
+        mode = filepath.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+
+    fd, tmp_name = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp_name, mode)
+        os.replace(tmp_name, filepath)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return True
+
+
+def write_document(document: ComposeDocument) -> bool:
+    """Write a rewritten document back to its file; see :func:`write_atomic`."""
+    return document.modified and write_atomic(document.path, document.text)
+
+
+def document_diff(document: ComposeDocument) -> str:
+    """Unified diff between the file on disk and the rewritten document."""
+    return "".join(
+        difflib.unified_diff(
+            document.path.read_text().splitlines(keepends=True),
+            document.text.splitlines(keepends=True),
+            fromfile=f"a/{document.path}",
+            tofile=f"b/{document.path}",
+        )
+    )
+
+
+def load_document(filepath: Path) -> ComposeDocument:
+    """Read and parse a single compose file."""
+    return parse_document(filepath, filepath.read_text())
+
+
+class DocumentStore:
+    """Cache of parsed documents so each file is parsed once per invocation."""
+
+    def __init__(self) -> None:
+        self._documents: dict[Path, ComposeDocument] = {}
+
+    def load(self, filepath: Path, text: str | None = None) -> ComposeDocument:
+        """Return the parsed document for a path, parsing it on first access.
+
+        ``text`` may be given when the caller already read the file.
+        """
+        key = filepath.resolve()
+        document = self._documents.get(key)
+        if document is None:
+            if text is None:
+                text = filepath.read_text()
+            document = parse_document(filepath, text)
+            self._documents[key] = document
+        return document
+
+    def forget(self, filepath: Path) -> None:
+        """Drop a cached document, e.g. after the file was rewritten."""
+        self._documents.pop(filepath.resolve(), None)
@@ -0,0 +1,106 @@
+"""Single-pass rule engine over parsed compose documents."""
+
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+import yaml
+
+from compose_lib.document import ComposeDocument
+from compose_lib.profiling import Profiler
+from compose_lib.roundtrip import compose, locate
+from compose_lib.rules import DEFAULT_RULES, ERROR, WARNING, Finding, FixRule, Rule
+
+
+@dataclass
+class FileResult:
+    """Findings produced by all rules for one file."""
+
+    path: Path
+    findings: list[Finding] = field(default_factory=list)
+
+    @property
+    def errors(self) -> list[str]:
+        return [f.message for f in self.findings if f.severity == ERROR]
+
+    @property
+    def warnings(self) -> list[str]:
+        return [f.message for f in self.findings if f.severity == WARNING]
+
+
+class RuleEngine:
+    """Run every check rule and fixer against a document parsed once."""
+
+    def __init__(
+        self,
+        rules: Sequence[Rule] = DEFAULT_RULES,
+        fixers: Sequence[FixRule] = (),
+        profiler: Profiler | None = None,
+    ) -> None:
+        self.rules = tuple(rules)
+        self.fixers = tuple(fixers)
+        self.profiler = profiler or Profiler()
+
+    def check(self, document: ComposeDocument) -> FileResult:
+        """Run all check rules against a document."""
+        result = FileResult(document.path)
+
+        if document.error is not None:
+            line, column = document.error_position or (None, None)
+            result.findings.append(
+                Finding("parse", ERROR, document.error, line=line, column=column)
+            )
+            return result
+
+        if not document.content:
+            result.findings.append(Finding("parse", WARNING, "Empty file"))
+            return result
+
+        profiler = self.profiler
+        if not profiler.enabled:
+            for rule in self.rules:
+                result.findings.extend(rule.check(document))
+            result.findings = with_positions(document, result.findings)
+            return result
+
+        for rule in self.rules:
+            start = time.perf_counter()
+            findings = rule.check(document)
+            profiler.add_rule(rule.rule_id, time.perf_counter() - start, len(findings))
+            result.findings.extend(findings)
+        with profiler.phase("positions"):
+            result.findings = with_positions(document, result.findings)
+        return result
+
+    def fix(self, document: ComposeDocument) -> bool:
+        """Apply all fixers in order. Returns True when any of them changed the document."""
+        if document.error is not None or not document.content:
+            return False
+
+        changed = False
+        for fixer in self.fixers:
+            changed = fixer.fix(document) or changed
+        return changed
+
+
+def with_positions(document: ComposeDocument, findings: list[Finding]) -> list[Finding]:
+    """Fill in line/column from each finding's key path.
+
+    The node tree is only composed for files that actually have findings.
+    """
+    if not any(f.key_path and f.line is None for f in findings):
+        return findings
+
+    try:
+        root = compose(document.text)
+    except yaml.YAMLError:
+        return findings
+
+    located: list[Finding] = []
+    for finding in findings:
+        position = locate(root, finding.key_path) if finding.line is None else None
+        if position is not None:
+            finding = replace(finding, line=position[0], column=position[1])
+        located.append(finding)
+    return located
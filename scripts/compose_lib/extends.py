@@ -0,0 +1,225 @@
+"""Memoized ``extends`` resolution.
+
+Each base file (``common.yml`` and any other) is parsed once per run and each
+base service is merged once; consumers merge it into their own definition
+lazily, only when a rule asks for a service's effective configuration.
+"""
+
+from collections.abc import Callable, Iterator, Mapping
+from pathlib import Path
+from typing import Any
+
+from compose_lib.document import ComposeDocument, DocumentStore
+
+# Sequences replaced wholesale by the extending service instead of merged.
+_REPLACED_KEYS = {"command", "entrypoint", "test"}
+# Sequences that may also be written as mappings; merged key by key.
+_MAPPING_LISTS = {"environment", "labels", "sysctls", "annotations"}
+# Sequences merged on the mount target.
+_MOUNT_LISTS = {"volumes", "devices"}
+
+ServiceRef = tuple[Path, str]
+
+
+class ExtendsError(ValueError):
+    """Raised when an ``extends`` reference cannot be resolved."""
+
+
+def _as_mapping(value: Any) -> dict[str, Any]:
+    """Normalize a ``KEY=value`` list (or a mapping) into a mapping."""
+    if isinstance(value, dict):
+        return dict(value)
+    mapping: dict[str, Any] = {}
+    for item in value or []:
+        key, sep, val = str(item).partition("=")
+        mapping[key] = val if sep else None
+    return mapping
+
+
+def _mount_target(item: Any) -> Any:
+    if isinstance(item, dict):
+        return item.get("target")
+    parts = str(item).split(":")
+    return parts[1] if len(parts) > 1 else parts[0]
+
+
+def _merge_lists(key: str, base: list[Any], override: list[Any]) -> list[Any]:
+    if key in _MOUNT_LISTS:
+        merged = {_mount_target(item): item for item in base}
+        merged.update({_mount_target(item): item for item in override})
+        return list(merged.values())
+
+    result = list(base)
+    for item in override:
+        if item not in result:
+            result.append(item)
+    return result
+
+
+def merge_service(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    """Merge an extending service definition over the service it extends.
+
+    Mappings merge recursively, most sequences are merged without duplicates,
+    ``volumes``/``devices`` merge on their target and scalars, ``command``,
+    ``entrypoint`` and ``healthcheck.test`` are overridden.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if key not in merged or key in _REPLACED_KEYS:
+            merged[key] = value
+            continue
+
+        current = merged[key]
+        if key in _MAPPING_LISTS:
+            merged[key] = {**_as_mapping(current), **_as_mapping(value)}
+        elif isinstance(current, dict) and isinstance(value, dict):
+            merged[key] = merge_service(current, value)
+        elif isinstance(current, list) and isinstance(value, list):
+            merged[key] = _merge_lists(key, current, value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class ExtendsResolver:
+    """Resolve ``extends`` chains, memoizing every base service.
+
+    Returned definitions are shared between consumers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, store: DocumentStore | None = None) -> None:
+        self.store = store if store is not None else DocumentStore()
+        self._memo: dict[ServiceRef, dict[str, Any]] = {}
+
+    def base_service(
+        self, filepath: Path, name: str, chain: tuple[ServiceRef, ...] = ()
+    ) -> dict[str, Any]:
+        """Return the fully extended definition of service ``name`` in ``filepath``.
+
+        Raises:
+            ExtendsError: if the file or service is missing, or on a cycle.
+        """
+        ref = (filepath.resolve(), name)
+        cached = self._memo.get(ref)
+        if cached is not None:
+            return cached
+        if ref in chain:
+            cycle = " -> ".join(f"{p.name}:{s}" for p, s in (*chain, ref))
+            raise ExtendsError(f"Circular extends: {cycle}")
+
+        document = self.store.load(filepath)
+        if document.error is not None:
+            raise ExtendsError(f"{filepath}: {document.error}")
+        if name not in document.services:
+            raise ExtendsError(f"Cannot extend service '{name}': not found in {filepath}")
+
+        chain = (*chain, ref)
+        resolved = self.extend(
+            filepath,
+            name,
+            document.services[name],
+            lambda base: self.base_service(filepath, base, chain),
+            chain,
+        )
+        self._memo[ref] = resolved
+        return resolved
+
+    def extend(
+        self,
+        filepath: Path,
+        name: str,
+        service: Any,
+        local: Callable[[str], dict[str, Any]],
+        chain: tuple[ServiceRef, ...] = (),
+    ) -> dict[str, Any]:
+        """Merge the base of ``service`` (defined in ``filepath``) into it.
+
+        ``local`` resolves a base service defined in the same file.
+        """
+        if not isinstance(service, dict):
+            return {}
+
+        extends = service.get("extends")
+        if extends is None:
+            return service
+        if isinstance(extends, str):
+            extends = {"service": extends}
+        if not isinstance(extends, dict) or "service" not in extends:
+            raise ExtendsError(f"Service '{name}': extends must name a service")
+
+        if "file" in extends:
+            base_file = filepath.parent / str(extends["file"])
+            if not base_file.is_file():
+                raise ExtendsError(f"Service '{name}' extends missing file {extends['file']}")
+            base = self.base_service(base_file, extends["service"], chain)
+        else:
+            base = local(extends["service"])
+
+        own = {key: value for key, value in service.items() if key != "extends"}
+        return merge_service(base, own)
+
+    def forget(self, filepath: Path) -> None:
+        """Drop a changed file and every memoized service, which may depend on it."""
+        self.store.forget(filepath)
+        self._memo.clear()
+
+
+class EffectiveServices(Mapping[str, dict[str, Any]]):
+    """Lazy view of a document's services with their ``extends`` applied.
+
+    A service is merged on first access only, and then kept.
+    """
+
+    def __init__(self, document: ComposeDocument, resolver: ExtendsResolver) -> None:
+        self._document = document
+        self._resolver = resolver
+        self._resolved: dict[str, dict[str, Any]] = {}
+        self._resolving: set[str] = set()
+
+    def __getitem__(self, name: str) -> dict[str, Any]:
+        resolved = self._resolved.get(name)
+        if resolved is not None:
+            return resolved
+
+        service = self._document.services[name]
+        if name in self._resolving:
+            raise ExtendsError(f"Circular extends through service '{name}'")
+
+        self._resolving.add(name)
+        try:
+            resolved = self._resolver.extend(self._document.path, name, service, self.__getitem__)
+        finally:
+            self._resolving.discard(name)
+        self._resolved[name] = resolved
+        return resolved
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._document.services)
+
+    def __len__(self) -> int:
+        return len(self._document.services)
+
+
+_DEFAULT_RESOLVER = ExtendsResolver()
+
+
+def default_resolver() -> ExtendsResolver:
+    """Return the resolver shared by every rule of this process."""
+    return _DEFAULT_RESOLVER
+
+
+def effective_services(
+    document: ComposeDocument, resolver: ExtendsResolver | None = None
+) -> Mapping[str, dict[str, Any]]:
+    """Return the services of a document with ``extends`` applied, merged lazily.
+
+    One view per resolver is kept on the document until its text changes.
+    """
+    resolver = resolver or _DEFAULT_RESOLVER
+    views = document.derived.setdefault("effective_services", {})
+    view = views.get(resolver)
+    if view is None:
+        view = views[resolver] = EffectiveServices(document, resolver)
+    assert isinstance(view, EffectiveServices)
+    return view
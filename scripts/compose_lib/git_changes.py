@@ -0,0 +1,128 @@
+"""Select the compose files affected by a git change set."""
+
+import subprocess
+from collections.abc import Iterable
+from functools import cache
+from pathlib import Path
+
+from compose_lib.document import DocumentStore
+from compose_lib.rules import get_networks_used_by_services
+
+# Changes to these paths may alter the result of every file.
+RULE_SOURCES = ("scripts/compose_lib/", "scripts/validate_all.py")
+
+
+def _git(*args: str) -> list[str]:
+    output = subprocess.run(
+        ["git", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return [line for line in output.splitlines() if line]
+
+
+@cache
+def repo_root() -> Path:
+    """Return the absolute path of the enclosing git work tree."""
+    return Path(_git("rev-parse", "--show-toplevel")[0]).resolve()
+
+
+def changed_paths(since: str | None = None, staged: bool = False) -> set[Path]:
+    """Return the resolved paths changed in the index or since a ref.
+
+    ``staged`` lists files staged for commit. ``since`` lists files that differ
+    between the ref and the working tree, plus untracked files. Deleted files
+    are included so that their dependents are still revalidated.
+
+    Raises:
+        subprocess.CalledProcessError: if a git command fails (bad ref, not a repo...).
+    """
+    root = repo_root()
+    names: set[str] = set()
+
+    if staged:
+        names.update(_git("diff", "--cached", "--name-only"))
+    if since is not None:
+        names.update(_git("diff", "--name-only", since))
+        names.update(_git("ls-files", "--others", "--exclude-standard"))
+
+    return {(root / name).resolve() for name in names}
+
+
+def _touches_rules(changed: set[Path]) -> bool:
+    root = repo_root()
+    prefixes = tuple(str(root / source) for source in RULE_SOURCES)
+    return any(str(path).startswith(prefixes) for path in changed)
+
+
+def _extends_targets(filepath: Path, store: DocumentStore) -> set[Path]:
+    targets: set[Path] = set()
+    for service_config in store.load(filepath).services.values():
+        if isinstance(service_config, dict):
+            extends = service_config.get("extends")
+            if isinstance(extends, dict) and isinstance(extends.get("file"), str):
+                targets.add((filepath.parent / extends["file"]).resolve())
+    return targets
+
+
+def _networks_referenced(filepath: Path, store: DocumentStore) -> set[str]:
+    content = store.load(filepath).content
+    if not content:
+        return set()
+    networks = get_networks_used_by_services(content)
+    root_networks = content.get("networks")
+    if isinstance(root_networks, dict):
+        networks.update(root_networks)
+    return networks
+
+
+def dependency_closure(
+    compose_files: Iterable[Path],
+    changed: set[Path],
+    store: DocumentStore,
+) -> list[Path]:
+    """Return the compose files affected by a set of changed resolved paths.
+
+    A compose file is affected when it changed itself, when a file it
+    ``extends`` changed (e.g. ``common.yml``), or when it uses a network
+    defined by a changed infrastructure stack.
+    """
+    compose_files = list(compose_files)
+    affected = {f for f in compose_files if f.resolve() in changed}
+
+    changed_networks: set[str] = set()
+    for filepath in affected:
+        document = store.load(filepath)
+        if document.is_infrastructure and document.content:
+            root_networks = document.content.get("networks")
+            if isinstance(root_networks, dict):
+                changed_networks.update(root_networks)
+
+    non_compose_changes = changed - {f.resolve() for f in compose_files}
+
+    for filepath in compose_files:
+        if filepath in affected:
+            continue
+        extends_changed = bool(
+            non_compose_changes and _extends_targets(filepath, store) & non_compose_changes
+        )
+        network_changed = bool(
+            changed_networks and _networks_referenced(filepath, store) & changed_networks
+        )
+        if extends_changed or network_changed:
+            affected.add(filepath)
+
+    return [f for f in compose_files if f in affected]
+
+
+def affected_compose_files(
+    compose_files: Iterable[Path],
+    changed: set[Path],
+    store: DocumentStore,
+) -> list[Path]:
+    """Like :func:`dependency_closure`, but a change to the validator affects every file."""
+    compose_files = list(compose_files)
+    if _touches_rules(changed):
+        return compose_files
+    return dependency_closure(compose_files, changed, store)
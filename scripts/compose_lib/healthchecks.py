@@ -0,0 +1,339 @@
+"""Load that container healthchecks put on the host, and how to spread it.
+
+Docker runs each probe every ``interval`` counted from the container's
+start, so stacks brought up together with the same interval probe in
+lockstep forever. The load is measured as the probe and process rates and
+as the largest number of probes running at once in the first hour after a
+cold boot. Staggering gives every probe its own interval close to the
+original one and never shorter, none a multiple of another, so their
+schedules drift apart without raising the probe rate.
+"""
+
+import logging
+import re
+import shlex
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+from compose_lib.document import ComposeDocument, DocumentStore
+from compose_lib.extends import ExtendsError, effective_services
+from compose_lib.index import ServiceRef
+from compose_lib.roundtrip import RoundTripError, insert_entry, replace_entry
+from compose_lib.rules import WARNING, Finding
+
+logger = logging.getLogger(__name__)
+
+# Docker's defaults for the healthcheck options a service leaves out.
+DEFAULT_INTERVAL = 30.0
+DEFAULT_HORIZON = 3600.0
+DEFAULT_PROBE_SECONDS = 1.0
+# How much longer than the original one a staggered interval may be.
+STAGGER_SPREAD = 0.4
+# Intervals up to this multiple of another one keep probes firing together.
+LOCKSTEP_RATIO = 4
+STAGGER_ROUNDS = 5
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(h|ms|us|ns|m|s)")
+_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 1e-3, "us": 1e-6, "ns": 1e-9}
+_SHELL_OPERATORS = re.compile(r"\|\||&&|[|;]")
+_SHELL_FEATURES = re.compile(r"[|&;<>$`*?(){}]|\|\|")
+
+# Binaries that are costly to start for every probe, with a lighter check.
+HEAVY_BINARIES = {
+    "python": "a wget --spider or curl -f of the same URL",
+    "python3": "a wget --spider or curl -f of the same URL",
+    "node": "a wget --spider or curl -f of the same URL",
+    "php": "a wget --spider or curl -f of the same URL",
+    "java": "a wget --spider or curl -f of the same URL",
+    "psql": "pg_isready alone",
+}
+
+
+def parse_duration(value: Any) -> float | None:
+    """Return a compose duration (``1m30s``, ``500ms``, ``45s``) in seconds."""
+    text = str(value).strip()
+    if not text or _DURATION.sub("", text):
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in _DURATION.findall(text))
+
+
+def format_duration(seconds: float) -> str:
+    """Render whole seconds the way the compose files write them (``45s``, ``75s``)."""
+    return f"{round(seconds)}s"
+
+
+@dataclass(frozen=True)
+class Probe:
+    """The healthcheck of one service."""
+
+    ref: ServiceRef
+    interval: float
+    start_period: float
+    start_interval: float | None
+    # ``test`` as written: CMD or CMD-SHELL, then the command.
+    kind: str
+    command: tuple[str, ...]
+    # Whether the file sets the interval itself rather than inheriting it.
+    local_interval: bool
+
+    @property
+    def commands(self) -> list[list[str]]:
+        """The programs one probe starts, shell included."""
+        if self.kind != "CMD-SHELL":
+            return [list(self.command)]
+        # Only the first item is the script; the shell gets the rest as $0, $1...
+        script = self.command[0] if self.command else ""
+        programs = [["sh", "-c", script]]
+        for part in _SHELL_OPERATORS.split(script):
+            try:
+                words = shlex.split(part)
+            except ValueError:
+                words = part.split()
+            if words:
+                programs.append(words)
+        return programs
+
+    def fire_times(self, horizon: float) -> list[float]:
+        """When the probe runs in the first ``horizon`` seconds after its container starts."""
+        times = []
+        t = 0.0
+        if self.start_interval is not None:
+            while t + self.start_interval < min(self.start_period, horizon):
+                t += self.start_interval
+                times.append(t)
+        while t + self.interval < horizon:
+            t += self.interval
+            times.append(t)
+        return times
+
+
+def _test(healthcheck: dict[str, Any]) -> tuple[str, tuple[str, ...]] | None:
+    test = healthcheck.get("test")
+    if isinstance(test, str):
+        return "CMD-SHELL", (test,)
+    if isinstance(test, list) and test:
+        kind, *command = (str(item) for item in test)
+        if kind == "NONE" or kind not in ("CMD", "CMD-SHELL"):
+            return None
+        return kind, tuple(command)
+    return None
+
+
+def collect_probes(
+    compose_files: Iterable[Path], store: DocumentStore | None = None
+) -> list[Probe]:
+    """Read the healthcheck of every service, with ``extends`` applied."""
+    store = store if store is not None else DocumentStore()
+    probes = []
+    for filepath in compose_files:
+        document = store.load(filepath)
+        resolved = effective_services(document)
+        for name, raw in document.services.items():
+            try:
+                service = resolved[name]
+            except ExtendsError as e:
+                logger.debug("Reading %s in %s without extends: %s", name, filepath, e)
+                service = raw
+            healthcheck = service.get("healthcheck") if isinstance(service, dict) else None
+            if not isinstance(healthcheck, dict) or healthcheck.get("disable"):
+                continue
+            test = _test(healthcheck)
+            if test is None:
+                continue
+            own = raw.get("healthcheck") if isinstance(raw, dict) else None
+            start_interval = healthcheck.get("start_interval")
+            probes.append(
+                Probe(
+                    ServiceRef(filepath, name),
+                    parse_duration(healthcheck.get("interval", "")) or DEFAULT_INTERVAL,
+                    parse_duration(healthcheck.get("start_period", "")) or 0.0,
+                    parse_duration(start_interval) if start_interval is not None else None,
+                    test[0],
+                    test[1],
+                    isinstance(own, dict) and "interval" in own,
+                )
+            )
+    return probes
+
+
+@dataclass(frozen=True)
+class ProbeLoad:
+    """Aggregate probe load over the first ``horizon`` seconds after a cold boot."""
+
+    probes: int
+    probes_per_minute: float
+    processes_per_minute: float
+    # Most probes running at the same time, each assumed to last probe_seconds.
+    peak_concurrent: int
+
+
+def probe_load(
+    probes: list[Probe],
+    intervals: dict[ServiceRef, float] | None = None,
+    horizon: float = DEFAULT_HORIZON,
+    probe_seconds: float = DEFAULT_PROBE_SECONDS,
+) -> ProbeLoad:
+    """Measure the load of ``probes``, optionally with other ``intervals``.
+
+    Every container is assumed to start at the same time, as after a reboot.
+    """
+    intervals = intervals or {}
+    per_minute = processes = 0.0
+    events: list[tuple[float, int]] = []
+    for probe in probes:
+        interval = intervals.get(probe.ref, probe.interval)
+        per_minute += 60 / interval
+        processes += 60 / interval * len(probe.commands)
+        for t in replace(probe, interval=interval).fire_times(horizon):
+            events += [(t, 1), (t + probe_seconds, -1)]
+
+    peak = running = 0
+    # Ends sort before starts at the same instant: back-to-back probes do not overlap.
+    for _, delta in sorted(events):
+        running += delta
+        peak = max(peak, running)
+    return ProbeLoad(len(probes), per_minute, processes, peak)
+
+
+def _clashes(candidate: int, used: set[int]) -> bool:
+    # Equal intervals, or one a small multiple of the other, keep probes in step.
+    return any(
+        max(candidate, other) % min(candidate, other) == 0
+        and max(candidate, other) // min(candidate, other) <= LOCKSTEP_RATIO
+        for other in used
+    )
+
+
+def stagger(probes: list[Probe], spread: float = STAGGER_SPREAD) -> dict[ServiceRef, float]:
+    """Give each probe a distinct whole-second interval, its own or slightly longer.
+
+    Intervals avoid being equal to, or a small multiple of, another one, so
+    probes do not stay in step. Intervals never shrink and grow by at most
+    ``spread``; probes that already have a unique interval keep it, and so do
+    probes with no free interval in that range, which are logged.
+    """
+    # Later rounds start from moved intervals, so the range stays that of the original.
+    limits = {}
+    for probe in probes:
+        base = max(1, round(probe.interval))
+        limits[probe.ref] = base + int(base * spread)
+
+    intervals: dict[ServiceRef, float] = {}
+    crowded: list[Probe] = []
+    # Repeat until nothing moves, so staggering a staggered repo changes nothing.
+    for _ in range(STAGGER_ROUNDS):
+        moved, crowded = _stagger_once(
+            [replace(p, interval=intervals.get(p.ref, p.interval)) for p in probes], limits
+        )
+        if not moved:
+            break
+        intervals.update(moved)
+    for probe in crowded:
+        logger.warning(
+            "%s: no free interval up to %ss, keeping %s",
+            probe.ref,
+            limits[probe.ref],
+            format_duration(probe.interval),
+        )
+    return {
+        p.ref: intervals[p.ref] for p in probes if intervals.get(p.ref, p.interval) != p.interval
+    }
+
+
+def _stagger_once(
+    probes: list[Probe], limits: dict[ServiceRef, int]
+) -> tuple[dict[ServiceRef, float], list[Probe]]:
+    used: set[int] = set()
+    proposed: dict[ServiceRef, float] = {}
+    crowded: list[Probe] = []
+    ordered = sorted(probes, key=lambda p: (p.interval, p.ref))
+
+    # Keep every interval that is already out of step, so a staggered repo stays as is.
+    moving = []
+    for probe in ordered:
+        base = round(probe.interval)
+        if base == probe.interval and base > 0 and not _clashes(base, used):
+            used.add(base)
+        else:
+            moving.append(probe)
+
+    for probe in moving:
+        base = max(1, round(probe.interval))
+        # Only ever lengthen an interval, so no service is probed more often than before.
+        candidates = list(range(base, limits[probe.ref] + 1))
+        choice = next((c for c in candidates if not _clashes(c, used)), None)
+        if choice is None:
+            # Crowded range: moving would not get the probe out of step.
+            crowded.append(probe)
+            continue
+        used.add(choice)
+        if choice != probe.interval:
+            proposed[probe.ref] = float(choice)
+    return proposed, crowded
+
+
+def apply_intervals(document: ComposeDocument, intervals: dict[str, float]) -> bool:
+    """Set ``healthcheck.interval`` of the given services in place; True if it changed.
+
+    Only services defining their own ``healthcheck`` are edited; the rest of
+    the text, comments included, is kept as is.
+    """
+    text = document.text
+    changed = False
+    for name, interval in sorted(intervals.items()):
+        service = document.services.get(name)
+        healthcheck = service.get("healthcheck") if isinstance(service, dict) else None
+        if not isinstance(healthcheck, dict):
+            logger.warning(
+                "%s: '%s' has no healthcheck of its own, not staggered", document.path, name
+            )
+            continue
+        path = ("services", name, "healthcheck")
+        try:
+            if "interval" in healthcheck:
+                text = replace_entry(text, (*path, "interval"), format_duration(interval))
+            else:
+                text = insert_entry(text, path, "interval", format_duration(interval), "test")
+        except RoundTripError as e:
+            logger.warning("Cannot stagger '%s' in %s in place: %s", name, document.path, e)
+            continue
+        changed = True
+
+    if changed:
+        document.replace_text(text)
+    return changed
+
+
+def probe_findings(probe: Probe) -> list[Finding]:
+    """Flag probes that start heavyweight programs or misuse CMD-SHELL."""
+    findings = []
+    key_path = ("services", probe.ref.service, "healthcheck", "test")
+
+    def warn(message: str) -> None:
+        findings.append(Finding("healthcheck", WARNING, message, probe.ref.service, key_path))
+
+    if probe.kind == "CMD-SHELL" and len(probe.command) > 1:
+        warn(
+            f"Service '{probe.ref.service}': CMD-SHELL runs only its first item "
+            f"('{probe.command[0]}') as the script; join the command into one string"
+        )
+    for words in probe.commands[1 if probe.kind == "CMD-SHELL" else 0 :]:
+        binary = words[0].rsplit("/", 1)[-1] if words else ""
+        lighter = HEAVY_BINARIES.get(binary)
+        if lighter is not None:
+            warn(
+                f"Service '{probe.ref.service}': healthcheck starts {binary} on every probe; "
+                f"{lighter} is lighter"
+            )
+    if (
+        probe.kind == "CMD-SHELL"
+        and len(probe.command) == 1
+        and not _SHELL_FEATURES.search(probe.command[0])
+    ):
+        warn(
+            f"Service '{probe.ref.service}': healthcheck needs no shell; "
+            "the CMD form saves a fork on every probe"
+        )
+    return findings
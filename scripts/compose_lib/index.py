@@ -0,0 +1,258 @@
+"""Repository-wide index of the resources stacks claim on the host.
+
+One pass over every compose file records which services use each network,
+publish each host port, pin each static IP and own each container name, so
+cross-stack conflicts are found with dictionary lookups.
+"""
+
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from compose_lib.cache import JsonCache, cached_by_content
+from compose_lib.document import ComposeDocument, DocumentStore
+from compose_lib.extends import ExtendsError, effective_services
+from compose_lib.rules import ERROR, Finding
+
+logger = logging.getLogger(__name__)
+
+ANY_ADDRESS = "0.0.0.0"
+# Refuse to expand absurd ranges such as 1-65535 port by port.
+MAX_RANGE = 1024
+
+
+@dataclass(frozen=True, order=True)
+class ServiceRef:
+    """A service in a compose file."""
+
+    path: Path
+    service: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.service}"
+
+
+@dataclass(frozen=True)
+class PortBinding:
+    """A host port published by a service."""
+
+    host_ip: str
+    port: int
+    protocol: str
+
+    def __str__(self) -> str:
+        address = "" if self.host_ip == ANY_ADDRESS else f"{self.host_ip}:"
+        return f"{address}{self.port}/{self.protocol}"
+
+
+def _port_range(value: Any) -> list[int]:
+    text = str(value).strip()
+    if not text or "$" in text:
+        return []
+    start, _, end = text.partition("-")
+    try:
+        first, last = int(start), int(end or start)
+    except ValueError:
+        return []
+    if last < first or last - first >= MAX_RANGE:
+        return []
+    return list(range(first, last + 1))
+
+
+def published_ports(entry: Any) -> list[PortBinding]:
+    """Return the host ports a ``ports`` entry binds, in short or long syntax.
+
+    Entries without a fixed host port, or whose port comes from a variable,
+    bind nothing predictable and are skipped.
+    """
+    if isinstance(entry, dict):
+        host_ip = str(entry.get("host_ip") or ANY_ADDRESS)
+        protocol = str(entry.get("protocol") or "tcp")
+        ports = _port_range(entry.get("published", ""))
+        return [PortBinding(host_ip, port, protocol) for port in ports]
+
+    spec, _, protocol = str(entry).partition("/")
+    host_ip = ANY_ADDRESS
+    if spec.startswith("["):
+        address, _, spec = spec[1:].partition("]:")
+        host_ip = address
+        parts = spec.split(":")
+    else:
+        parts = spec.split(":")
+        if len(parts) == 3:
+            host_ip = parts[0] or ANY_ADDRESS
+            parts = parts[1:]
+
+    if len(parts) != 2:
+        return []
+    return [PortBinding(host_ip, port, protocol or "tcp") for port in _port_range(parts[0])]
+
+
+def _overlaps(a: PortBinding, b: PortBinding) -> bool:
+    return a.host_ip == b.host_ip or ANY_ADDRESS in (a.host_ip, b.host_ip)
+
+
+def _network_names(value: Any) -> list[str]:
+    if isinstance(value, dict):
+        return [str(name) for name in value]
+    if isinstance(value, list):
+        return [str(name) for name in value]
+    return []
+
+
+def service_resources(service: dict[str, Any]) -> dict[str, Any]:
+    """The host resources of one effective service, as a JSON-serializable value."""
+    networks = []
+    service_networks = service.get("networks")
+    for network in _network_names(service_networks):
+        settings = service_networks.get(network) if isinstance(service_networks, dict) else None
+        ip = settings.get("ipv4_address") if isinstance(settings, dict) else None
+        networks.append([network, str(ip) if ip else None])
+
+    ports = service.get("ports")
+    bindings = [
+        [binding.host_ip, binding.port, binding.protocol]
+        for entry in (ports if isinstance(ports, list) else [])
+        for binding in published_ports(entry)
+    ]
+
+    container_name = service.get("container_name")
+    return {
+        "networks": networks,
+        "ports": bindings,
+        "container_name": container_name if isinstance(container_name, str) else None,
+    }
+
+
+@dataclass
+class StackIndex:
+    """Host resources claimed by every service of the repository."""
+
+    networks: dict[str, list[ServiceRef]] = field(default_factory=lambda: defaultdict(list))
+    ports: dict[tuple[int, str], list[tuple[PortBinding, ServiceRef]]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    static_ips: dict[tuple[str, str], list[ServiceRef]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    container_names: dict[str, list[ServiceRef]] = field(default_factory=lambda: defaultdict(list))
+
+    def add_service(self, ref: ServiceRef, service: dict[str, Any]) -> None:
+        """Record the resources of one effective service definition."""
+        self.add_resources(ref, service_resources(service))
+
+    def add_resources(self, ref: ServiceRef, resources: dict[str, Any]) -> None:
+        """Record resources extracted by :func:`service_resources`."""
+        for network, ip in resources["networks"]:
+            self.networks[network].append(ref)
+            if ip:
+                self.static_ips[(network, ip)].append(ref)
+        for host_ip, port, protocol in resources["ports"]:
+            binding = PortBinding(host_ip, port, protocol)
+            self.ports[(port, protocol)].append((binding, ref))
+        if resources["container_name"] is not None:
+            self.container_names[resources["container_name"]].append(ref)
+
+    def duplicate_ports(self) -> Iterator[list[tuple[PortBinding, ServiceRef]]]:
+        """Yield groups of services publishing the same host port on overlapping addresses."""
+        for bindings in self.ports.values():
+            if len(bindings) < 2:
+                continue
+            clashing = [
+                (binding, ref)
+                for binding, ref in bindings
+                if any(
+                    other_ref != ref and _overlaps(binding, other) for other, other_ref in bindings
+                )
+            ]
+            if clashing:
+                yield clashing
+
+    def duplicate_static_ips(self) -> Iterator[tuple[tuple[str, str], list[ServiceRef]]]:
+        """Yield ``(network, ip)`` pairs pinned by more than one service."""
+        for key, refs in self.static_ips.items():
+            if len(set(refs)) > 1:
+                yield key, refs
+
+    def duplicate_container_names(self) -> Iterator[tuple[str, list[ServiceRef]]]:
+        """Yield container names used by more than one service."""
+        for name, refs in self.container_names.items():
+            if len(refs) > 1:
+                yield name, refs
+
+
+def file_resources(document: ComposeDocument) -> dict[str, dict[str, Any]]:
+    """The resources of every service of a file, ``extends`` applied."""
+    services = effective_services(document)
+    resources = {}
+    for name in document.services:
+        try:
+            service = services[name]
+        except ExtendsError as e:
+            logger.debug("Indexing %s in %s without extends: %s", name, document.path, e)
+            service = document.services[name]
+        if isinstance(service, dict):
+            resources[name] = service_resources(service)
+    return resources
+
+
+def build_index(
+    compose_files: Iterable[Path],
+    store: DocumentStore | None = None,
+    cache: JsonCache | None = None,
+) -> StackIndex:
+    """Index every service of the given compose files in a single pass.
+
+    With a ``cache``, only files whose content changed are parsed.
+    """
+    store = store if store is not None else DocumentStore()
+    index = StackIndex()
+
+    def extract(filepath: Path, text: str | None) -> dict[str, dict[str, Any]]:
+        return file_resources(store.load(filepath, text))
+
+    for filepath, services in cached_by_content("index", compose_files, cache, extract):
+        for name, resources in services.items():
+            index.add_resources(ServiceRef(filepath, name), resources)
+
+    return index
+
+
+def _conflict(
+    ref: ServiceRef, others: Iterable[ServiceRef], what: str, key_path: tuple[str, ...]
+) -> Finding:
+    where = ", ".join(sorted({str(other) for other in others if other != ref}))
+    return Finding(
+        "conflicts",
+        ERROR,
+        f"Service '{ref.service}': {what} is also used by {where}",
+        service=ref.service,
+        key_path=("services", ref.service, *key_path),
+    )
+
+
+def conflict_findings(index: StackIndex) -> dict[Path, list[Finding]]:
+    """Turn the duplicates of an index into findings, grouped by file."""
+    findings: dict[Path, list[Finding]] = defaultdict(list)
+
+    for clashing in index.duplicate_ports():
+        for binding, ref in clashing:
+            others = [r for b, r in clashing if _overlaps(binding, b)]
+            what = f"host port {binding}"
+            findings[ref.path].append(_conflict(ref, others, what, ("ports",)))
+
+    for (network, ip), refs in index.duplicate_static_ips():
+        for ref in refs:
+            what = f"static IP {ip} on network '{network}'"
+            key_path = ("networks", network, "ipv4_address")
+            findings[ref.path].append(_conflict(ref, refs, what, key_path))
+
+    for name, refs in index.duplicate_container_names():
+        for ref in refs:
+            what = f"container name '{name}'"
+            findings[ref.path].append(_conflict(ref, refs, what, ("container_name",)))
+
+    return dict(findings)
@@ -0,0 +1,79 @@
+"""Shared networks owned by the infrastructure stack.
+
+The network set is read from ``infrastructure/docker-compose.yml`` instead of
+being hard-coded in each tool. It is parsed once per process and re-parsed
+only when the file's content hash changes (e.g. while ``--watch`` runs).
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+from compose_lib.yaml_backend import safe_load
+
+logger = logging.getLogger(__name__)
+
+INFRASTRUCTURE_FILE = Path(__file__).resolve().parents[2] / "infrastructure" / "docker-compose.yml"
+
+
+@dataclass(frozen=True)
+class InfrastructureNetworks:
+    """Networks declared by the infrastructure stack, with the hash of its file."""
+
+    path: Path
+    digest: str
+    names: frozenset[str]
+
+
+# path -> ((mtime_ns, size), networks): a stat call decides whether to re-hash.
+_loaded: dict[Path, tuple[tuple[int, int], InfrastructureNetworks]] = {}
+
+
+def _parse_networks(path: Path, data: bytes) -> frozenset[str]:
+    try:
+        content = safe_load(data.decode())
+    except yaml.YAMLError as e:
+        logger.warning("Cannot read infrastructure networks from %s: %s", path, e)
+        return frozenset()
+
+    networks = content.get("networks") if isinstance(content, dict) else None
+    if not isinstance(networks, dict):
+        return frozenset()
+
+    # Other stacks reference a network by its Docker name, which `name:` overrides.
+    names = set()
+    for key, definition in networks.items():
+        name = definition.get("name") if isinstance(definition, dict) else None
+        names.add(str(name or key))
+    return frozenset(names)
+
+
+def load_infrastructure(path: Path = INFRASTRUCTURE_FILE) -> InfrastructureNetworks:
+    """Return the infrastructure networks, parsing the file only when it changed."""
+    try:
+        stat = path.stat()
+    except OSError:
+        logger.warning("Infrastructure stack %s not found, no shared networks", path)
+        return InfrastructureNetworks(path, "", frozenset())
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached is not None and cached[1].digest == digest:
+        networks = cached[1]
+    else:
+        networks = InfrastructureNetworks(path, digest, _parse_networks(path, data))
+    _loaded[path] = (signature, networks)
+    return networks
+
+
+def infrastructure_networks(path: Path = INFRASTRUCTURE_FILE) -> frozenset[str]:
+    """Return the names of the networks the infrastructure stack creates."""
+    return load_infrastructure(path).names
@@ -0,0 +1,276 @@
+"""Memory committed by every service against the host's memory budget.
+
+Limits come from ``mem_limit`` or ``deploy.resources.limits.memory`` of the
+effective service (``extends`` applied), multiplied by its replicas, and are
+totalled per stack and per network. Services without a limit are listed
+apart: they can use any amount, so a budget cannot account for them. The
+host budget comes from ``--memory-budget`` or ``COMPOSE_MEMORY_BUDGET``.
+"""
+
+import logging
+import os
+import re
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from compose_lib.cache import JsonCache, cached_by_content
+from compose_lib.document import ComposeDocument, DocumentStore
+from compose_lib.extends import ExtendsError, effective_services
+from compose_lib.index import ServiceRef
+from compose_lib.rules import ERROR, WARNING, Finding
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ENV = "COMPOSE_MEMORY_BUDGET"
+
+# Docker Compose byte values: a number with an optional b, k, m or g unit.
+_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*([bkmg]?)b?", re.IGNORECASE)
+_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+# How many of the largest consumers an over-budget finding names.
+_LARGEST = 3
+
+
+def parse_size(value: Any) -> int | None:
+    """Return a compose byte value (``512M``, ``2g``, ``1073741824``) in bytes.
+
+    Values that are not sizes, such as unresolved ``${VARIABLES}``, give None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = _SIZE.fullmatch(str(value).strip())
+    if match is None:
+        return None
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+def format_size(size: int) -> str:
+    """Render a byte count in GiB or MiB."""
+    if size >= 1024**3:
+        return f"{size / 1024**3:.1f} GiB"
+    return f"{size / 1024**2:.0f} MiB"
+
+
+def _networks(value: Any) -> list[str]:
+    return [str(name) for name in value] if isinstance(value, (dict, list)) else []
+
+
+def _path(service: dict[str, Any], *keys: str) -> Any:
+    value: Any = service
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+@dataclass(frozen=True)
+class ServiceMemory:
+    """Memory limits of one service, in bytes for all of its replicas."""
+
+    ref: ServiceRef
+    limit: int | None
+    swap: int | None
+    reservation: int | None
+    replicas: int
+    networks: tuple[str, ...]
+    # The key holding the limit, for the finding's position.
+    key_path: tuple[str, ...]
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "service": self.ref.service,
+            "limit": self.limit,
+            "swap": self.swap,
+            "reservation": self.reservation,
+            "replicas": self.replicas,
+            "networks": list(self.networks),
+            "key_path": list(self.key_path),
+        }
+
+    @classmethod
+    def from_json(cls, path: Path, data: dict[str, Any]) -> "ServiceMemory":
+        return cls(
+            ServiceRef(path, data["service"]),
+            data["limit"],
+            data["swap"],
+            data["reservation"],
+            data["replicas"],
+            tuple(data["networks"]),
+            tuple(data["key_path"]),
+        )
+
+
+def service_memory(ref: ServiceRef, service: dict[str, Any], networks: list[str]) -> ServiceMemory:
+    """Read the memory limits of one effective service definition."""
+    replicas = _path(service, "deploy", "replicas") or service.get("scale") or 1
+    replicas = replicas if isinstance(replicas, int) and replicas > 0 else 1
+
+    key_path: tuple[str, ...] = ("services", ref.service)
+    limit = parse_size(service.get("mem_limit"))
+    if limit is not None:
+        key_path += ("mem_limit",)
+    else:
+        limit = parse_size(_path(service, "deploy", "resources", "limits", "memory"))
+        if limit is not None:
+            key_path += ("deploy", "resources", "limits", "memory")
+
+    # memswap_limit is memory plus swap; -1 allows unlimited swap.
+    swap = None
+    memswap = parse_size(service.get("memswap_limit"))
+    if memswap is not None and limit is not None and memswap > limit:
+        swap = (memswap - limit) * replicas
+
+    reservation = parse_size(service.get("mem_reservation")) or parse_size(
+        _path(service, "deploy", "resources", "reservations", "memory")
+    )
+    return ServiceMemory(
+        ref,
+        limit * replicas if limit is not None else None,
+        swap,
+        reservation * replicas if reservation is not None else None,
+        replicas,
+        tuple(networks),
+        key_path,
+    )
+
+
+@dataclass
+class Total:
+    """Memory committed by a group of services."""
+
+    limited: int = 0
+    swap: int = 0
+    services: list[ServiceMemory] = field(default_factory=list)
+    unlimited: list[ServiceMemory] = field(default_factory=list)
+
+    def add(self, memory: ServiceMemory) -> None:
+        if memory.limit is None:
+            self.unlimited.append(memory)
+            return
+        self.limited += memory.limit
+        self.swap += memory.swap or 0
+        self.services.append(memory)
+
+
+@dataclass
+class MemoryReport:
+    """Memory committed in total, per stack and per network."""
+
+    total: Total = field(default_factory=Total)
+    stacks: dict[Path, Total] = field(default_factory=lambda: defaultdict(Total))
+    networks: dict[str, Total] = field(default_factory=lambda: defaultdict(Total))
+
+    def add(self, memory: ServiceMemory) -> None:
+        self.total.add(memory)
+        self.stacks[memory.ref.path].add(memory)
+        for network in memory.networks:
+            self.networks[network].add(memory)
+
+
+def file_memory(document: ComposeDocument) -> list[ServiceMemory]:
+    """Read the memory limits of every service of a file, ``extends`` applied."""
+    resolved = effective_services(document)
+    services: dict[str, dict[str, Any]] = {}
+    for name in document.services:
+        try:
+            service = resolved[name]
+        except ExtendsError as e:
+            logger.debug("Measuring %s in %s without extends: %s", name, document.path, e)
+            service = document.services[name]
+        if isinstance(service, dict):
+            services[name] = service
+
+    memories = []
+    for name, service in services.items():
+        # A service in another's network namespace counts on that service's networks.
+        mode = service.get("network_mode")
+        owner = services.get(mode.partition(":")[2]) if isinstance(mode, str) else None
+        if isinstance(mode, str) and mode.startswith("service:") and owner is not None:
+            networks = _networks(owner.get("networks"))
+        else:
+            networks = _networks(service.get("networks"))
+        memories.append(service_memory(ServiceRef(document.path, name), service, networks))
+    return memories
+
+
+def build_memory_report(
+    compose_files: Iterable[Path],
+    store: DocumentStore | None = None,
+    cache: JsonCache | None = None,
+) -> MemoryReport:
+    """Collect the memory limits of every service of the given compose files.
+
+    With a ``cache``, only files whose content changed are parsed.
+    """
+    store = store if store is not None else DocumentStore()
+    report = MemoryReport()
+
+    def extract(filepath: Path, text: str | None) -> list[dict[str, Any]]:
+        return [memory.to_json() for memory in file_memory(store.load(filepath, text))]
+
+    for filepath, entries in cached_by_content("memory", compose_files, cache, extract):
+        for entry in entries:
+            report.add(ServiceMemory.from_json(filepath, entry))
+
+    return report
+
+
+def memory_budget() -> int | None:
+    """The host budget set by ``COMPOSE_MEMORY_BUDGET``, if any.
+
+    Raises:
+        ValueError: if the variable is set but is not a size.
+    """
+    value = os.environ.get(BUDGET_ENV)
+    if not value:
+        return None
+    budget = parse_size(value)
+    if budget is None:
+        raise ValueError(f"{BUDGET_ENV}={value} is not a size (e.g. 16G)")
+    return budget
+
+
+def budget_findings(report: MemoryReport, budget: int) -> dict[Path, list[Finding]]:
+    """Flag a total over the budget, and the services the budget cannot account for.
+
+    The over-budget error is reported on the largest consumer, where cutting
+    a limit helps the most.
+    """
+    findings: dict[Path, list[Finding]] = defaultdict(list)
+    total = report.total
+
+    if total.limited > budget:
+        largest = sorted(total.services, key=lambda memory: -(memory.limit or 0))
+        names = ", ".join(
+            f"{memory.ref.service} ({format_size(memory.limit or 0)})"
+            for memory in largest[:_LARGEST]
+        )
+        top = largest[0]
+        findings[top.ref.path].append(
+            Finding(
+                "memory",
+                ERROR,
+                f"Services commit {format_size(total.limited)} of memory, over the "
+                f"{format_size(budget)} host budget; largest: {names}",
+                service=top.ref.service,
+                key_path=top.key_path,
+            )
+        )
+
+    for memory in total.unlimited:
+        findings[memory.ref.path].append(
+            Finding(
+                "memory",
+                WARNING,
+                f"Service '{memory.ref.service}' has no mem_limit, "
+                f"the {format_size(budget)} host budget cannot account for it",
+                service=memory.ref.service,
+                key_path=memory.key_path,
+            )
+        )
+    return dict(findings)
@@ -0,0 +1,203 @@
+"""Report formats for validation results: human text, JSON Lines and SARIF.
+
+Every reporter writes each file's findings as soon as they are known, so
+large runs stream their output instead of buffering it until the end.
+"""
+
+import abc
+import json
+import logging
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, TextIO
+
+from compose_lib.engine import FileResult
+from compose_lib.rules import ERROR, Finding
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("text", "jsonl", "sarif")
+
+SARIF_VERSION = "2.1.0"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+TOOL_NAME = "validate_all"
+
+_RULE_DESCRIPTIONS = {
+    "parse": "Compose file must be valid, non-empty YAML",
+    "root-order": "Root keys must follow the configured order, services first",
+    "service-order": "Service keys must follow the configured order",
+    "networks": "Infrastructure networks must be declared external; no unknown networks",
+    "extends": "Services should extend common-config from ../common.yml",
+    "effective-config": "Every service should get a restart policy and no-new-privileges",
+    "conflicts": "Host ports, static IPs and container names must be unique across stacks",
+    "traefik": "Traefik routers must target defined services and exposed ports, without clashes",
+    "memory": "Memory limits must fit the host budget; every service should have one",
+}
+
+
+class Reporter(abc.ABC):
+    """Base reporter: keeps the summary counters shared by every format."""
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.total_errors = 0
+        self.total_warnings = 0
+        self.files_with_issues: list[str] = []
+
+    def start(self) -> None:
+        """Write anything that must precede the first result."""
+        return None
+
+    def report(self, result: FileResult) -> None:
+        """Record and write the findings of one file."""
+        errors = sum(1 for f in result.findings if f.severity == ERROR)
+        self.total_errors += errors
+        self.total_warnings += len(result.findings) - errors
+        if result.findings:
+            self.files_with_issues.append(str(result.path))
+        self._write(result)
+        self.stream.flush()
+
+    @abc.abstractmethod
+    def _write(self, result: FileResult) -> None:
+        """Write the findings of one file in this format."""
+
+    def finish(self, files_checked: int) -> None:
+        """Write the trailer once every file was reported."""
+        return None
+
+
+class TextReporter(Reporter):
+    """Human-readable report with a summary, the historical output format."""
+
+    def _write(self, result: FileResult) -> None:
+        if not result.findings:
+            return
+
+        print(f"\n{result.path}", file=self.stream)
+        for error in result.errors:
+            print(f"  ERROR: {error}", file=self.stream)
+        for warning in result.warnings:
+            print(f"  WARNING: {warning}", file=self.stream)
+
+    def finish(self, files_checked: int) -> None:
+        out = self.stream
+        print(f"\n{'=' * 60}", file=out)
+        print("SUMMARY:", file=out)
+        print(f"  Files checked: {files_checked}", file=out)
+        print(f"  Files with issues: {len(self.files_with_issues)}", file=out)
+        print(f"  Total errors: {self.total_errors}", file=out)
+        print(f"  Total warnings: {self.total_warnings}", file=out)
+
+        if self.total_errors > 0:
+            print("\nFiles with errors:", file=out)
+            for f in self.files_with_issues:
+                print(f"  - {f}", file=out)
+        else:
+            print("\nAll files passed validation!", file=out)
+
+
+def _log_summary(reporter: Reporter, files_checked: int) -> None:
+    logger.info(
+        "Checked %d files: %d with issues, %d errors, %d warnings",
+        files_checked,
+        len(reporter.files_with_issues),
+        reporter.total_errors,
+        reporter.total_warnings,
+    )
+
+
+def finding_record(path: Path, finding: Finding) -> dict[str, Any]:
+    """Flat JSON-serializable view of a finding."""
+    return {
+        "file": path.as_posix(),
+        "service": finding.service,
+        "rule": finding.rule_id,
+        "severity": finding.severity,
+        "message": finding.message,
+        "line": finding.line,
+        "column": finding.column,
+    }
+
+
+class JsonLinesReporter(Reporter):
+    """One JSON object per finding and per line; the summary goes to the log."""
+
+    def _write(self, result: FileResult) -> None:
+        for finding in result.findings:
+            self.stream.write(json.dumps(finding_record(result.path, finding)) + "\n")
+
+    def finish(self, files_checked: int) -> None:
+        _log_summary(self, files_checked)
+
+
+class SarifReporter(Reporter):
+    """SARIF 2.1.0 log for code scanning tools, written incrementally.
+
+    The document header is written up front and each result is appended to
+    the ``results`` array as it arrives; :meth:`finish` closes the document.
+    """
+
+    def __init__(self, stream: TextIO, rule_ids: Iterable[str]) -> None:
+        super().__init__(stream)
+        self.rule_ids = list(dict.fromkeys(["parse", *rule_ids]))
+        self._first = True
+
+    def start(self) -> None:
+        rules = [
+            {"id": rule_id, "shortDescription": {"text": _RULE_DESCRIPTIONS.get(rule_id, rule_id)}}
+            for rule_id in self.rule_ids
+        ]
+        header = json.dumps(
+            {
+                "$schema": SARIF_SCHEMA,
+                "version": SARIF_VERSION,
+                "runs": [{"tool": {"driver": {"name": TOOL_NAME, "rules": rules}}, "results": []}],
+            }
+        )
+        # Everything up to the still-empty results array: "...results": [
+        self.stream.write(header[: -len("]}]}")])
+        self.stream.flush()
+
+    def _result(self, path: Path, finding: Finding) -> dict[str, Any]:
+        location: dict[str, Any] = {"artifactLocation": {"uri": path.as_posix()}}
+        if finding.line is not None:
+            region = {"startLine": finding.line}
+            if finding.column is not None:
+                region["startColumn"] = finding.column
+            location["region"] = region
+
+        result: dict[str, Any] = {
+            "ruleId": finding.rule_id,
+            "level": "error" if finding.severity == ERROR else "warning",
+            "message": {"text": finding.message},
+            "locations": [{"physicalLocation": location}],
+        }
+        if finding.service is not None:
+            result["properties"] = {"service": finding.service}
+        return result
+
+    def _write(self, result: FileResult) -> None:
+        for finding in result.findings:
+            separator = "" if self._first else ","
+            self.stream.write(separator + json.dumps(self._result(result.path, finding)))
+            self._first = False
+
+    def finish(self, files_checked: int) -> None:
+        self.stream.write("]}]}\n")
+        _log_summary(self, files_checked)
+
+
+def make_reporter(fmt: str, stream: TextIO, rule_ids: Iterable[str] = ()) -> Reporter:
+    """Build the reporter for an output format name.
+
+    Raises:
+        ValueError: if the format is not one of :data:`FORMATS`.
+    """
+    if fmt == "text":
+        return TextReporter(stream)
+    if fmt == "jsonl":
+        return JsonLinesReporter(stream)
+    if fmt == "sarif":
+        return SarifReporter(stream, rule_ids)
+    raise ValueError(f"Unknown output format: {fmt}")
@@ -0,0 +1,152 @@
+"""Key ordering policy shared by every ordering check and fixer.
+
+The built-in order can be replaced by a YAML file pointed to by the
+``COMPOSE_ORDER_POLICY`` environment variable::
+
+    root: [services, networks, configs, volumes, secrets]
+    service: [extends, image, ...]
+    nested: [...]  # optional, defaults to the service order
+"""
+
+import os
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+from compose_lib.yaml_backend import safe_load
+
+DEFAULT_ROOT_ORDER = ("services", "networks", "configs", "volumes", "secrets")
+DEFAULT_SERVICE_ORDER = (
+    "extends",
+    "image",
+    "build",
+    "container_name",
+    "hostname",
+    "environment",
+    "env_file",
+    "networks",
+    "network_mode",
+    "ports",
+    "expose",
+    "volumes",
+    "devices",
+    "configs",
+    "healthcheck",
+    "labels",
+    "restart",
+    "depends_on",
+    "mem_limit",
+    "memswap_limit",
+    "shm_size",
+    "cap_add",
+    "cap_drop",
+    "security_opt",
+    "privileged",
+    "sysctls",
+    "extra_hosts",
+    "command",
+    "entrypoint",
+    "working_dir",
+    "user",
+    "group_add",
+    "ulimits",
+    "logging",
+    "deploy",
+    "profiles",
+)
+
+
+class OrderingPolicy:
+    """Expected key orders compiled into key -> rank maps.
+
+    Unknown keys rank after every known key, so they keep their relative
+    order at the end of a mapping.
+    """
+
+    def __init__(
+        self,
+        root_order: Iterable[str] = DEFAULT_ROOT_ORDER,
+        service_order: Iterable[str] = DEFAULT_SERVICE_ORDER,
+        nested_order: Iterable[str] | None = None,
+    ) -> None:
+        self.root_order = tuple(root_order)
+        self.service_order = tuple(service_order)
+        self.nested_order = self.service_order if nested_order is None else tuple(nested_order)
+        self._root_ranks = {key: i for i, key in enumerate(self.root_order)}
+        self._service_ranks = {key: i for i, key in enumerate(self.service_order)}
+        self._nested_ranks = {key: i for i, key in enumerate(self.nested_order)}
+
+    def root_rank(self, key: str) -> int:
+        """Rank of a top-level key."""
+        return self._root_ranks.get(key, len(self.root_order))
+
+    def service_rank(self, key: str) -> int:
+        """Rank of a key directly inside a service."""
+        return self._service_ranks.get(key, len(self.service_order))
+
+    def nested_rank(self, key: str) -> int:
+        """Rank of a key inside a mapping nested in a service or root section."""
+        return self._nested_ranks.get(key, len(self.nested_order))
+
+    def __repr__(self) -> str:
+        return (
+            f"OrderingPolicy(root_order={self.root_order!r}, "
+            f"service_order={self.service_order!r}, nested_order={self.nested_order!r})"
+        )
+
+
+def first_inversion(keys: Sequence[str], ranks: Sequence[int]) -> tuple[str, str] | None:
+    """Find the first position where ``keys`` differs from its stable sort.
+
+    Returns ``(actual, expected)``: the key found there and the key a stable
+    sort by ``ranks`` would put there, or None when already ordered. Runs in
+    linear time using suffix minima instead of sorting.
+    """
+    count = len(keys)
+    if count < 2:
+        return None
+
+    # suffix_min[i]: index of the first key with the lowest rank in keys[i:]
+    suffix_min = [count - 1] * count
+    for i in range(count - 2, -1, -1):
+        best = suffix_min[i + 1]
+        suffix_min[i] = i if ranks[i] <= ranks[best] else best
+
+    for i in range(count):
+        best = suffix_min[i]
+        if ranks[best] < ranks[i]:
+            return keys[i], keys[best]
+    return None
+
+
+def load_policy(path: Path) -> OrderingPolicy:
+    """Load an ordering policy from a YAML file.
+
+    Raises:
+        ValueError: if the file does not describe lists of key names.
+    """
+    data = safe_load(path.read_text())
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a mapping with 'root' and 'service' lists")
+
+    orders: dict[str, list[str] | None] = {}
+    for section in ("root", "service", "nested"):
+        value = data.get(section)
+        if value is not None and (
+            not isinstance(value, list) or not all(isinstance(k, str) for k in value)
+        ):
+            raise ValueError(f"{path}: '{section}' must be a list of key names")
+        orders[section] = value
+
+    return OrderingPolicy(
+        orders["root"] or DEFAULT_ROOT_ORDER,
+        orders["service"] or DEFAULT_SERVICE_ORDER,
+        orders["nested"],
+    )
+
+
+def _active_policy() -> OrderingPolicy:
+    path = os.environ.get("COMPOSE_ORDER_POLICY")
+    return load_policy(Path(path)) if path else OrderingPolicy()
+
+
+POLICY = _active_policy()
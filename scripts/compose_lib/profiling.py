@@ -0,0 +1,125 @@
+"""Opt-in timers for the validation pipeline: phases, rules and slowest files.
+
+A disabled :class:`Profiler` does no timing at all; callers that sit on the
+hot path (the rule engine) check :attr:`Profiler.enabled` once per document
+and keep their plain loop otherwise.
+"""
+
+import heapq
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+DEFAULT_SLOWEST = 10
+
+
+@dataclass
+class Timing:
+    """Cumulative time spent in a phase or a rule."""
+
+    calls: int = 0
+    seconds: float = 0.0
+    findings: int = 0
+
+    def add(self, seconds: float, findings: int = 0) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.findings += findings
+
+
+class Profiler:
+    """Collect timings for one run; does nothing unless enabled."""
+
+    def __init__(self, enabled: bool = False, slowest: int = DEFAULT_SLOWEST) -> None:
+        self.enabled = enabled
+        self.slowest = slowest
+        self.phases: dict[str, Timing] = {}
+        self.rules: dict[str, Timing] = {}
+        # Min-heap of (seconds, path) holding the slowest files seen so far.
+        self._files: list[tuple[float, str]] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block and add it to the phase ``name``."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        """Add an already measured duration to a phase."""
+        self.phases.setdefault(name, Timing()).add(seconds)
+
+    def add_rule(self, rule_id: str, seconds: float, findings: int) -> None:
+        """Record one run of a rule and the number of findings it produced."""
+        self.rules.setdefault(rule_id, Timing()).add(seconds, findings)
+
+    def add_file(self, path: Path, seconds: float) -> None:
+        """Record the time spent on one file, keeping only the slowest ones."""
+        entry = (seconds, str(path))
+        if len(self._files) < self.slowest:
+            heapq.heappush(self._files, entry)
+        elif self._files and entry > self._files[0]:
+            heapq.heapreplace(self._files, entry)
+
+    def slowest_files(self) -> list[tuple[float, str]]:
+        """Return the slowest files, slowest first."""
+        return sorted(self._files, reverse=True)
+
+    def to_json(self) -> dict[str, Any]:
+        """JSON-serializable view of every timing, in seconds."""
+
+        def timings(table: dict[str, Timing]) -> dict[str, dict[str, Any]]:
+            return {
+                name: {"calls": t.calls, "seconds": t.seconds, "findings": t.findings}
+                for name, t in table.items()
+            }
+
+        return {
+            "total_seconds": time.perf_counter() - self._start,
+            "phases": timings(self.phases),
+            "rules": timings(self.rules),
+            "slowest_files": [
+                {"file": path, "seconds": seconds} for seconds, path in self.slowest_files()
+            ],
+        }
+
+    def format_table(self) -> str:
+        """Human-readable report: phases, rules and slowest files."""
+        total = time.perf_counter() - self._start
+        lines = [f"PROFILE (total {total * 1000:.1f} ms)", ""]
+
+        lines.append(f"  {'Phase':<24} {'Calls':>8} {'Total ms':>10} {'Share':>7}")
+        for name, t in sorted(self.phases.items(), key=lambda item: -item[1].seconds):
+            share = t.seconds / total * 100 if total else 0.0
+            lines.append(f"  {name:<24} {t.calls:>8} {t.seconds * 1000:>10.1f} {share:>6.1f}%")
+
+        lines += [
+            "",
+            f"  {'Rule':<24} {'Calls':>8} {'Findings':>9} {'Total ms':>10} {'Mean us':>9}",
+        ]
+        for name, t in sorted(self.rules.items(), key=lambda item: -item[1].seconds):
+            mean = t.seconds / t.calls * 1e6 if t.calls else 0.0
+            lines.append(
+                f"  {name:<24} {t.calls:>8} {t.findings:>9} {t.seconds * 1000:>10.1f} {mean:>9.1f}"
+            )
+
+        lines += ["", f"  Slowest files (top {self.slowest})"]
+        for seconds, path in self.slowest_files():
+            lines.append(f"  {seconds * 1000:>10.2f} ms  {path}")
+        return "\n".join(lines)
+
+    def render(self, fmt: str) -> str:
+        """Render the report as ``table`` or ``json``."""
+        if fmt == "json":
+            return json.dumps(self.to_json(), indent=2)
+        return self.format_table()
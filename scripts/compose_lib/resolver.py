@@ -0,0 +1,261 @@
+"""In-process equivalent of ``docker compose config`` for this repository.
+
+Resolves variable interpolation and ``extends`` the way Docker Compose does,
+so every stack can be checked in one Python process without a Docker CLI.
+"""
+
+import os
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from compose_lib.document import DocumentStore
+from compose_lib.extends import ExtendsError, ExtendsResolver, effective_services
+from compose_lib.rules import ERROR, WARNING, Finding
+
+# Placeholder values for the variables the stacks expect from their host
+# environment; shared with validate_compose.sh, which sources the same file.
+PLACEHOLDER_ENV_FILE = Path(__file__).resolve().parent.parent / "placeholder.env"
+
+_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_OPERATORS = (":-", ":?", ":+", "-", "?", "+")
+
+
+class InterpolationError(ValueError):
+    """Raised for malformed ``${...}`` expressions and unset required variables."""
+
+
+# --- Environment --------------------------------------------------------------
+
+
+def parse_env_file(path: Path) -> dict[str, str]:
+    """Read ``KEY=value`` lines, ignoring comments, ``export`` and surrounding quotes."""
+    env: dict[str, str] = {}
+    for raw in path.read_text().splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        key = key.removeprefix("export ").strip()
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        env[key] = value
+    return env
+
+
+def placeholder_env() -> dict[str, str]:
+    """Return the placeholder host environment used for validation."""
+    try:
+        return parse_env_file(PLACEHOLDER_ENV_FILE)
+    except FileNotFoundError:
+        return {}
+
+
+def project_env(project_dir: Path, base: Mapping[str, str] | None = None) -> dict[str, str]:
+    """Build the interpolation environment of a stack.
+
+    Like Docker Compose, values from the process environment win over the
+    project's ``.env`` file; the placeholders fill in anything still unset.
+    The committed ``.env.example`` stands in for a missing ``.env``.
+    """
+    env = placeholder_env() if base is None else dict(base)
+    dotenv = project_dotenv(project_dir)
+    if dotenv is not None:
+        env.update(parse_env_file(dotenv))
+    env.update(os.environ)
+    return env
+
+
+def project_dotenv(project_dir: Path) -> Path | None:
+    """Return the ``.env`` (or ``.env.example``) file of a stack, if any."""
+    for name in (".env", ".env.example"):
+        candidate = project_dir / name
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+# --- Interpolation ------------------------------------------------------------
+
+
+def _braced_end(text: str, start: int) -> int:
+    """Return the index of the ``}`` closing the expression opened before ``start``."""
+    depth = 1
+    i = start
+    while i < len(text):
+        if text.startswith("$$", i):
+            i += 2
+            continue
+        if text.startswith("${", i):
+            depth += 1
+            i += 2
+            continue
+        if text[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise InterpolationError(f"Invalid interpolation format: unclosed '${{' in {text!r}")
+
+
+def interpolate(text: str, env: Mapping[str, str], unset: set[str] | None = None) -> str:
+    """Substitute ``$VAR`` and ``${VAR...}`` expressions like Docker Compose.
+
+    Supports ``$$`` escapes and the ``:-``, ``-``, ``:?``, ``?``, ``:+`` and
+    ``+`` modifiers; defaults are interpolated recursively. Unset variables
+    without a default become empty strings and are added to ``unset``.
+
+    Raises:
+        InterpolationError: on malformed expressions or missing required variables.
+    """
+    if "$" not in text:
+        return text
+
+    out: list[str] = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char != "$":
+            out.append(char)
+            i += 1
+            continue
+
+        nxt = text[i + 1 : i + 2]
+        if nxt == "$":
+            out.append("$")
+            i += 2
+        elif nxt == "{":
+            end = _braced_end(text, i + 2)
+            out.append(_expand(text[i + 2 : end], env, unset, text))
+            i = end + 1
+        elif (match := _NAME.match(text, i + 1)) is not None:
+            out.append(_lookup(match.group(), env, unset))
+            i = match.end()
+        else:
+            out.append("$")
+            i += 1
+
+    return "".join(out)
+
+
+def _lookup(name: str, env: Mapping[str, str], unset: set[str] | None) -> str:
+    if name in env:
+        return env[name]
+    if unset is not None:
+        unset.add(name)
+    return ""
+
+
+def _expand(expr: str, env: Mapping[str, str], unset: set[str] | None, text: str) -> str:
+    match = _NAME.match(expr)
+    if match is None:
+        raise InterpolationError(f"Invalid interpolation format: '${{{expr}}}' in {text!r}")
+
+    name = match.group()
+    rest = expr[match.end() :]
+    if not rest:
+        return _lookup(name, env, unset)
+
+    operator = next((op for op in _OPERATORS if rest.startswith(op)), None)
+    if operator is None:
+        raise InterpolationError(f"Invalid interpolation format: '${{{expr}}}' in {text!r}")
+
+    word = rest[len(operator) :]
+    value = env.get(name)
+    present = value is not None and (value != "" or not operator.startswith(":"))
+
+    if operator.endswith("-"):
+        return value if present and value is not None else interpolate(word, env, unset)
+    if operator.endswith("+"):
+        return interpolate(word, env, unset) if present else ""
+    if not present or value is None:
+        message = interpolate(word, env, unset) or "required variable is missing a value"
+        raise InterpolationError(f"Required variable {name} is missing a value: {message}")
+    return value
+
+
+def interpolate_content(value: Any, env: Mapping[str, str], unset: set[str] | None = None) -> Any:
+    """Interpolate every string value (not key) of a parsed document."""
+    if isinstance(value, str):
+        return interpolate(value, env, unset)
+    if isinstance(value, dict):
+        return {key: interpolate_content(item, env, unset) for key, item in value.items()}
+    if isinstance(value, list):
+        return [interpolate_content(item, env, unset) for item in value]
+    return value
+
+
+@dataclass
+class ResolvedFile:
+    """Effective configuration of one compose file and what went wrong resolving it."""
+
+    path: Path
+    config: dict[str, Any] | None
+    findings: list[Finding] = field(default_factory=list)
+    unset: set[str] = field(default_factory=set)
+
+
+class Resolver:
+    """Resolve compose files to their effective configuration.
+
+    ``env`` replaces the per-project environment when given, which is handy
+    for tests and for tools comparing stacks under one environment.
+    """
+
+    def __init__(
+        self, store: DocumentStore | None = None, env: Mapping[str, str] | None = None
+    ) -> None:
+        self.store = store if store is not None else DocumentStore()
+        self.extends = ExtendsResolver(self.store)
+        self.env = env
+        self._placeholders = placeholder_env()
+
+    def environment(self, filepath: Path) -> dict[str, str]:
+        """Return the interpolation environment for a compose file."""
+        if self.env is not None:
+            return dict(self.env)
+        return project_env(filepath.parent, self._placeholders)
+
+    def resolve(self, filepath: Path) -> ResolvedFile:
+        """Apply every ``extends`` of a compose file, then interpolate it."""
+        result = ResolvedFile(filepath, None)
+        document = self.store.load(filepath)
+        if document.error is not None:
+            result.findings.append(Finding("parse", ERROR, document.error))
+            return result
+        if not isinstance(document.content, dict):
+            return result
+
+        # Merging before interpolating lets every stack share the memoized
+        # base services; keys are never interpolated, so the result is the same.
+        config = dict(document.content)
+        if isinstance(config.get("services"), dict):
+            services = effective_services(document, self.extends)
+            merged: dict[str, Any] = {}
+            for name, service in document.services.items():
+                try:
+                    merged[name] = services[name]
+                except ExtendsError as e:
+                    result.findings.append(Finding("extends", ERROR, str(e), service=name))
+                    merged[name] = service
+            config["services"] = merged
+
+        try:
+            config = interpolate_content(config, self.environment(filepath), result.unset)
+        except InterpolationError as e:
+            result.findings.append(Finding("interpolation", ERROR, str(e)))
+            return result
+
+        # Without a .env file there is nothing to compare against: every
+        # secret is expected to be missing on a development checkout.
+        if result.unset and project_dotenv(filepath.parent) is not None:
+            names = ", ".join(sorted(result.unset))
+            result.findings.append(
+                Finding("interpolation", WARNING, f"Unset variables default to blank: {names}")
+            )
+
+        result.config = config
+        return result
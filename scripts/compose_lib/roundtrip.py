@@ -0,0 +1,235 @@
+"""Minimal-diff text rewriting of YAML documents.
+
+Edits are computed from the node tree returned by ``yaml.compose`` and spliced
+into the original lines, so comments, quoting and formatting outside the
+touched entries are preserved byte for byte.
+
+Only block-style mappings whose keys start their own line can be edited;
+anything else raises :class:`RoundTripError`.
+"""
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import yaml
+
+from compose_lib.yaml_backend import SafeDumper, SafeLoader
+
+SortKey = Callable[[str], Any]
+OrderPlan = Callable[[yaml.Node], Iterable[tuple[yaml.MappingNode, SortKey]]]
+
+MAX_PASSES = 10_000
+
+
+class RoundTripError(ValueError):
+    """Raised when a document cannot be edited without reformatting it."""
+
+
+def compose(text: str) -> yaml.Node | None:
+    """Parse text into a node tree carrying source positions."""
+    node: yaml.Node | None = yaml.compose(text, Loader=SafeLoader)
+    return node
+
+
+def _split_lines(text: str) -> list[str]:
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    return lines
+
+
+def _is_trivia(line: str) -> bool:
+    stripped = line.strip()
+    return not stripped or stripped.startswith("#")
+
+
+def _last_line(node: yaml.Node) -> int:
+    """Return the index of the last source line holding part of ``node``."""
+    if isinstance(node, yaml.MappingNode) and not node.flow_style and node.value:
+        return _last_line(node.value[-1][1])
+    if isinstance(node, yaml.SequenceNode) and not node.flow_style and node.value:
+        return _last_line(node.value[-1])
+    end = node.end_mark
+    return end.line if end.column > 0 else end.line - 1
+
+
+def _check_block_mapping(lines: list[str], mapping: yaml.Node) -> yaml.MappingNode:
+    if not isinstance(mapping, yaml.MappingNode) or mapping.flow_style or not mapping.value:
+        raise RoundTripError("expected a non-empty block mapping")
+    for key, _ in mapping.value:
+        mark = key.start_mark
+        if lines[mark.line][: mark.column].strip():
+            raise RoundTripError(f"key on line {mark.line + 1} does not start its line")
+    return mapping
+
+
+def _segments(
+    lines: list[str], mapping: yaml.MappingNode
+) -> tuple[int, int, list[list[str]], list[list[str]]]:
+    """Split a block mapping into one line block per entry.
+
+    Comment lines between two entries belong to the entry below them, while
+    the blank lines right after an entry are separators that stay in place.
+    Returns the first line, the end line (exclusive), the entry blocks and
+    the separators following each block but the last.
+    """
+    starts = [key.start_mark.line for key, _ in mapping.value]
+    end = _last_line(mapping.value[-1][1]) + 1
+    segments: list[list[str]] = []
+    separators: list[list[str]] = []
+    lead: list[str] = []
+
+    for start, stop in zip(starts, [*starts[1:], end], strict=True):
+        chunk = lines[start:stop]
+        if stop == end:
+            segments.append(lead + chunk)
+            break
+
+        split = len(chunk)
+        while split > 1 and _is_trivia(chunk[split - 1]):
+            split -= 1
+        gap = split
+        while gap < len(chunk) and not chunk[gap].strip():
+            gap += 1
+        segments.append(lead + chunk[:split])
+        separators.append(chunk[split:gap])
+        lead = chunk[gap:]
+
+    return starts[0], end, segments, separators
+
+
+def _order(mapping: yaml.MappingNode, sort_key: SortKey) -> list[int] | None:
+    """Return the stable sorted order of the entries, or None if already sorted."""
+    ranks = [sort_key(str(key.value)) for key, _ in mapping.value]
+    if all(a <= b for a, b in zip(ranks, ranks[1:], strict=False)):
+        return None
+    return sorted(range(len(ranks)), key=ranks.__getitem__)
+
+
+def reorder_mappings(text: str, plan: OrderPlan) -> str:
+    """Reorder mapping entries in place, moving whole entry blocks.
+
+    ``plan`` receives the composed root node and yields the mappings to keep
+    sorted together with their sort key. Mappings already in order are left
+    untouched, so a correctly ordered document is returned unchanged.
+    """
+    for _ in range(MAX_PASSES):
+        root = compose(text)
+        if root is None:
+            return text
+
+        lines = _split_lines(text)
+        for mapping, sort_key in plan(root):
+            order = _order(mapping, sort_key)
+            if order is None:
+                continue
+            _check_block_mapping(lines, mapping)
+            first, end, segments, separators = _segments(lines, mapping)
+            reordered: list[str] = []
+            for position, index in enumerate(order):
+                reordered.extend(segments[index])
+                if position < len(separators):
+                    reordered.extend(separators[position])
+            text = "".join(lines[:first] + reordered + lines[end:])
+            break
+        else:
+            return text
+
+    raise RoundTripError("mapping order did not converge")
+
+
+def render_entry(key: str, value: Any, indent: int) -> list[str]:
+    """Render ``key: value`` as block YAML lines indented by ``indent`` spaces."""
+    dumped = yaml.dump(
+        {key: value},
+        Dumper=SafeDumper,
+        default_flow_style=False,
+        sort_keys=False,
+        allow_unicode=True,
+        width=120,
+    )
+    return [" " * indent + line for line in dumped.splitlines(keepends=True)]
+
+
+def _lookup(root: yaml.Node | None, path: tuple[str, ...]) -> yaml.Node:
+    node = root
+    for key in path:
+        if not isinstance(node, yaml.MappingNode):
+            raise RoundTripError(f"no mapping at {'.'.join(path)}")
+        for key_node, value_node in node.value:
+            if key_node.value == key:
+                node = value_node
+                break
+        else:
+            raise RoundTripError(f"key {'.'.join(path)} not found")
+    if node is None:
+        raise RoundTripError("empty document")
+    return node
+
+
+def locate(root: yaml.Node | None, path: tuple[str, ...]) -> tuple[int, int] | None:
+    """Return the 1-based line and column of the deepest node found along ``path``.
+
+    Mapping steps point at the key, sequence steps at the matching scalar item.
+    Returns None when not even the first step exists.
+    """
+    node = root
+    position: tuple[int, int] | None = None
+    for step in path:
+        if isinstance(node, yaml.MappingNode):
+            match = next(((k, v) for k, v in node.value if k.value == step), None)
+        elif isinstance(node, yaml.SequenceNode):
+            match = next(((item, item) for item in node.value if item.value == step), None)
+        else:
+            match = None
+        if match is None:
+            break
+        mark = match[0].start_mark
+        position = (mark.line + 1, mark.column + 1)
+        node = match[1]
+    return position
+
+
+def replace_entry(text: str, path: tuple[str, ...], value: Any) -> str:
+    """Replace the existing entry at ``path`` (key included) with ``value``."""
+    if not path:
+        raise RoundTripError("cannot replace the document root")
+
+    root = compose(text)
+    lines = _split_lines(text)
+    parent = _check_block_mapping(lines, _lookup(root, path[:-1]))
+
+    for key_node, value_node in parent.value:
+        if key_node.value == path[-1]:
+            start = key_node.start_mark.line
+            end = _last_line(value_node) + 1
+            rendered = render_entry(path[-1], value, key_node.start_mark.column)
+            return "".join(lines[:start] + rendered + lines[end:])
+
+    raise RoundTripError(f"key {'.'.join(path)} not found")
+
+
+def insert_entry(
+    text: str,
+    parent_path: tuple[str, ...],
+    key: str,
+    value: Any,
+    after: str | None = None,
+) -> str:
+    """Add a new ``key: value`` entry to the mapping at ``parent_path``.
+
+    The entry goes right after the sibling named ``after`` when there is one,
+    otherwise at the end of the mapping.
+    """
+    root = compose(text)
+    lines = _split_lines(text)
+    parent = _check_block_mapping(lines, _lookup(root, parent_path))
+
+    position = _last_line(parent) + 1
+    for key_node, value_node in parent.value:
+        if key_node.value == after:
+            position = _last_line(value_node) + 1
+            break
+
+    rendered = render_entry(key, value, parent.value[0][0].start_mark.column)
+    return "".join(lines[:position] + rendered + lines[position:])
@@ -0,0 +1,467 @@
+"""Check and fix rules applied to parsed compose documents."""
+
+import logging
+from collections.abc import Callable, Collection, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+import yaml
+
+from compose_lib.document import ComposeDocument
+from compose_lib.extends import ExtendsError, effective_services
+from compose_lib.infrastructure import infrastructure_networks
+from compose_lib.policy import POLICY, first_inversion
+from compose_lib.roundtrip import (
+    RoundTripError,
+    SortKey,
+    insert_entry,
+    reorder_mappings,
+    replace_entry,
+)
+
+logger = logging.getLogger(__name__)
+
+ERROR = "error"
+WARNING = "warning"
+
+
+@dataclass(frozen=True)
+class Finding:
+    """A single problem reported by a rule.
+
+    ``key_path`` points at the offending node (e.g. ``("services", "sonarr",
+    "image")``); the engine turns it into a 1-based ``line``/``column``.
+    """
+
+    rule_id: str
+    severity: str
+    message: str
+    service: str | None = None
+    key_path: tuple[str, ...] = ()
+    line: int | None = None
+    column: int | None = None
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A read-only check run against every document."""
+
+    rule_id: str
+    check: Callable[[ComposeDocument], list[Finding]]
+
+
+@dataclass(frozen=True)
+class FixRule:
+    """An in-place rewrite of a document; returns True when it changed something."""
+
+    rule_id: str
+    fix: Callable[[ComposeDocument], bool]
+
+
+# --- Ordering -----------------------------------------------------------------
+
+
+def check_root_keys_order(content: dict[str, Any]) -> list[Finding]:
+    """Check if root keys are in correct order with services first."""
+    findings: list[Finding] = []
+    root_keys = list(content.keys())
+
+    inversion = first_inversion(root_keys, [POLICY.root_rank(key) for key in root_keys])
+    if inversion is not None:
+        expected_order = sorted(root_keys, key=POLICY.root_rank)
+        findings.append(
+            Finding(
+                "root-order",
+                ERROR,
+                f"Root keys order incorrect: {root_keys} should be {expected_order}",
+                key_path=(inversion[0],),
+            )
+        )
+
+    if root_keys[0] != "services":
+        findings.append(
+            Finding(
+                "root-order",
+                ERROR,
+                f"First root key should be 'services', got '{root_keys[0]}'",
+                key_path=(root_keys[0],),
+            )
+        )
+
+    return findings
+
+
+def check_service_keys_order(service_name: str, service_config: dict[str, Any]) -> list[Finding]:
+    """Check if service keys are in correct order."""
+    if not isinstance(service_config, dict):
+        return []
+
+    keys = list(service_config.keys())
+    inversion = first_inversion(keys, [POLICY.service_rank(key) for key in keys])
+    if inversion is None:
+        return []
+
+    actual, expected = inversion
+    return [
+        Finding(
+            "service-order",
+            ERROR,
+            f"Service '{service_name}': key '{actual}' should come after '{expected}'",
+            service=service_name,
+            key_path=("services", service_name, actual),
+        )
+    ]
+
+
+def sort_dict_keys(d: dict[str, Any]) -> dict[str, Any]:
+    """Sort dictionary keys according to the nested key order."""
+    if not isinstance(d, dict):
+        return d
+    return {k: d[k] for k in sorted(d.keys(), key=POLICY.nested_rank)}
+
+
+def fix_service(service_config: dict[str, Any]) -> dict[str, Any]:
+    """Fix key ordering in a service configuration."""
+    if not isinstance(service_config, dict):
+        return service_config
+
+    sorted_service: dict[str, Any] = {}
+
+    for key in sorted(service_config.keys(), key=POLICY.service_rank):
+        value = service_config[key]
+
+        if isinstance(value, dict):
+            sorted_service[key] = sort_dict_keys(value)
+        else:
+            sorted_service[key] = value
+
+    return sorted_service
+
+
+def sort_content(content: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of a compose document with every mapping in the expected order."""
+    fixed_content: dict[str, Any] = {}
+
+    for key in sorted(content.keys(), key=POLICY.root_rank):
+        value = content[key]
+
+        if key == "services" and isinstance(value, dict):
+            fixed_content[key] = {name: fix_service(value[name]) for name in sorted(value.keys())}
+        elif isinstance(value, dict):
+            fixed_content[key] = sort_dict_keys(value)
+        else:
+            fixed_content[key] = value
+
+    return fixed_content
+
+
+def key_order_plan(root: yaml.Node) -> Iterator[tuple[yaml.MappingNode, SortKey]]:
+    """Yield the mappings :func:`sort_content` orders, with their sort keys."""
+    if not isinstance(root, yaml.MappingNode):
+        return
+
+    yield root, POLICY.root_rank
+
+    for key_node, value in root.value:
+        if not isinstance(value, yaml.MappingNode):
+            continue
+        if key_node.value != "services":
+            yield value, POLICY.nested_rank
+            continue
+
+        yield value, str
+        for _, service in value.value:
+            if isinstance(service, yaml.MappingNode):
+                yield service, POLICY.service_rank
+                for _, child in service.value:
+                    if isinstance(child, yaml.MappingNode):
+                        yield child, POLICY.nested_rank
+
+
+def fix_key_order(document: ComposeDocument) -> bool:
+    """Move out-of-order entries into the expected order, keeping the rest of the text.
+
+    Raises:
+        RoundTripError: If the entries cannot be moved without reformatting the file.
+    """
+    if not document.content:
+        return False
+
+    text = reorder_mappings(document.text, key_order_plan)
+    if text == document.text:
+        return False
+
+    document.replace_text(text)
+    return True
+
+
+def _root_order_rule(document: ComposeDocument) -> list[Finding]:
+    assert document.content is not None
+    return check_root_keys_order(document.content)
+
+
+def _service_order_rule(document: ComposeDocument) -> list[Finding]:
+    findings: list[Finding] = []
+    for service_name, service_config in document.services.items():
+        findings.extend(check_service_keys_order(service_name, service_config))
+    return findings
+
+
+# --- Networks -----------------------------------------------------------------
+
+
+def get_networks_used_by_services(content: dict[str, Any]) -> set[str]:
+    """Extract all network names used by services in the compose file."""
+    networks_used: set[str] = set()
+    services = content.get("services", {})
+
+    if isinstance(services, dict):
+        for service_config in services.values():
+            if isinstance(service_config, dict):
+                service_networks = service_config.get("networks", {})
+                if isinstance(service_networks, list):
+                    networks_used.update(service_networks)
+                elif isinstance(service_networks, dict):
+                    networks_used.update(service_networks.keys())
+
+    return networks_used
+
+
+def missing_external_networks(
+    content: dict[str, Any], networks: Collection[str] | None = None
+) -> list[str]:
+    """Return the infrastructure networks used by services but not declared external."""
+    if networks is None:
+        networks = infrastructure_networks()
+
+    root_networks = content.get("networks")
+    defined = root_networks if isinstance(root_networks, dict) else {}
+    used = get_networks_used_by_services(content)
+    return sorted(
+        name for name in used.intersection(networks) if not _is_external(defined.get(name))
+    )
+
+
+def check_networks_usage(
+    document: ComposeDocument, networks: Collection[str] | None = None
+) -> list[Finding]:
+    """Check networks usage - infrastructure networks must be defined as external."""
+    findings: list[Finding] = []
+    content = document.content
+
+    # Skip infrastructure file - it's supposed to define networks
+    if not content or document.is_infrastructure:
+        return findings
+
+    if networks is None:
+        networks = infrastructure_networks()
+
+    root_networks = content.get("networks", {})
+    if not isinstance(root_networks, dict):
+        root_networks = {}
+
+    for net_name in missing_external_networks(content, networks):
+        if net_name not in root_networks:
+            findings.append(
+                Finding(
+                    "networks",
+                    ERROR,
+                    f"Network '{net_name}' is used by services but not defined at root level "
+                    f"(must be defined with external: true)",
+                    key_path=("networks",) if "networks" in content else ("services",),
+                )
+            )
+        else:
+            findings.append(
+                Finding(
+                    "networks",
+                    ERROR,
+                    f"Network '{net_name}' must be defined with external: true "
+                    f"(managed by infrastructure stack)",
+                    key_path=("networks", net_name),
+                )
+            )
+
+    # Check for unknown networks in services
+    for service_name, service_config in document.services.items():
+        if isinstance(service_config, dict) and "networks" in service_config:
+            service_networks = service_config["networks"]
+            if isinstance(service_networks, dict):
+                for net_name in service_networks:
+                    if net_name not in networks and net_name != "default":
+                        findings.append(
+                            Finding(
+                                "networks",
+                                ERROR,
+                                f"Service '{service_name}' uses unknown network '{net_name}'",
+                                service=service_name,
+                                key_path=("services", service_name, "networks", net_name),
+                            )
+                        )
+
+    return findings
+
+
+def _is_external(definition: Any) -> bool:
+    return isinstance(definition, dict) and definition.get("external") is True
+
+
+def ensure_external_networks(
+    document: ComposeDocument, networks: Collection[str] | None = None
+) -> bool:
+    """Define every infrastructure network used by services as external."""
+    content = document.content
+    if not content:
+        return False
+
+    root_networks = content.get("networks")
+    defined = root_networks if isinstance(root_networks, dict) else {}
+    to_fix = missing_external_networks(content, networks)
+    if not to_fix:
+        return False
+
+    text = document.text
+    try:
+        if not isinstance(root_networks, dict) or not root_networks:
+            # Missing, empty or flow-style section: write the whole section.
+            merged = dict(root_networks or {})
+            merged.update({name: {"external": True} for name in to_fix})
+            if "networks" in content:
+                text = replace_entry(text, ("networks",), merged)
+            else:
+                text = insert_entry(text, (), "networks", merged, after="services")
+        else:
+            for name in to_fix:
+                if name in root_networks:
+                    text = replace_entry(text, ("networks", name), {"external": True})
+                else:
+                    text = insert_entry(text, ("networks",), name, {"external": True})
+    except RoundTripError as e:
+        logger.warning("Cannot update networks of %s in place: %s", document.path, e)
+        return False
+
+    for name in to_fix:
+        if name in defined:
+            logger.info("Updated network '%s' to external in %s", name, document.path)
+        else:
+            logger.info("Added external network '%s' to %s", name, document.path)
+
+    document.replace_text(text)
+    return True
+
+
+# --- Extends ------------------------------------------------------------------
+
+
+def check_extends_usage(document: ComposeDocument) -> list[Finding]:
+    """Check if services use extends from common.yml."""
+    findings: list[Finding] = []
+
+    if document.is_infrastructure:
+        return findings
+
+    for service_name, service_config in document.services.items():
+        if not isinstance(service_config, dict):
+            continue
+
+        path = ("services", service_name)
+        if "extends" not in service_config:
+            findings.append(
+                Finding(
+                    "extends",
+                    WARNING,
+                    f"Service '{service_name}' does not use extends (optional but recommended)",
+                    service=service_name,
+                    key_path=path,
+                )
+            )
+        elif isinstance(service_config["extends"], dict):
+            extends = service_config["extends"]
+            if extends.get("file") != "../common.yml":
+                file_val = extends.get("file")
+                findings.append(
+                    Finding(
+                        "extends",
+                        ERROR,
+                        f"Service '{service_name}' extends wrong file: {file_val}",
+                        service=service_name,
+                        key_path=(*path, "extends", "file"),
+                    )
+                )
+            if extends.get("service") != "common-config":
+                svc_val = extends.get("service")
+                findings.append(
+                    Finding(
+                        "extends",
+                        ERROR,
+                        f"Service '{service_name}' extends wrong service: {svc_val}",
+                        service=service_name,
+                        key_path=(*path, "extends", "service"),
+                    )
+                )
+
+    return findings
+
+
+# --- Effective configuration -------------------------------------------------
+
+NO_NEW_PRIVILEGES = "no-new-privileges:true"
+
+
+def check_effective_defaults(document: ComposeDocument) -> list[Finding]:
+    """Check the settings every service should end up with, set or inherited."""
+    findings: list[Finding] = []
+
+    if document.is_infrastructure:
+        return findings
+
+    services = effective_services(document)
+    for service_name in document.services:
+        try:
+            service = services[service_name]
+        except ExtendsError as e:
+            # Broken extends references are reported by the extends rule.
+            logger.debug("Skipping %s in %s: %s", service_name, document.path, e)
+            continue
+
+        path = ("services", service_name)
+        if "restart" not in service:
+            findings.append(
+                Finding(
+                    "effective-config",
+                    WARNING,
+                    f"Service '{service_name}' has no restart policy, set or inherited",
+                    service=service_name,
+                    key_path=path,
+                )
+            )
+        if NO_NEW_PRIVILEGES not in (service.get("security_opt") or []):
+            findings.append(
+                Finding(
+                    "effective-config",
+                    WARNING,
+                    f"Service '{service_name}' does not get security_opt {NO_NEW_PRIVILEGES}",
+                    service=service_name,
+                    key_path=path,
+                )
+            )
+
+    return findings
+
+
+ROOT_ORDER_RULE = Rule("root-order", _root_order_rule)
+SERVICE_ORDER_RULE = Rule("service-order", _service_order_rule)
+NETWORKS_RULE = Rule("networks", check_networks_usage)
+EXTENDS_RULE = Rule("extends", check_extends_usage)
+# Opt-in, e.g. RuleEngine(rules=(*DEFAULT_RULES, EFFECTIVE_CONFIG_RULE)).
+EFFECTIVE_CONFIG_RULE = Rule("effective-config", check_effective_defaults)
+
+DEFAULT_RULES: tuple[Rule, ...] = (
+    ROOT_ORDER_RULE,
+    SERVICE_ORDER_RULE,
+    NETWORKS_RULE,
+    EXTENDS_RULE,
+)
+
+KEY_ORDER_FIXER = FixRule("key-order", fix_key_order)
+EXTERNAL_NETWORKS_FIXER = FixRule("external-networks", ensure_external_networks)
@@ -0,0 +1,219 @@
+"""Structural checks on an effective compose configuration.
+
+These cover the mistakes ``docker compose config`` rejects: unknown keys,
+wrong value types and references to undefined services, networks or volumes.
+"""
+
+import re
+from pathlib import Path
+from typing import Any
+
+from compose_lib.rules import ERROR, WARNING, Finding
+
+ROOT_KEYS = {"version", "name", "include", "services", "networks", "volumes", "configs", "secrets"}
+
+SERVICE_KEYS = {
+    "annotations", "attach", "blkio_config", "build", "cap_add", "cap_drop", "cgroup",
+    "cgroup_parent", "command", "configs", "container_name", "cpu_count", "cpu_percent",
+    "cpu_period", "cpu_quota", "cpu_rt_period", "cpu_rt_runtime", "cpu_shares", "cpus",
+    "cpuset", "credential_spec", "depends_on", "deploy", "develop", "device_cgroup_rules",
+    "devices", "dns", "dns_opt", "dns_search", "domainname", "entrypoint", "env_file",
+    "environment", "expose", "extends", "external_links", "extra_hosts", "gpus", "group_add",
+    "healthcheck", "hostname", "image", "init", "ipc", "isolation", "label_file", "labels",
+    "links", "logging", "mac_address", "mem_limit", "mem_reservation", "mem_swappiness",
+    "memswap_limit", "models", "network_mode", "networks", "oom_kill_disable",
+    "oom_score_adj", "pid", "pids_limit", "platform", "ports", "post_start", "pre_stop",
+    "privileged", "profiles", "provider", "pull_policy", "read_only", "restart", "runtime",
+    "scale", "secrets", "security_opt", "shm_size", "stdin_open", "stop_grace_period",
+    "stop_signal", "storage_opt", "sysctls", "tmpfs", "tty", "ulimits", "use_api_socket",
+    "user", "userns_mode", "uts", "volumes", "volumes_from", "working_dir",
+}  # fmt: skip
+
+_STR = (str,)
+_LIST_OR_DICT = (list, dict)
+_STR_OR_LIST = (str, list)
+_SIZE = (str, int)
+
+SERVICE_TYPES: dict[str, tuple[type, ...]] = {
+    "image": _STR,
+    "container_name": _STR,
+    "hostname": _STR,
+    "network_mode": _STR,
+    "user": _STR,
+    "working_dir": _STR,
+    "restart": _STR,
+    "build": (str, dict),
+    "environment": _LIST_OR_DICT,
+    "labels": _LIST_OR_DICT,
+    "networks": _LIST_OR_DICT,
+    "depends_on": _LIST_OR_DICT,
+    "sysctls": _LIST_OR_DICT,
+    "extra_hosts": _LIST_OR_DICT,
+    "env_file": _STR_OR_LIST,
+    "command": _STR_OR_LIST,
+    "entrypoint": _STR_OR_LIST,
+    "dns": _STR_OR_LIST,
+    "tmpfs": _STR_OR_LIST,
+    "ports": (list,),
+    "expose": (list,),
+    "volumes": (list,),
+    "devices": (list,),
+    "cap_add": (list,),
+    "cap_drop": (list,),
+    "security_opt": (list,),
+    "group_add": (list,),
+    "profiles": (list,),
+    "healthcheck": (dict,),
+    "logging": (dict,),
+    "deploy": (dict,),
+    "ulimits": (dict,),
+    "privileged": (bool,),
+    "read_only": (bool,),
+    "init": (bool,),
+    "tty": (bool,),
+    "stdin_open": (bool,),
+    "mem_limit": _SIZE,
+    "memswap_limit": _SIZE,
+    "shm_size": _SIZE,
+}
+
+RESTART_POLICIES = re.compile(r"no|always|unless-stopped|on-failure(:\d+)?")
+DURATION = re.compile(r"(\d+(\.\d+)?(ns|us|ms|s|m|h))+")
+HEALTHCHECK_DURATIONS = ("interval", "timeout", "start_period", "start_interval")
+
+
+def _type_name(types: tuple[type, ...]) -> str:
+    names = {str: "string", list: "list", dict: "mapping", bool: "boolean", int: "integer"}
+    return " or ".join(names[t] for t in types)
+
+
+def _names(value: Any) -> list[str]:
+    """Keys of a mapping or items of a list, as used by networks/depends_on."""
+    if isinstance(value, dict):
+        return [str(key) for key in value]
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return []
+
+
+def _named_volume(item: Any) -> str | None:
+    """Return the named volume a service mount uses, if any."""
+    if isinstance(item, dict):
+        source = item.get("source")
+        return source if item.get("type", "volume") == "volume" and source else None
+    source, sep, _ = str(item).partition(":")
+    if not sep or source.startswith((".", "/", "~", "$")):
+        return None
+    return source
+
+
+def _env_files(value: Any) -> list[tuple[str, bool]]:
+    entries = [value] if isinstance(value, str) else value or []
+    files: list[tuple[str, bool]] = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            files.append((str(entry.get("path")), entry.get("required", True) is not False))
+        else:
+            files.append((str(entry), True))
+    return files
+
+
+def check_service(
+    name: str, service: Any, config: dict[str, Any], project_dir: Path
+) -> list[Finding]:
+    """Check one effective service definition against the compose model."""
+    if not isinstance(service, dict):
+        return [Finding("schema", ERROR, f"Service '{name}' must be a mapping", service=name)]
+
+    findings: list[Finding] = []
+
+    def error(message: str, *key_path: str) -> None:
+        path = ("services", name, *key_path)
+        findings.append(Finding("schema", ERROR, message, service=name, key_path=path))
+
+    for key, value in service.items():
+        if key not in SERVICE_KEYS and not key.startswith("x-"):
+            error(f"Service '{name}': unsupported key '{key}'", key)
+        elif key in SERVICE_TYPES and not isinstance(value, SERVICE_TYPES[key]):
+            expected = _type_name(SERVICE_TYPES[key])
+            error(f"Service '{name}': '{key}' must be a {expected}", key)
+
+    if "image" not in service and "build" not in service:
+        error(f"Service '{name}' has neither an image nor a build context")
+
+    restart = service.get("restart")
+    if isinstance(restart, str) and not RESTART_POLICIES.fullmatch(restart):
+        error(f"Service '{name}': invalid restart policy '{restart}'", "restart")
+
+    healthcheck = service.get("healthcheck")
+    if isinstance(healthcheck, dict):
+        for key in HEALTHCHECK_DURATIONS:
+            value = healthcheck.get(key)
+            if value is not None and not DURATION.fullmatch(str(value)):
+                error(f"Service '{name}': invalid healthcheck {key} '{value}'", "healthcheck", key)
+
+    services = config.get("services") or {}
+    for dependency in _names(service.get("depends_on")):
+        if dependency not in services:
+            error(f"Service '{name}' depends on undefined service '{dependency}'", "depends_on")
+
+    network_mode = service.get("network_mode")
+    if isinstance(network_mode, str):
+        if network_mode.startswith("service:") and network_mode[8:] not in services:
+            error(f"Service '{name}' uses network of undefined service '{network_mode[8:]}'")
+        if "networks" in service:
+            error(f"Service '{name}': 'network_mode' and 'networks' cannot be combined")
+
+    defined_networks = config.get("networks") or {}
+    for network in _names(service.get("networks")):
+        if network != "default" and network not in defined_networks:
+            error(f"Service '{name}' refers to undefined network '{network}'", "networks")
+
+    defined_volumes = config.get("volumes") or {}
+    if isinstance(service.get("volumes"), list):
+        for item in service["volumes"]:
+            volume = _named_volume(item)
+            if volume is not None and volume not in defined_volumes:
+                error(f"Service '{name}' refers to undefined volume '{volume}'", "volumes")
+
+    for env_file, required in _env_files(service.get("env_file")):
+        if required and not (project_dir / env_file).is_file():
+            findings.append(
+                Finding(
+                    "env-file",
+                    WARNING,
+                    f"Service '{name}': env_file {env_file} not found",
+                    service=name,
+                    key_path=("services", name, "env_file"),
+                )
+            )
+
+    return findings
+
+
+def check_config(config: dict[str, Any], project_dir: Path) -> list[Finding]:
+    """Check an effective compose configuration."""
+    findings: list[Finding] = []
+
+    for key in config:
+        if key not in ROOT_KEYS and not str(key).startswith("x-"):
+            findings.append(
+                Finding("schema", ERROR, f"Unsupported top-level key '{key}'", key_path=(key,))
+            )
+
+    for section in ("networks", "volumes", "configs", "secrets"):
+        value = config.get(section)
+        if value is not None and not isinstance(value, dict):
+            findings.append(
+                Finding("schema", ERROR, f"'{section}' must be a mapping", key_path=(section,))
+            )
+
+    services = config.get("services")
+    if not isinstance(services, dict):
+        findings.append(Finding("schema", ERROR, "'services' must be a mapping"))
+        return findings
+
+    for name, service in services.items():
+        findings.extend(check_service(name, service, config, project_dir))
+
+    return findings
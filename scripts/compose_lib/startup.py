@@ -0,0 +1,211 @@
+"""Cross-stack startup order, in waves of stacks that can start together.
+
+A stack depends on another when it uses a network the other creates, shares
+the network namespace of one of its containers (``network_mode:
+container:x``), or reaches one of its containers by name from its
+environment (e.g. ``DOCKER_HOST=tcp://socket-proxy:2375``). Environment
+values are interpolated with the stack's ``.env`` like Docker Compose does;
+a variable it leaves unset takes the literal value the other stacks agree
+on, e.g. ``DOCKER_HOST=${DOCKER_HOST}`` the socket proxy. Dependencies
+inside a stack, such as ``network_mode: service:gluetun`` with
+``depends_on: condition: service_healthy``, are left to Docker Compose,
+which already honours them. A provider only has to be healthy, rather than
+just started, when one of its dependents needs it.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from compose_lib.document import DocumentStore
+from compose_lib.extends import ExtendsError, effective_services
+from compose_lib.index import ServiceRef
+from compose_lib.resolver import InterpolationError, interpolate, placeholder_env, project_env
+
+logger = logging.getLogger(__name__)
+
+# A bare value, the host of a URL or the host of a host:port pair.
+_HOST = re.compile(r"(?:^|://|@)([A-Za-z0-9][A-Za-z0-9_.-]*)(?=:\d|/|$)")
+
+
+class StartupCycleError(ValueError):
+    """Raised when stacks depend on each other in a cycle."""
+
+
+@dataclass(frozen=True, order=True)
+class Dependency:
+    """Why ``stack`` has to start after ``provider``."""
+
+    stack: Path
+    provider: Path
+    reason: str
+    # True when the provider has to be healthy, not just started.
+    healthy: bool
+
+
+@dataclass
+class StartupGraph:
+    """Stacks and the cross-stack dependencies between them."""
+
+    stacks: list[Path] = field(default_factory=list)
+    dependencies: dict[Path, list[Dependency]] = field(default_factory=lambda: defaultdict(list))
+
+    def providers(self, stack: Path) -> set[Path]:
+        """Stacks that must be up before ``stack`` starts."""
+        return {dependency.provider for dependency in self.dependencies.get(stack, [])}
+
+    def needs_health(self, stack: Path) -> bool:
+        """Whether a dependent waits for ``stack`` to be healthy."""
+        return any(
+            dependency.healthy and dependency.provider == stack
+            for dependencies in self.dependencies.values()
+            for dependency in dependencies
+        )
+
+
+def _healthchecked(service: dict[str, Any]) -> bool:
+    healthcheck = service.get("healthcheck")
+    return isinstance(healthcheck, dict) and not healthcheck.get("disable")
+
+
+def _environment(service: dict[str, Any]) -> dict[str, str]:
+    environment = service.get("environment")
+    if isinstance(environment, dict):
+        return {str(k): str(v) for k, v in environment.items() if v is not None}
+    if isinstance(environment, list):
+        return dict(str(item).partition("=")[::2] for item in environment)
+    return {}
+
+
+def _repository_defaults(services: Iterable[dict[str, Any]]) -> dict[str, str]:
+    """Variables that every service setting them gives the same literal value."""
+    values: dict[str, set[str]] = defaultdict(set)
+    for service in services:
+        for name, value in _environment(service).items():
+            if "$" not in value:
+                values[name].add(value)
+    return {name: next(iter(found)) for name, found in values.items() if len(found) == 1}
+
+
+def _owned_networks(content: dict[str, Any]) -> set[str]:
+    networks = content.get("networks")
+    if not isinstance(networks, dict):
+        return set()
+    owned = set()
+    for key, definition in networks.items():
+        definition = definition if isinstance(definition, dict) else {}
+        if not definition.get("external"):
+            owned.add(str(definition.get("name") or key))
+    return owned
+
+
+def _external_networks(content: dict[str, Any]) -> set[str]:
+    networks = content.get("networks")
+    if not isinstance(networks, dict):
+        return set()
+    return {
+        str(definition.get("name") or key)
+        for key, definition in networks.items()
+        if isinstance(definition, dict) and definition.get("external")
+    }
+
+
+def build_startup_graph(
+    compose_files: Iterable[Path], store: DocumentStore | None = None
+) -> StartupGraph:
+    """Find the dependencies between the stacks of the given compose files."""
+    store = store if store is not None else DocumentStore()
+    graph = StartupGraph()
+    services: dict[ServiceRef, dict[str, Any]] = {}
+    network_owners: dict[str, Path] = {}
+    # Other stacks can only reach a container by its name.
+    containers: dict[str, ServiceRef] = {}
+
+    for filepath in compose_files:
+        document = store.load(filepath)
+        graph.stacks.append(filepath)
+        if not isinstance(document.content, dict):
+            continue
+        for network in _owned_networks(document.content):
+            network_owners.setdefault(network, filepath)
+        resolved = effective_services(document)
+        for name in document.services:
+            try:
+                service = resolved[name]
+            except ExtendsError as e:
+                logger.debug("Planning %s in %s without extends: %s", name, filepath, e)
+                service = document.services[name]
+            if not isinstance(service, dict):
+                continue
+            ref = ServiceRef(filepath, name)
+            services[ref] = service
+            if isinstance(service.get("container_name"), str):
+                containers[service["container_name"]] = ref
+
+    found: set[Dependency] = set()
+
+    def depend(stack: Path, provider: ServiceRef, reason: str, needs_running: bool) -> None:
+        if provider.path != stack:
+            healthy = needs_running and _healthchecked(services[provider])
+            found.add(Dependency(stack, provider.path, reason, healthy))
+
+    for filepath in graph.stacks:
+        document = store.load(filepath)
+        if isinstance(document.content, dict):
+            for network in sorted(_external_networks(document.content)):
+                owner = network_owners.get(network)
+                if owner is not None and owner != filepath:
+                    found.add(Dependency(filepath, owner, f"network {network}", False))
+
+    placeholders = placeholder_env()
+    defaults = _repository_defaults(services.values())
+    environments: dict[Path, dict[str, str]] = {}
+    for ref, service in services.items():
+        mode = service.get("network_mode")
+        if isinstance(mode, str) and mode.startswith("container:"):
+            provider = containers.get(mode.partition(":")[2])
+            if provider is not None:
+                depend(ref.path, provider, f"{ref.service} network_mode {mode}", True)
+
+        env = environments.setdefault(
+            ref.path, {**defaults, **project_env(ref.path.parent, placeholders)}
+        )
+        for value in _environment(service).values():
+            try:
+                value = interpolate(value, env)
+            except InterpolationError as e:
+                logger.debug("Cannot interpolate %s in %s: %s", value, ref, e)
+                continue
+            for host in _HOST.findall(value):
+                provider = containers.get(host)
+                if provider is not None:
+                    depend(ref.path, provider, f"{ref.service} reaches {host}", True)
+
+    for dependency in sorted(found):
+        graph.dependencies[dependency.stack].append(dependency)
+    return graph
+
+
+def startup_waves(graph: StartupGraph) -> list[list[Path]]:
+    """Group the stacks in waves; each wave only depends on earlier ones.
+
+    Raises:
+        StartupCycleError: if some stacks depend on each other in a cycle.
+    """
+    pending = {stack: graph.providers(stack) & set(graph.stacks) for stack in graph.stacks}
+    waves = []
+    while pending:
+        wave = sorted(stack for stack, providers in pending.items() if not providers)
+        if not wave:
+            cycle = ", ".join(str(stack) for stack in sorted(pending))
+            raise StartupCycleError(f"Stacks depend on each other in a cycle: {cycle}")
+        waves.append(wave)
+        for stack in wave:
+            del pending[stack]
+        for providers in pending.values():
+            providers.difference_update(wave)
+    return waves
@@ -0,0 +1,144 @@
+"""Synthetic repositories of compose stacks for benchmarks.
+
+Stacks are modelled on the real ones: ``extends`` of ``common-config``,
+infrastructure networks, Traefik labels, healthchecks, memory limits and an
+occasional database sidecar. A fraction of them is deliberately out of
+order or missing an external network so the fixers have work to do.
+Generation is deterministic for a given seed.
+"""
+
+import logging
+import random
+import shutil
+from pathlib import Path
+
+from compose_lib.infrastructure import INFRASTRUCTURE_FILE
+
+logger = logging.getLogger(__name__)
+
+COMMON_CONFIG = """---
+services:
+  common-config:
+    environment:
+      - PUID=${PUID}
+      - PGID=${PGID}
+      - TZ=${TZ}
+    restart: unless-stopped
+    security_opt:
+      - no-new-privileges:true
+"""
+
+# Share of stacks with keys out of order / with an undeclared external network.
+UNORDERED_RATIO = 0.2
+MISSING_NETWORK_RATIO = 0.2
+DATABASE_RATIO = 0.25
+
+
+def _app_service(index: int, port: int, unordered: bool) -> list[str]:
+    name = f"app{index:05d}"
+    head = [
+        "    extends:",
+        "      file: ../common.yml",
+        "      service: common-config",
+        f"    image: example/{name}:latest",
+    ]
+    if unordered:
+        # image before extends: flagged by the service order rule.
+        head = head[3:] + head[:3]
+
+    return [
+        f"  {name}:",
+        *head,
+        f"    container_name: {name}",
+        "    networks:",
+        "      - proxy",
+        "      - media_int",
+        "    volumes:",
+        f"      - /opt/{name}/config:/config",
+        "      - ${MEDIA}:/media",
+        "    healthcheck:",
+        f"      test: [CMD, curl, -f, 'http://localhost:{port}/']",
+        "      interval: 60s",
+        "      timeout: 10s",
+        "      retries: 3",
+        "      start_period: 30s",
+        "    labels:",
+        "      - traefik.enable=true",
+        "      - traefik.docker.network=proxy",
+        f"      - traefik.http.routers.{name}-secure.entrypoints=https",
+        f"      - traefik.http.routers.{name}-secure.rule=Host(`{name}.${{DOMAIN}}`)",
+        f"      - traefik.http.routers.{name}-secure.tls=true",
+        f"      - traefik.http.routers.{name}-secure.tls.certresolver=cloudflare",
+        f"      - traefik.http.routers.{name}-secure.service={name}",
+        f"      - traefik.http.services.{name}.loadbalancer.server.port={port}",
+        "    mem_limit: 512M",
+    ]
+
+
+def _database_service(index: int) -> list[str]:
+    name = f"app{index:05d}-db"
+    return [
+        "  db:",
+        "    extends:",
+        "      file: ../common.yml",
+        "      service: common-config",
+        "    image: postgres:16-alpine",
+        f"    container_name: {name}",
+        "    environment:",
+        f"      - POSTGRES_DB=app{index:05d}",
+        "      - POSTGRES_PASSWORD=${DB_PASSWORD}",
+        "    networks:",
+        "      - media_int",
+        "    volumes:",
+        f"      - /opt/app{index:05d}/db:/var/lib/postgresql/data",
+        "    healthcheck:",
+        "      test: [CMD-SHELL, 'pg_isready -U postgres']",
+        "      interval: 30s",
+        "      timeout: 5s",
+        "      retries: 5",
+        "    mem_limit: 256M",
+    ]
+
+
+def stack_text(index: int, rng: random.Random) -> str:
+    """Render the compose file of one synthetic stack."""
+    port = 1024 + rng.randrange(40000)
+    lines = ["---", "services:"]
+    lines += _app_service(index, port, rng.random() < UNORDERED_RATIO)
+    if rng.random() < DATABASE_RATIO:
+        lines += _database_service(index)
+
+    networks = ["media_int", "proxy"]
+    if rng.random() < MISSING_NETWORK_RATIO:
+        networks.remove(rng.choice(networks))
+    lines.append("networks:")
+    for network in networks:
+        lines += [f"  {network}:", "    external: true"]
+    return "\n".join(lines) + "\n"
+
+
+def generate_repo(root: Path, count: int, seed: int = 0) -> list[Path]:
+    """Write a repository of ``count`` stacks under ``root``, replacing it if present.
+
+    Returns the paths of the generated stack files.
+    """
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+    rng = random.Random(seed)
+
+    (root / "common.yml").write_text(COMMON_CONFIG)
+    infrastructure = root / "infrastructure"
+    infrastructure.mkdir()
+    shutil.copyfile(INFRASTRUCTURE_FILE, infrastructure / "docker-compose.yml")
+
+    files = []
+    for index in range(count):
+        stack = root / f"stack{index:05d}"
+        stack.mkdir()
+        path = stack / "docker-compose.yml"
+        path.write_text(stack_text(index, rng))
+        files.append(path)
+
+    logger.debug("Generated %d stacks in %s", count, root)
+    return files
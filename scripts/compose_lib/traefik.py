@@ -0,0 +1,406 @@
+"""Traefik label parsing and router -> service -> port graph checks.
+
+Labels are parsed once per compose file (and cached by content hash), then
+combined into a repository-wide graph together with the services of the
+file provider (``traefik/config/dynamic``). As configured in this repository,
+the Docker provider only considers containers with ``traefik.enable=true``.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from compose_lib.cache import JsonCache, cached_by_content
+from compose_lib.document import ComposeDocument, DocumentStore
+from compose_lib.extends import ExtendsError, effective_services
+from compose_lib.index import ServiceRef
+from compose_lib.rules import ERROR, WARNING, Finding
+from compose_lib.yaml_backend import safe_load
+
+logger = logging.getLogger(__name__)
+
+DYNAMIC_CONFIG_DIR = Path(__file__).resolve().parents[2] / "traefik" / "config" / "dynamic"
+
+_HOST_MATCHER = re.compile(r"Host(?:SNI)?\(([^)]*)\)")
+_QUOTED = re.compile(r"[`\"']([^`\"']*)[`\"']")
+_PURE_HOST_RULE = re.compile(r"Host(?:SNI)?\([^)]*\)(?:\|\|Host(?:SNI)?\([^)]*\))*")
+# The file provider templates variables as {{ env "NAME" }}, compose as ${NAME}.
+_GO_ENV = re.compile(r"\{\{\s*env\s+\"(\w+)\"\s*\}\}")
+_LOCAL_PORT = re.compile(r"(?:localhost|127\.0\.0\.1|0\.0\.0\.0|\[::1\]):(\d+)")
+
+
+@dataclass(frozen=True)
+class Router:
+    """A ``traefik.<kind>.routers.<name>.*`` group of labels."""
+
+    kind: str
+    name: str
+    rule: str | None = None
+    service: str | None = None
+    entrypoints: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class LoadBalancer:
+    """A ``traefik.<kind>.services.<name>.*`` group of labels."""
+
+    kind: str
+    name: str
+    port: str | None = None
+
+
+@dataclass
+class RoutedService:
+    """The Traefik configuration carried by one compose service."""
+
+    service: str
+    enabled: bool
+    routers: list[Router] = field(default_factory=list)
+    load_balancers: list[LoadBalancer] = field(default_factory=list)
+    # Container ports the service is known to listen on.
+    ports: list[str] = field(default_factory=list)
+    network_mode: str | None = None
+
+    def to_json(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "RoutedService":
+        return cls(
+            data["service"],
+            data["enabled"],
+            [Router(**{**r, "entrypoints": tuple(r["entrypoints"])}) for r in data["routers"]],
+            [LoadBalancer(**lb) for lb in data["load_balancers"]],
+            data["ports"],
+            data["network_mode"],
+        )
+
+
+# --- Parsing ------------------------------------------------------------------
+
+
+def label_map(labels: Any) -> dict[str, str]:
+    """Normalize compose labels (list of ``key=value`` or mapping) to a mapping."""
+    if isinstance(labels, dict):
+        return {str(key): str(value) for key, value in labels.items()}
+    mapping: dict[str, str] = {}
+    if isinstance(labels, list):
+        for item in labels:
+            key, _, value = str(item).partition("=")
+            mapping[key.strip()] = value.strip()
+    return mapping
+
+
+def parse_labels(labels: Any) -> tuple[bool, list[Router], list[LoadBalancer]]:
+    """Split Traefik labels into routers and load-balanced services.
+
+    Returns whether ``traefik.enable`` is true, the routers and the services.
+    """
+    enabled = False
+    routers: dict[tuple[str, str], dict[str, str]] = {}
+    services: dict[tuple[str, str], str | None] = {}
+
+    for key, value in label_map(labels).items():
+        if not key.startswith("traefik."):
+            continue
+        if key == "traefik.enable":
+            enabled = value.lower() == "true"
+            continue
+
+        parts = key.split(".", 4)
+        if len(parts) < 5:
+            continue
+        _, kind, section, name, attribute = parts
+        attribute = attribute.lower()
+
+        if section == "routers":
+            router = routers.setdefault((kind, name), {})
+            if attribute in ("rule", "service", "entrypoints"):
+                router[attribute] = value
+        elif section == "services":
+            port = value if attribute == "loadbalancer.server.port" else None
+            if port is not None or (kind, name) not in services:
+                services[(kind, name)] = port
+
+    return (
+        enabled,
+        [
+            Router(
+                kind,
+                name,
+                attrs.get("rule"),
+                attrs.get("service"),
+                tuple(e.strip() for e in attrs.get("entrypoints", "").split(",") if e.strip()),
+            )
+            for (kind, name), attrs in routers.items()
+        ],
+        [LoadBalancer(kind, name, port) for (kind, name), port in services.items()],
+    )
+
+
+def _container_ports(service: dict[str, Any]) -> list[str]:
+    """Ports a service listens on according to expose, ports and its healthcheck."""
+    ports: list[str] = []
+    for entry in service.get("expose") or []:
+        ports.append(str(entry).split("/")[0])
+    for entry in service.get("ports") or []:
+        if isinstance(entry, dict):
+            ports.append(str(entry.get("target")))
+        else:
+            ports.append(str(entry).split("/")[0].rsplit(":", 1)[-1])
+
+    healthcheck = service.get("healthcheck")
+    test = healthcheck.get("test") if isinstance(healthcheck, dict) else None
+    text = " ".join(map(str, test)) if isinstance(test, list) else str(test or "")
+    ports.extend(_LOCAL_PORT.findall(text))
+    return ports
+
+
+def routed_services(document: ComposeDocument) -> list[RoutedService]:
+    """Parse the Traefik labels of every service of a document."""
+    cached = document.derived.get("traefik")
+    if cached is not None:
+        assert isinstance(cached, list)
+        return cached
+
+    result: list[RoutedService] = []
+    services = effective_services(document)
+    for name in document.services:
+        try:
+            service = services[name]
+        except ExtendsError:
+            service = document.services[name]
+        if not isinstance(service, dict):
+            continue
+
+        enabled, routers, load_balancers = parse_labels(service.get("labels"))
+        network_mode = service.get("network_mode")
+        result.append(
+            RoutedService(
+                name,
+                enabled,
+                routers,
+                load_balancers,
+                _container_ports(service),
+                network_mode if isinstance(network_mode, str) else None,
+            )
+        )
+
+    document.derived["traefik"] = result
+    return result
+
+
+def collect_routes(
+    compose_files: Iterable[Path],
+    store: DocumentStore | None = None,
+    cache: JsonCache | None = None,
+) -> dict[Path, list[RoutedService]]:
+    """Parse the labels of every file, reusing cached results for unchanged files."""
+    store = store if store is not None else DocumentStore()
+
+    def extract(filepath: Path, text: str | None) -> list[dict[str, Any]]:
+        return [item.to_json() for item in routed_services(store.load(filepath, text))]
+
+    return {
+        filepath: [RoutedService.from_json(item) for item in entries]
+        for filepath, entries in cached_by_content("traefik", compose_files, cache, extract)
+    }
+
+
+def file_provider(
+    directory: Path = DYNAMIC_CONFIG_DIR,
+) -> tuple[set[tuple[str, str]], list[Router]]:
+    """Return the ``(kind, name)`` services and the routers of the file provider."""
+    services: set[tuple[str, str]] = set()
+    routers: list[Router] = []
+
+    for path in sorted(directory.glob("*.y*ml")):
+        try:
+            content = safe_load(path.read_text())
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning("Cannot read Traefik dynamic config %s: %s", path, e)
+            continue
+        if not isinstance(content, dict):
+            continue
+
+        for kind in ("http", "tcp", "udp"):
+            section = content.get(kind)
+            if not isinstance(section, dict):
+                continue
+            services.update((kind, str(name)) for name in section.get("services") or {})
+            for name, router in (section.get("routers") or {}).items():
+                if isinstance(router, dict):
+                    entrypoints = tuple(map(str, router.get("entryPoints") or []))
+                    routers.append(
+                        Router(
+                            kind, str(name), router.get("rule"), router.get("service"), entrypoints
+                        )
+                    )
+
+    return services, routers
+
+
+# --- Graph --------------------------------------------------------------------
+
+
+def normalize_rule(rule: str) -> str:
+    """Canonical form of a rule: no whitespace, one variable syntax."""
+    return "".join(_GO_ENV.sub(r"${\1}", rule).split())
+
+
+def rule_hosts(rule: str) -> list[str]:
+    """Return the hosts matched by ``Host()``/``HostSNI()`` in a rule."""
+    hosts: list[str] = []
+    for arguments in _HOST_MATCHER.findall(normalize_rule(rule)):
+        hosts.extend(_QUOTED.findall(arguments))
+    return hosts
+
+
+@dataclass
+class TraefikGraph:
+    """Routers and services of the Docker and file providers across the repository."""
+
+    containers: dict[ServiceRef, RoutedService] = field(default_factory=dict)
+    routers: list[tuple[ServiceRef, Router]] = field(default_factory=list)
+    services: dict[tuple[str, str], list[tuple[ServiceRef, LoadBalancer]]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    file_services: set[tuple[str, str]] = field(default_factory=set)
+    file_routers: list[Router] = field(default_factory=list)
+    # Services running in another one's network namespace (network_mode: service:x).
+    joined: dict[ServiceRef, list[ServiceRef]] = field(default_factory=lambda: defaultdict(list))
+
+    def target(self, router: Router, owner: ServiceRef) -> list[LoadBalancer] | None:
+        """Return the labelled load balancers a router uses, None if its service is undefined.
+
+        Internal and file provider services resolve to an empty list.
+        """
+        if router.service is None:
+            # Without an explicit service Traefik uses the container's own one.
+            return list(self.containers[owner].load_balancers)
+
+        name, _, provider = router.service.partition("@")
+        if provider == "file":
+            return [] if (router.kind, name) in self.file_services else None
+        if provider not in ("", "docker"):
+            return []
+
+        found = self.services.get((router.kind, name))
+        return [lb for _, lb in found] if found else None
+
+    def listening_ports(self, owner: ServiceRef) -> set[str]:
+        """Ports of a container, including those of services sharing its network namespace."""
+        ports = set(self.containers[owner].ports)
+        for ref in self.joined.get(owner, ()):
+            ports.update(self.containers[ref].ports)
+        return ports
+
+
+def build_graph(
+    routes: Mapping[Path, list[RoutedService]], dynamic_dir: Path = DYNAMIC_CONFIG_DIR
+) -> TraefikGraph:
+    """Combine the per-file label models with the file provider configuration."""
+    graph = TraefikGraph()
+
+    for path, services in routes.items():
+        for routed in services:
+            ref = ServiceRef(path, routed.service)
+            graph.containers[ref] = routed
+            if routed.network_mode and routed.network_mode.startswith("service:"):
+                owner = ServiceRef(path, routed.network_mode.removeprefix("service:"))
+                graph.joined[owner].append(ref)
+            if not routed.enabled:
+                continue
+            graph.routers.extend((ref, router) for router in routed.routers)
+            for lb in routed.load_balancers:
+                graph.services[(lb.kind, lb.name)].append((ref, lb))
+
+    graph.file_services, graph.file_routers = file_provider(dynamic_dir)
+    return graph
+
+
+def _claims(router: Router) -> list[tuple[str, tuple[str, ...], str]]:
+    """Keys under which a router competes for requests: each host of a pure
+    ``Host()`` rule, or else the whole rule, on the same entrypoints."""
+    if not router.rule:
+        return []
+    rule = normalize_rule(router.rule)
+    keys = rule_hosts(rule) if _PURE_HOST_RULE.fullmatch(rule) else [rule]
+    entrypoints = tuple(sorted(router.entrypoints))
+    return [(router.kind, entrypoints, key) for key in keys]
+
+
+def graph_findings(graph: TraefikGraph) -> dict[Path, list[Finding]]:
+    """Check the graph; findings are grouped by compose file."""
+    findings: dict[Path, list[Finding]] = defaultdict(list)
+
+    def report(ref: ServiceRef, severity: str, message: str) -> None:
+        findings[ref.path].append(
+            Finding(
+                "traefik",
+                severity,
+                message,
+                service=ref.service,
+                key_path=("services", ref.service, "labels"),
+            )
+        )
+
+    claims: dict[tuple[str, tuple[str, ...], str], list[tuple[ServiceRef | None, str]]]
+    claims = defaultdict(list)
+
+    for ref, router in graph.routers:
+        for claim in _claims(router):
+            claims[claim].append((ref, router.name))
+
+        if router.service is None and len(graph.containers[ref].load_balancers) > 1:
+            report(
+                ref,
+                ERROR,
+                f"Router '{router.name}' has no service and the container defines several",
+            )
+        elif graph.target(router, ref) is None:
+            report(
+                ref, ERROR, f"Router '{router.name}' points at undefined service '{router.service}'"
+            )
+
+    for router in graph.file_routers:
+        for claim in _claims(router):
+            claims[claim].append((None, f"{router.name}@file"))
+
+    for (_, _, key), claimants in claims.items():
+        if len(claimants) < 2:
+            continue
+        for claimant, name in claimants:
+            if claimant is None:
+                continue
+            others = ", ".join(
+                f"'{other}'" if other_ref is None else f"'{other}' ({other_ref})"
+                for other_ref, other in claimants
+                if (other_ref, other) != (claimant, name)
+            )
+            report(claimant, ERROR, f"Router '{name}' duplicates {key} of router {others}")
+
+    for (kind, _), balancers in graph.services.items():
+        # Healthchecks only reveal HTTP ports; TCP/UDP listeners are rarely declared.
+        if kind != "http":
+            continue
+        for ref, lb in balancers:
+            listening = graph.listening_ports(ref)
+            # No declared or probed port: nothing to compare the label with.
+            if lb.port is None or not listening or lb.port in listening:
+                continue
+            known = ", ".join(sorted(listening))
+            report(
+                ref,
+                WARNING,
+                f"Traefik service '{lb.name}' targets port {lb.port}, which the container "
+                f"does not expose (known ports: {known})",
+            )
+
+    return dict(findings)
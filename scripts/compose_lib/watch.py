@@ -0,0 +1,269 @@
+"""Incremental revalidation of compose files as they change on disk.
+
+Changes are detected with Linux inotify (through ctypes, no extra
+dependency) and fall back to polling file stats elsewhere.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Protocol
+
+from compose_lib.discovery import COMPOSE_FILENAMES
+from compose_lib.document import DocumentStore
+from compose_lib.engine import RuleEngine
+from compose_lib.extends import default_resolver
+from compose_lib.git_changes import dependency_closure
+from compose_lib.rules import Finding
+
+logger = logging.getLogger(__name__)
+
+# Events arriving within this window after the first one are handled together,
+# so an editor's write + rename + chmod triggers a single revalidation.
+DEBOUNCE_SECONDS = 0.05
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CLOSE_WRITE = 0x00000008
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher(Protocol):
+    """Source of file change notifications."""
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Block until something changes; return the resolved changed paths."""
+        ...
+
+    def close(self) -> None:
+        """Release the underlying resources."""
+        ...
+
+
+class InotifyWatcher:
+    """Watch directories with Linux inotify."""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+
+    def __init__(self, directories: Iterable[Path]) -> None:
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._directories: dict[int, Path] = {}
+        for directory in directories:
+            self.add(directory)
+
+    def add(self, directory: Path) -> None:
+        """Start watching a directory."""
+        directory = directory.resolve()
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        self._directories[wd] = directory
+
+    def _read_events(self) -> set[Path]:
+        data = os.read(self._fd, 64 * 1024)
+        changed: set[Path] = set()
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add(path)
+                    changed.update(
+                        p.resolve() for name in COMPOSE_FILENAMES for p in path.glob(name)
+                    )
+                continue
+            changed.add(path)
+
+        return changed
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = self._read_events()
+        deadline = time.monotonic() + DEBOUNCE_SECONDS
+        while (remaining := deadline - time.monotonic()) > 0:
+            if not select.select([self._fd], [], [], remaining)[0]:
+                break
+            changed |= self._read_events()
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watch files by comparing their stat results at a fixed interval."""
+
+    def __init__(self, paths: Callable[[], Iterable[Path]], interval: float = 0.5) -> None:
+        self._paths = paths
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for path in self._paths():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path.resolve()] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(
+    root: Path,
+    discover: Callable[[], list[Path]],
+    extra_files: Iterable[Path] = (),
+    poll_interval: float = 0.5,
+    force_polling: bool = False,
+) -> Watcher:
+    """Return an inotify watcher when possible, a polling watcher otherwise.
+
+    ``discover`` lists the compose files; ``extra_files`` are other inputs
+    of the rules such as ``common.yml``.
+    """
+    extra_files = list(extra_files)
+
+    if not force_polling:
+        directories = {root.resolve()} | {f.parent.resolve() for f in discover()}
+        directories |= {f.parent.resolve() for f in extra_files}
+        try:
+            return InotifyWatcher(sorted(directories))
+        except OSError as e:
+            logger.info("inotify unavailable (%s), falling back to polling", e)
+
+    def paths() -> list[Path]:
+        return discover() + extra_files
+
+    return PollingWatcher(paths, poll_interval)
+
+
+@dataclass
+class FileDelta:
+    """Findings that appeared or disappeared for one file after a change."""
+
+    path: Path
+    added: list[Finding] = field(default_factory=list)
+    resolved: list[Finding] = field(default_factory=list)
+
+
+def _unplaced(finding: Finding) -> Finding:
+    return replace(finding, line=None, column=None)
+
+
+class WatchSession:
+    """Keep parsed documents and findings in memory between changes."""
+
+    def __init__(
+        self,
+        discover: Callable[[], list[Path]],
+        engine: RuleEngine | None = None,
+    ) -> None:
+        self.discover = discover
+        self.engine = engine or RuleEngine()
+        self.store = DocumentStore()
+        self.files = discover()
+        self.results: dict[Path, list[Finding]] = {}
+        self.last_checked = 0
+
+    def check_all(self) -> list[FileDelta]:
+        """Validate every file; used for the initial run."""
+        return [self._check(path) for path in self.files]
+
+    def _check(self, path: Path) -> FileDelta:
+        findings = self.engine.check(self.store.load(path)).findings
+        previous = self.results.get(path, [])
+        self.results[path] = findings
+        # Edits elsewhere in the file move findings around; that is not a change.
+        before = {_unplaced(f) for f in previous}
+        after = {_unplaced(f) for f in findings}
+        return FileDelta(
+            path,
+            added=[f for f in findings if _unplaced(f) not in before],
+            resolved=[f for f in previous if _unplaced(f) not in after],
+        )
+
+    def update(self, changed: set[Path]) -> list[FileDelta]:
+        """Revalidate the changed files and their dependents.
+
+        Returns the files whose findings changed, including deleted files
+        whose findings are all reported as resolved.
+        """
+        known = {f.resolve() for f in self.files}
+        if any(
+            path.name in COMPOSE_FILENAMES and (path not in known or not path.exists())
+            for path in changed
+        ):
+            self.files = self.discover()
+
+        resolver = default_resolver()
+        for path in changed:
+            self.store.forget(path)
+            resolver.forget(path)
+
+        deltas: list[FileDelta] = []
+        affected = dependency_closure(self.files, changed, self.store)
+        self.last_checked = len(affected)
+        for path in affected:
+            # Dependents kept in memory may hold services merged from the old base.
+            self.store.load(path).derived.clear()
+            delta = self._check(path)
+            if delta.added or delta.resolved:
+                deltas.append(delta)
+
+        current = set(self.files)
+        for path in [p for p in self.results if p not in current]:
+            deltas.append(FileDelta(path, resolved=self.results.pop(path)))
+
+        return deltas
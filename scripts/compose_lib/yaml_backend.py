@@ -0,0 +1,30 @@
+"""PyYAML loader/dumper selection, preferring the libyaml C extension.
+
+Set ``COMPOSE_LIB_YAML_BACKEND=python`` to force the pure-Python classes,
+e.g. to compare timings.
+"""
+
+import os
+from typing import IO, TYPE_CHECKING, Any
+
+import yaml
+
+_USE_LIBYAML = (
+    os.environ.get("COMPOSE_LIB_YAML_BACKEND", "libyaml") != "python" and yaml.__with_libyaml__
+)
+
+# Type checkers only see the pure-Python classes; the C ones share their API.
+if TYPE_CHECKING or not _USE_LIBYAML:
+    from yaml import SafeDumper, SafeLoader
+else:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+
+YAML_BACKEND = "libyaml" if _USE_LIBYAML else "python"
+
+__all__ = ["YAML_BACKEND", "SafeDumper", "SafeLoader", "safe_load"]
+
+
+def safe_load(stream: str | bytes | IO[str]) -> Any:
+    """Drop-in replacement for ``yaml.safe_load`` using the selected backend."""
+    return yaml.load(stream, Loader=SafeLoader)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Fix Docker Compose files key ordering automatically."""
 
+import argparse
 import logging
 import sys
 from pathlib import Path
@@ -8,88 +9,21 @@ from typing import Any
 
 import yaml
 
+from compose_lib.discovery import discover_compose_files
+from compose_lib.document import ComposeDocument, DocumentStore, document_diff, write_document
+from compose_lib.engine import RuleEngine
+from compose_lib.roundtrip import RoundTripError
+from compose_lib.rules import KEY_ORDER_FIXER, sort_content
+from compose_lib.yaml_backend import YAML_BACKEND, SafeDumper
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(levelname)s: %(message)s",
 )
 logger = logging.getLogger(__name__)
 
-KEY_ORDER = [
-    "extends",
-    "image",
-    "build",
-    "container_name",
-    "hostname",
-    "environment",
-    "env_file",
-    "networks",
-    "network_mode",
-    "ports",
-    "expose",
-    "volumes",
-    "devices",
-    "configs",
-    "healthcheck",
-    "labels",
-    "restart",
-    "depends_on",
-    "mem_limit",
-    "memswap_limit",
-    "shm_size",
-    "cap_add",
-    "cap_drop",
-    "security_opt",
-    "privileged",
-    "sysctls",
-    "extra_hosts",
-    "command",
-    "entrypoint",
-    "working_dir",
-    "user",
-    "group_add",
-    "ulimits",
-    "logging",
-    "deploy",
-    "profiles",
-]
-
-
-def get_key_index(key: str) -> int:
-    """Get the expected index for a key. Unknown keys go at the end."""
-    try:
-        return KEY_ORDER.index(key)
-    except ValueError:
-        return len(KEY_ORDER)
-
-
-def sort_dict_keys(d: dict[str, Any]) -> dict[str, Any]:
-    """Sort dictionary keys according to KEY_ORDER."""
-    if not isinstance(d, dict):
-        return d
-    return {k: d[k] for k in sorted(d.keys(), key=get_key_index)}
-
-
-def fix_service(service_config: dict[str, Any]) -> dict[str, Any]:
-    """Fix key ordering in a service configuration."""
-    if not isinstance(service_config, dict):
-        return service_config
-
-    sorted_service: dict[str, Any] = {}
 
-    for key in sorted(service_config.keys(), key=get_key_index):
-        value = service_config[key]
-
-        if isinstance(value, dict):
-            sorted_service[key] = sort_dict_keys(value)
-        elif isinstance(value, list):
-            sorted_service[key] = value
-        else:
-            sorted_service[key] = value
-
-    return sorted_service
-
-
-class CustomDumper(yaml.SafeDumper):
+class CustomDumper(SafeDumper):
     """Custom YAML dumper with custom representers."""
 
     pass
@@ -159,84 +93,134 @@ CustomDumper.add_representer(FlowStyleList, list_representer)
 CustomDumper.add_representer(PortsList, ports_list_representer)
 
 
-def fix_file(filepath: Path) -> bool:
-    """Fix a single Docker Compose file."""
-    try:
-        with open(filepath) as f:
-            content: dict[str, Any] | None = yaml.safe_load(f)
-    except yaml.YAMLError as e:
-        logger.error("YAML parsing error in %s: %s", filepath, e)
+def render_document(content: dict[str, Any]) -> str:
+    """Dump a whole document with the repository YAML style."""
+    return yaml.dump(
+        convert_special_lists(content),
+        Dumper=CustomDumper,
+        default_flow_style=False,
+        sort_keys=False,
+        allow_unicode=True,
+        width=120,
+    )
+
+
+def fix_file(
+    filepath: Path,
+    store: DocumentStore | None = None,
+    engine: RuleEngine | None = None,
+    reformat: bool = False,
+    write: bool = True,
+) -> bool:
+    """Fix a single Docker Compose file.
+
+    Out-of-order entries are moved in the original text; files that are
+    already ordered are not written. With ``reformat`` the whole document is
+    re-dumped instead, which normalises quoting but drops comments. With
+    ``write=False`` the fix is only applied to the stored document. A file
+    that cannot be reordered in place counts as a failure.
+    """
+    document = (store if store is not None else DocumentStore()).load(filepath)
+
+    if document.error is not None:
+        logger.error("%s in %s", document.error, filepath)
         return False
 
-    if not content:
+    if not document.content:
         logger.info("Empty file: %s", filepath)
         return True
 
-    fixed_content: dict[str, Any] = {}
+    if reformat:
+        document.replace_text(render_document(sort_content(document.content)))
+    else:
+        try:
+            (engine or RuleEngine(rules=(), fixers=[KEY_ORDER_FIXER])).fix(document)
+        except RoundTripError as e:
+            logger.error("Cannot reorder %s in place (try --reformat): %s", filepath, e)
+            return False
 
-    root_key_order = ["services", "networks", "configs", "volumes", "secrets"]
+    if not document.modified:
+        logger.debug("Already ordered: %s", filepath)
+        return True
 
-    def get_root_key_index(key: str) -> int:
-        try:
-            return root_key_order.index(key)
-        except ValueError:
-            return len(root_key_order)
-
-    sorted_root_keys = sorted(content.keys(), key=get_root_key_index)
-
-    for key in sorted_root_keys:
-        value = content[key]
-
-        if key == "services" and isinstance(value, dict):
-            fixed_services: dict[str, Any] = {}
-            for service_name in sorted(value.keys()):
-                service_config = value[service_name]
-                fixed_services[service_name] = fix_service(service_config)
-            fixed_content[key] = fixed_services
-        elif isinstance(value, dict):
-            fixed_content[key] = sort_dict_keys(value)
-        else:
-            fixed_content[key] = value
+    if not write:
+        return True
 
     try:
-        content_with_special_lists = convert_special_lists(fixed_content)
-        with open(filepath, "w") as f:
-            yaml.dump(
-                content_with_special_lists,
-                f,
-                Dumper=CustomDumper,
-                default_flow_style=False,
-                sort_keys=False,
-                allow_unicode=True,
-                width=120,
-            )
-        logger.info("Fixed: %s", filepath)
+        if write_document(document):
+            logger.info("Fixed: %s", filepath)
         return True
-    except Exception as e:
+    except OSError as e:
         logger.error("Failed to write %s: %s", filepath, e)
         return False
 
 
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--reformat",
+        action="store_true",
+        help="re-dump every file in the canonical style instead of moving entries in place",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="do not write anything, list the files that would change and exit 1 if any",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="like --check, but print the changes as a unified diff",
+    )
+    return parser.parse_args(argv)
+
+
 def main() -> None:
     """Main entry point."""
-    compose_files = list(Path(".").rglob("docker-compose.yml"))
+    args = parse_args()
+    compose_files = discover_compose_files()
 
     if not compose_files:
-        logger.info("No docker-compose.yml files found.")
+        logger.info("No compose files found.")
         sys.exit(0)
 
-    logger.info("Found %d docker-compose.yml files", len(compose_files))
+    logger.info("Found %d compose files", len(compose_files))
+    logger.info("YAML backend: %s", YAML_BACKEND)
 
-    fixed_count = 0
+    store = DocumentStore()
+    engine = RuleEngine(rules=(), fixers=[KEY_ORDER_FIXER])
+    pending: list[ComposeDocument] = []
     failed_count = 0
 
+    # Every fix is computed in memory first: an error or Ctrl-C leaves all files untouched.
     for filepath in compose_files:
-        if fix_file(filepath):
-            fixed_count += 1
-        else:
+        if not fix_file(filepath, store, engine, args.reformat, write=False):
+            failed_count += 1
+        elif store.load(filepath).modified:
+            pending.append(store.load(filepath))
+
+    if args.check or args.diff:
+        for document in pending:
+            if args.diff:
+                sys.stdout.write(document_diff(document))
+            else:
+                logger.info("Would fix: %s", document.path)
+        logger.info("Would fix: %d, Failed: %d", len(pending), failed_count)
+        sys.exit(1 if pending or failed_count else 0)
+
+    fixed_count = 0
+    for document in pending:
+        try:
+            if write_document(document):
+                logger.info("Fixed: %s", document.path)
+                fixed_count += 1
+        except OSError as e:
+            logger.error("Failed to write %s: %s", document.path, e)
             failed_count += 1
 
-    logger.info("Fixed: %d, Failed: %d", fixed_count, failed_count)
+    unchanged_count = len(compose_files) - fixed_count - failed_count
+    logger.info("Fixed: %d, Unchanged: %d, Failed: %d", fixed_count, unchanged_count, failed_count)
 
     if failed_count > 0:
         sys.exit(1)
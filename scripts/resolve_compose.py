@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Resolve and validate Docker Compose files in-process, like `docker compose config`."""
+
+import argparse
+import logging
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+from compose_lib.discovery import discover_compose_files
+from compose_lib.document import DocumentStore
+from compose_lib.resolver import Resolver
+from compose_lib.rules import ERROR, WARNING, Finding
+from compose_lib.schema import check_config
+from compose_lib.yaml_backend import SafeDumper
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def docker_config_ok(filepath: Path) -> bool:
+    """Run the real `docker compose config` on a file (slow: one fork per file)."""
+    completed = subprocess.run(
+        ["docker", "compose", "-f", str(filepath), "config", "--quiet"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        logger.warning("docker compose config failed for %s: %s", filepath, completed.stderr)
+    return completed.returncode == 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "files",
+        nargs="*",
+        type=Path,
+        help="compose files to check (default: every docker-compose.yml)",
+    )
+    parser.add_argument(
+        "--docker",
+        action="store_true",
+        help="also run `docker compose config` on each file (slow, needs the Docker CLI)",
+    )
+    parser.add_argument(
+        "--print",
+        dest="print_config",
+        action="store_true",
+        help="print the effective configuration of each file",
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    files = args.files or discover_compose_files()
+
+    use_docker = args.docker
+    if use_docker and shutil.which("docker") is None:
+        logger.warning("docker CLI not found, skipping the docker compose config check")
+        use_docker = False
+
+    resolver = Resolver(DocumentStore())
+    failed = 0
+
+    for filepath in files:
+        try:
+            document = resolver.store.load(filepath)
+        except OSError as e:
+            logger.error("Cannot read %s: %s", filepath, e)
+            failed += 1
+            continue
+        if document.error is None and not document.content:
+            print(f"Skipping {filepath} (empty file)")
+            continue
+
+        resolved = resolver.resolve(filepath)
+        findings = list(resolved.findings)
+        if resolved.config is not None:
+            findings.extend(check_config(resolved.config, filepath.parent))
+
+        if use_docker and not docker_config_ok(filepath):
+            findings.append(Finding("docker", WARNING, "docker compose config rejected the file"))
+
+        errors = [f for f in findings if f.severity == ERROR]
+        if errors:
+            failed += 1
+        if not findings:
+            print(f"OK: {filepath}")
+        else:
+            print(f"{'FAILED' if errors else 'OK'}: {filepath}")
+            for finding in findings:
+                print(f"  {finding.severity.upper()}: {finding.message}")
+
+        if args.print_config and resolved.config is not None:
+            print(yaml.dump(resolved.config, Dumper=SafeDumper, sort_keys=False), end="")
+
+    if failed:
+        logger.error("%d of %d files failed validation", failed, len(files))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Query the networks, host ports, static IPs, container names and memory used across all stacks."""
+
+import argparse
+import json
+import logging
+import sys
+from typing import Any
+
+from compose_lib.discovery import discover_compose_files
+from compose_lib.index import StackIndex, build_index, conflict_findings
+from compose_lib.memory import MemoryReport, Total, build_memory_report, format_size
+from compose_lib.traefik import TraefikGraph, build_graph, collect_routes, rule_hosts
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def _matches(key: str, query: str | None) -> bool:
+    return query is None or key == query
+
+
+def query(index: StackIndex, kind: str, value: str | None) -> dict[str, list[str]]:
+    """Return ``resource -> services`` for one kind of resource, optionally filtered."""
+    rows: dict[str, list[str]] = {}
+
+    if kind == "networks":
+        for network, refs in sorted(index.networks.items()):
+            if _matches(network, value):
+                rows[network] = [str(ref) for ref in refs]
+    elif kind == "ports":
+        for (port, protocol), bindings in sorted(index.ports.items()):
+            if _matches(str(port), value) or _matches(f"{port}/{protocol}", value):
+                for binding, ref in bindings:
+                    rows.setdefault(str(binding), []).append(str(ref))
+    elif kind == "ips":
+        for (network, ip), refs in sorted(index.static_ips.items()):
+            if _matches(ip, value):
+                rows[f"{ip} ({network})"] = [str(ref) for ref in refs]
+    elif kind == "containers":
+        for name, refs in sorted(index.container_names.items()):
+            if _matches(name, value):
+                rows[name] = [str(ref) for ref in refs]
+
+    return rows
+
+
+def routes(graph: TraefikGraph, value: str | None) -> dict[str, list[str]]:
+    """Return ``host -> router -> service:port`` for the Docker provider routers."""
+    rows: dict[str, list[str]] = {}
+    for ref, router in sorted(graph.routers, key=lambda item: (item[0], item[1].name)):
+        balancers = graph.target(router, ref)
+        if balancers is None:
+            targets = f"{router.service} (undefined)"
+        elif balancers:
+            targets = ", ".join(f"{lb.name}:{lb.port or '?'}" for lb in balancers)
+        else:
+            targets = str(router.service)
+        for host in rule_hosts(router.rule or "") or [router.rule or "?"]:
+            if _matches(host, value):
+                rows.setdefault(host, []).append(f"{router.name} -> {targets} ({ref})")
+    return rows
+
+
+def _committed(total: Total, qualified: bool = True) -> list[str]:
+    line = f"{format_size(total.limited)} in {len(total.services)} services"
+    if total.swap:
+        line += f" + {format_size(total.swap)} swap"
+    unlimited = ", ".join(
+        sorted(str(m.ref) if qualified else m.ref.service for m in total.unlimited)
+    )
+    return [line, f"no limit: {unlimited}"] if unlimited else [line]
+
+
+def memory(report: MemoryReport, value: str | None) -> dict[str, list[str]]:
+    """Return the memory committed in total, per stack and per network, optionally filtered.
+
+    ``value`` selects a network or a stack directory.
+    """
+    rows: dict[str, list[str]] = {}
+    if value is None:
+        rows["total"] = _committed(report.total)
+    for path, total in sorted(report.stacks.items()):
+        if _matches(str(path.parent), value):
+            rows[f"stack {path.parent}"] = _committed(total, qualified=False)
+    for network, total in sorted(report.networks.items()):
+        if _matches(network, value):
+            rows[f"network {network}"] = _committed(total)
+    return rows
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "kind",
+        choices=("networks", "ports", "ips", "containers", "routers", "memory", "conflicts"),
+        help="what to list",
+    )
+    parser.add_argument(
+        "value",
+        nargs="?",
+        help="only show this network, port (80 or 80/tcp), IP, container name, router host "
+        "or, for memory, network or stack",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON instead of text")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    compose_files = discover_compose_files()
+    index = build_index(compose_files)
+
+    if args.kind == "conflicts":
+        conflicts = conflict_findings(index)
+        records: Any = [
+            {"file": str(path), "service": f.service, "message": f.message}
+            for path, findings in sorted(conflicts.items())
+            for f in findings
+        ]
+        if args.json:
+            print(json.dumps(records, indent=2))
+        else:
+            for record in records:
+                print(f"{record['file']}: {record['message']}")
+        sys.exit(1 if records else 0)
+
+    if args.kind == "routers":
+        rows = routes(build_graph(collect_routes(compose_files)), args.value)
+    elif args.kind == "memory":
+        rows = memory(build_memory_report(compose_files), args.value)
+    else:
+        rows = query(index, args.kind, args.value)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for key, services in rows.items():
+            print(f"{key}: {', '.join(services)}")
+
+    if args.value is not None and not rows:
+        logger.error("No %s matching '%s'", args.kind, args.value)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Report the load healthchecks put on the host and stagger their intervals.
+
+Prints the probe and process rates and the peak of concurrent probes after
+a cold boot, now and with staggered intervals, the intervals to change and
+the probes that start heavyweight programs. ``--apply`` writes the
+staggered intervals in place; ``--diff`` prints them as a unified diff.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from compose_lib.discovery import discover_compose_files
+from compose_lib.document import DocumentStore, document_diff, write_document
+from compose_lib.healthchecks import (
+    DEFAULT_HORIZON,
+    DEFAULT_PROBE_SECONDS,
+    STAGGER_SPREAD,
+    ProbeLoad,
+    apply_intervals,
+    collect_probes,
+    format_duration,
+    probe_findings,
+    probe_load,
+    stagger,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def _load_line(label: str, load: ProbeLoad) -> str:
+    return (
+        f"{label:<10} {load.probes_per_minute:6.1f} probes/min  "
+        f"{load.processes_per_minute:6.1f} processes/min  "
+        f"peak {load.peak_concurrent} concurrent"
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--apply", action="store_true", help="write the staggered intervals to the compose files"
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="print the staggered intervals as a unified diff without writing anything",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument(
+        "--spread",
+        type=float,
+        default=STAGGER_SPREAD,
+        help=f"how much an interval may grow, as a fraction (default: {STAGGER_SPREAD})",
+    )
+    parser.add_argument(
+        "--probe-seconds",
+        type=float,
+        default=DEFAULT_PROBE_SECONDS,
+        help=f"assumed duration of one probe (default: {DEFAULT_PROBE_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--horizon",
+        type=float,
+        default=DEFAULT_HORIZON,
+        help=f"seconds after a cold boot to simulate (default: {DEFAULT_HORIZON:g})",
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    compose_files = discover_compose_files()
+    store = DocumentStore()
+    probes = collect_probes(compose_files, store)
+    if not probes:
+        logger.info("No healthchecks found.")
+        sys.exit(0)
+
+    proposed = stagger(probes, args.spread)
+    current = probe_load(probes, horizon=args.horizon, probe_seconds=args.probe_seconds)
+    staggered = probe_load(probes, proposed, args.horizon, args.probe_seconds)
+    findings = [(probe, finding) for probe in probes for finding in probe_findings(probe)]
+    changes = sorted(
+        (probe.ref, probe.interval, proposed[probe.ref])
+        for probe in probes
+        if probe.ref in proposed
+    )
+
+    if args.json:
+        report = {
+            "current": vars(current),
+            "staggered": vars(staggered),
+            "intervals": [
+                {"file": str(ref.path), "service": ref.service, "from": old, "to": new}
+                for ref, old, new in changes
+            ],
+            "findings": [
+                {"file": str(probe.ref.path), "service": probe.ref.service, "message": f.message}
+                for probe, f in findings
+            ],
+        }
+        print(json.dumps(report, indent=2))
+    elif not args.diff:
+        print(f"{len(probes)} healthchecks, peak over {args.probe_seconds:g}s probes")
+        print(_load_line("current", current))
+        print(_load_line("staggered", staggered))
+        if changes:
+            print("\nIntervals:")
+            for ref, old, new in changes:
+                print(f"  {ref}: {format_duration(old)} -> {format_duration(new)}")
+        if findings:
+            print("\nProbes:")
+            for probe, finding in findings:
+                print(f"  {probe.ref.path}: {finding.message}")
+
+    if not (args.apply or args.diff):
+        return
+
+    failed = 0
+    for path in sorted({ref.path for ref, _, _ in changes}):
+        intervals = {ref.service: new for ref, _, new in changes if ref.path == path}
+        document = store.load(path)
+        if not apply_intervals(document, intervals):
+            continue
+        if args.diff:
+            sys.stdout.write(document_diff(document))
+            continue
+        try:
+            if write_document(document):
+                logger.info("Staggered: %s", path)
+        except OSError as e:
+            logger.error("Failed to write %s: %s", path, e)
+            failed += 1
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Plan and run the startup of every stack in cross-stack dependency order.
+
+Stacks are grouped in waves: each wave only depends on earlier ones, so all
+the stacks of a wave can start at the same time. With ``--up``, a stack is
+started as soon as the stacks it depends on are up, so a cold boot lasts as
+long as the longest dependency chain. ``docker compose up`` waits for a
+stack to be healthy only when a dependent needs it.
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from compose_lib.discovery import discover_compose_files
+from compose_lib.startup import (
+    StartupCycleError,
+    StartupGraph,
+    build_startup_graph,
+    startup_waves,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = 4
+DEFAULT_WAIT_TIMEOUT = 300
+
+
+class StackStartError(Exception):
+    """A stack could not be started."""
+
+
+def stack_name(path: Path) -> str:
+    """Name a stack after its directory."""
+    return str(path.parent) if path.parent != Path(".") else str(path)
+
+
+def compose_up(path: Path, healthy: bool, wait_timeout: int) -> None:
+    """Run ``docker compose up -d`` for one stack, waiting for health if asked.
+
+    Raises:
+        StackStartError: if docker compose fails.
+    """
+    command = ["docker", "compose", "-f", path.name, "up", "-d"]
+    if healthy:
+        command += ["--wait", "--wait-timeout", str(wait_timeout)]
+    try:
+        subprocess.run(command, cwd=path.parent, check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        detail = getattr(e, "stderr", None) or str(e)
+        raise StackStartError(f"{stack_name(path)}: {detail.strip()}") from e
+
+
+def start_stacks(
+    graph: StartupGraph, start: Callable[[Path, bool], None], jobs: int
+) -> tuple[list[Path], list[Path]]:
+    """Start every stack once its providers are up; return the failed and skipped stacks.
+
+    Stacks that depend on a failed stack are skipped; the others still start.
+    """
+    waiting = {stack: graph.providers(stack) & set(graph.stacks) for stack in graph.stacks}
+    awaited = {stack for stack in graph.stacks if graph.needs_health(stack)}
+    failed: list[Path] = []
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running: dict[Future[None], Path] = {}
+
+        def submit_ready() -> None:
+            for stack in sorted(s for s, providers in waiting.items() if not providers):
+                del waiting[stack]
+                logger.info("Starting %s", stack_name(stack))
+                running[pool.submit(start, stack, stack in awaited)] = stack
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stack = running.pop(future)
+                try:
+                    future.result()
+                except StackStartError as e:
+                    logger.error("%s", e)
+                    failed.append(stack)
+                    continue
+                for providers in waiting.values():
+                    providers.discard(stack)
+            submit_ready()
+
+    # Whatever is still waiting depends, directly or not, on a failed stack.
+    skipped = sorted(waiting)
+    for stack in skipped:
+        logger.error("Skipped %s: a stack it depends on failed", stack_name(stack))
+    return failed, skipped
+
+
+def plan(graph: StartupGraph, waves: list[list[Path]]) -> list[list[dict[str, object]]]:
+    """Describe each wave: its stacks, what they wait for and why."""
+    return [
+        [
+            {
+                "stack": stack_name(stack),
+                "wait_healthy": graph.needs_health(stack),
+                "after": [
+                    {
+                        "stack": stack_name(dependency.provider),
+                        "reason": dependency.reason,
+                        "healthy": dependency.healthy,
+                    }
+                    for dependency in graph.dependencies.get(stack, [])
+                ],
+            }
+            for stack in wave
+        ]
+        for wave in waves
+    ]
+
+
+def print_plan(waves: list[list[dict[str, object]]]) -> None:
+    """Print the waves, one stack per line with the stacks it starts after."""
+    for number, wave in enumerate(waves, 1):
+        print(f"Wave {number}:")
+        for entry in wave:
+            after = entry["after"]
+            assert isinstance(after, list)
+            providers = sorted({str(dependency["stack"]) for dependency in after})
+            line = f"  {entry['stack']}"
+            if entry["wait_healthy"]:
+                line += " (wait healthy)"
+            if providers:
+                line += f" <- {', '.join(providers)}"
+            print(line)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--up",
+        action="store_true",
+        help="start the stacks with docker compose instead of only printing the plan",
+    )
+    parser.add_argument("--json", action="store_true", help="print the plan as JSON")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"stacks started at the same time (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--wait-timeout",
+        type=int,
+        default=DEFAULT_WAIT_TIMEOUT,
+        help=f"seconds to wait for a stack to be healthy (default: {DEFAULT_WAIT_TIMEOUT})",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    graph = build_startup_graph(discover_compose_files())
+    try:
+        waves = startup_waves(graph)
+    except StartupCycleError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+
+    if not args.up:
+        if args.json:
+            print(json.dumps(plan(graph, waves), indent=2))
+        else:
+            print_plan(plan(graph, waves))
+        return
+
+    start = time.perf_counter()
+    failed, skipped = start_stacks(
+        graph,
+        lambda stack, healthy: compose_up(stack, healthy, args.wait_timeout),
+        args.jobs,
+    )
+    started = len(graph.stacks) - len(failed) - len(skipped)
+    print()
+    print(f"Started: {started}, Failed: {len(failed)}, Skipped: {len(skipped)}")
+    print(f"Elapsed: {time.perf_counter() - start:.1f}s over {len(waves)} waves")
+    if failed or skipped:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
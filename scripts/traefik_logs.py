@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Latency and response size percentiles per Traefik router or service.
+
+Reads the Traefik access log (``TRAEFIK_ACCESSLOG_FILEPATH``, by default
+``/var/log/traefik/access.log``) from where the previous run stopped and adds
+the new requests to the saved statistics, so a run only costs what was
+logged since. Each router or service is shown with the compose service whose
+labels define it.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from compose_lib.accesslog import (
+    DEFAULT_LOG_FILE,
+    DEFAULT_STATE_FILE,
+    FORMATS,
+    LOG_FILE_ENV,
+    LOG_FORMAT_ENV,
+    LogState,
+    load_state,
+    resolve,
+    save_state,
+    summary,
+    update,
+)
+from compose_lib.discovery import discover_compose_files
+from compose_lib.traefik import build_graph, collect_routes
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def _value(number: float | None, unit: str) -> str:
+    if number is None:
+        return "-"
+    if unit == "B" and number >= 1024:
+        return f"{number / 1024:.0f}K" if number < 1024**2 else f"{number / 1024**2:.1f}M"
+    return f"{number:.0f}{unit}"
+
+
+def _default_format() -> str:
+    # Traefik's own setting, when it names a format this script reads.
+    value = os.environ.get(LOG_FORMAT_ENV, "")
+    return value if value in FORMATS else "auto"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--log",
+        type=Path,
+        default=Path(os.environ.get(LOG_FILE_ENV) or DEFAULT_LOG_FILE),
+        help=f"access log to read (default: ${LOG_FILE_ENV} or {DEFAULT_LOG_FILE})",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=_default_format(),
+        help=f"format of the log lines (default: ${LOG_FORMAT_ENV} or auto)",
+    )
+    parser.add_argument(
+        "--state",
+        type=Path,
+        default=DEFAULT_STATE_FILE,
+        help=f"offset and statistics kept between runs (default: {DEFAULT_STATE_FILE})",
+    )
+    parser.add_argument(
+        "--reset", action="store_true", help="forget the saved statistics and read the whole log"
+    )
+    parser.add_argument(
+        "--by", choices=("router", "service"), default="router", help="group requests by"
+    )
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    state = LogState() if args.reset else load_state(args.state, args.log)
+
+    start = time.perf_counter()
+    try:
+        read, unreadable = update(state, args.log, args.format)
+    except OSError as e:
+        logger.error("Cannot read %s: %s", args.log, e)
+        sys.exit(1)
+    logger.info(
+        "Read %d new lines of %s in %.2fs, %d in total",
+        read,
+        args.log,
+        time.perf_counter() - start,
+        state.lines,
+    )
+    if unreadable:
+        logger.warning("%d new lines could not be parsed", unreadable)
+    try:
+        save_state(args.state, args.log, state)
+    except OSError as e:
+        logger.warning("Could not save %s: %s", args.state, e)
+
+    graph = build_graph(collect_routes(discover_compose_files()))
+    groups = state.routers if args.by == "router" else state.services
+    rows = sorted(groups.items(), key=lambda item: -item[1].latency.count)
+
+    if args.json:
+        report = [
+            {args.by: name, "defined_by": str(resolve(name, graph, args.by)), **summary(stats)}
+            for name, stats in rows
+        ]
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{args.by:<32} {'requests':>9} {'5xx':>6} {'p50':>7} {'p95':>7} {'p99':>7} "
+        f"{'p50 size':>9} {'p99 size':>9}  defined by"
+    )
+    for name, stats in rows:
+        latency = [_value(stats.latency.quantile(q), "ms") for q in (0.5, 0.95, 0.99)]
+        size = [_value(stats.size.quantile(q), "B") for q in (0.5, 0.99)]
+        print(
+            f"{name:<32} {stats.latency.count:>9} {stats.server_errors:>6} "
+            f"{latency[0]:>7} {latency[1]:>7} {latency[2]:>7} {size[0]:>9} {size[1]:>9}  "
+            f"{resolve(name, graph, args.by)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 """Ensure docker-compose files define infrastructure networks as external."""
 
+import argparse
 import logging
 import sys
 from pathlib import Path
-from typing import Any
 
-import yaml
+from compose_lib.discovery import discover_compose_files
+from compose_lib.document import ComposeDocument, DocumentStore, document_diff, write_document
+from compose_lib.engine import RuleEngine
+from compose_lib.infrastructure import infrastructure_networks
+from compose_lib.rules import EXTERNAL_NETWORKS_FIXER
+from compose_lib.yaml_backend import YAML_BACKEND
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,110 +19,107 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-INFRASTRUCTURE_NETWORKS = {"proxy", "media_int", "vpn_net"}
 
+def _build_engine() -> RuleEngine:
+    return RuleEngine(rules=(), fixers=[EXTERNAL_NETWORKS_FIXER])
 
-def get_networks_used_by_services(content: dict[str, Any]) -> set[str]:
-    """Extract all network names used by services in the compose file."""
-    networks_used = set()
-    services = content.get("services", {})
 
-    if isinstance(services, dict):
-        for service_config in services.values():
-            if isinstance(service_config, dict):
-                service_networks = service_config.get("networks", {})
-                if isinstance(service_networks, list):
-                    networks_used.update(service_networks)
-                elif isinstance(service_networks, dict):
-                    networks_used.update(service_networks.keys())
+def update_networks_in_file(
+    filepath: Path,
+    store: DocumentStore | None = None,
+    engine: RuleEngine | None = None,
+    write: bool = True,
+) -> bool:
+    """Ensure infrastructure networks are defined as external in compose file.
 
-    return networks_used
+    With ``write=False`` the change is only applied to the stored document.
+    """
+    document = (store if store is not None else DocumentStore()).load(filepath)
 
-
-def update_networks_in_file(filepath: Path) -> bool:
-    """Ensure infrastructure networks are defined as external in compose file."""
-    try:
-        with open(filepath) as f:
-            content: dict[str, Any] = yaml.safe_load(f)
-    except yaml.YAMLError as e:
-        logger.error("YAML parsing error in %s: %s", filepath, e)
+    if document.error is not None:
+        logger.error("%s in %s", document.error, filepath)
         return False
 
-    if not content:
+    if not document.content:
         return True
 
-    updated = False
-
-    networks_used = get_networks_used_by_services(content)
-    infrastructure_networks_used = networks_used.intersection(INFRASTRUCTURE_NETWORKS)
-
-    if not infrastructure_networks_used:
+    if not (engine or _build_engine()).fix(document) or not write:
         return True
 
-    if "networks" not in content:
-        content["networks"] = {}
-        updated = True
-
-    root_networks = content.get("networks", {})
-    if not isinstance(root_networks, dict):
-        root_networks = {}
-        content["networks"] = root_networks
-        updated = True
-
-    for network_name in infrastructure_networks_used:
-        if network_name not in root_networks:
-            root_networks[network_name] = {"external": True}
-            updated = True
-            logger.info("Added external network '%s' to %s", network_name, filepath)
-        elif (
-            not root_networks[network_name]
-            or root_networks[network_name].get("external") is not True
-        ):
-            root_networks[network_name] = {"external": True}
-            updated = True
-            logger.info("Updated network '%s' to external in %s", network_name, filepath)
-
-    if updated:
-        try:
-            with open(filepath, "w") as f:
-                yaml.dump(
-                    content,
-                    f,
-                    default_flow_style=False,
-                    sort_keys=False,
-                    allow_unicode=True,
-                    width=120,
-                )
+    try:
+        if write_document(document):
             logger.info("Updated: %s", filepath)
-            return True
-        except Exception as e:
-            logger.error("Failed to write %s: %s", filepath, e)
-            return False
+        return True
+    except OSError as e:
+        logger.error("Failed to write %s: %s", filepath, e)
+        return False
+
 
-    return True
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="do not write anything, list the files that would change and exit 1 if any",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="like --check, but print the changes as a unified diff",
+    )
+    return parser.parse_args(argv)
 
 
 def main() -> None:
     """Main entry point."""
-    compose_files = list(Path(".").rglob("docker-compose.yml"))
+    args = parse_args()
+    compose_files = discover_compose_files()
     compose_files = [f for f in compose_files if "infrastructure" not in str(f)]
 
     if not compose_files:
-        logger.info("No docker-compose.yml files found.")
+        logger.info("No compose files found.")
         sys.exit(0)
 
-    logger.info("Found %d docker-compose.yml files to update", len(compose_files))
+    logger.info("Found %d compose files to update", len(compose_files))
+    logger.info("YAML backend: %s", YAML_BACKEND)
+    logger.info("Infrastructure networks: %s", ", ".join(sorted(infrastructure_networks())))
 
-    updated_count = 0
+    store = DocumentStore()
+    engine = _build_engine()
+    pending: list[ComposeDocument] = []
     failed_count = 0
 
+    # Every change is computed in memory first: an error or Ctrl-C leaves all files untouched.
     for filepath in compose_files:
-        if update_networks_in_file(filepath):
-            updated_count += 1
-        else:
+        if not update_networks_in_file(filepath, store, engine, write=False):
+            failed_count += 1
+        elif store.load(filepath).modified:
+            pending.append(store.load(filepath))
+
+    if args.check or args.diff:
+        for document in pending:
+            if args.diff:
+                sys.stdout.write(document_diff(document))
+            else:
+                logger.info("Would update: %s", document.path)
+        logger.info("Would update: %d, Failed: %d", len(pending), failed_count)
+        sys.exit(1 if pending or failed_count else 0)
+
+    updated_count = 0
+    for document in pending:
+        try:
+            if write_document(document):
+                logger.info("Updated: %s", document.path)
+                updated_count += 1
+        except OSError as e:
+            logger.error("Failed to write %s: %s", document.path, e)
             failed_count += 1
 
-    logger.info("Updated: %d, Failed: %d", updated_count, failed_count)
+    unchanged_count = len(compose_files) - updated_count - failed_count
+    logger.info(
+        "Updated: %d, Unchanged: %d, Failed: %d", updated_count, unchanged_count, failed_count
+    )
 
     if failed_count > 0:
         sys.exit(1)
@@ -1,12 +1,45 @@
 #!/usr/bin/env python3
 """Comprehensive validation of all Docker Compose files."""
 
+import argparse
+import json
 import logging
+import os
+import subprocess
 import sys
+import time
+from collections.abc import Collection, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-from typing import Any
 
-import yaml
+from compose_lib.cache import (
+    DEFAULT_CACHE_FILE,
+    DEFAULT_MAX_ENTRIES,
+    JsonCache,
+    ResultCache,
+    content_key,
+    dependency_key,
+    rules_fingerprint,
+)
+from compose_lib.discovery import discover_compose_files
+from compose_lib.document import DocumentStore, parse_document
+from compose_lib.engine import FileResult, RuleEngine, with_positions
+from compose_lib.git_changes import affected_compose_files, changed_paths
+from compose_lib.index import build_index, conflict_findings
+from compose_lib.memory import (
+    BUDGET_ENV,
+    budget_findings,
+    build_memory_report,
+    memory_budget,
+    parse_size,
+)
+from compose_lib.output import FORMATS, make_reporter
+from compose_lib.profiling import DEFAULT_SLOWEST, Profiler
+from compose_lib.rules import ERROR, Finding
+from compose_lib.traefik import build_graph, collect_routes, graph_findings
+from compose_lib.watch import FileDelta, WatchSession, make_watcher
+from compose_lib.yaml_backend import YAML_BACKEND
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,265 +47,372 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-EXPECTED_ROOT_ORDER = ["services", "networks", "configs", "volumes", "secrets"]
-EXPECTED_SERVICE_ORDER = [
-    "extends",
-    "image",
-    "build",
-    "container_name",
-    "hostname",
-    "environment",
-    "env_file",
-    "networks",
-    "network_mode",
-    "ports",
-    "expose",
-    "volumes",
-    "devices",
-    "configs",
-    "healthcheck",
-    "labels",
-    "restart",
-    "depends_on",
-    "mem_limit",
-    "memswap_limit",
-    "shm_size",
-    "cap_add",
-    "cap_drop",
-    "security_opt",
-    "privileged",
-    "sysctls",
-    "extra_hosts",
-    "command",
-    "entrypoint",
-    "working_dir",
-    "user",
-    "group_add",
-    "ulimits",
-    "logging",
-    "deploy",
-    "profiles",
-]
-
-INFRASTRUCTURE_NETWORKS = {"proxy", "media_int", "vpn_net", "socket_proxy"}
-
-
-def check_root_keys_order(content: dict[str, Any]) -> list[str]:
-    """Check if root keys are in correct order with services first."""
-    errors: list[str] = []
-    root_keys = list(content.keys())
-
-    def get_root_index(key: str) -> int:
-        try:
-            return EXPECTED_ROOT_ORDER.index(key)
-        except ValueError:
-            return len(EXPECTED_ROOT_ORDER)
-
-    expected_order = sorted(root_keys, key=get_root_index)
-
-    if root_keys != expected_order:
-        errors.append(f"Root keys order incorrect: {root_keys} should be {expected_order}")
-
-    if root_keys[0] != "services":
-        errors.append(f"First root key should be 'services', got '{root_keys[0]}'")
-
-    return errors
-
-
-def check_service_keys_order(service_name: str, service_config: dict[str, Any]) -> list[str]:
-    """Check if service keys are in correct order."""
-    errors: list[str] = []
-    if not isinstance(service_config, dict):
-        return errors
-
-    keys = list(service_config.keys())
-
-    def get_key_index(key: str) -> int:
-        try:
-            return EXPECTED_SERVICE_ORDER.index(key)
-        except ValueError:
-            return len(EXPECTED_SERVICE_ORDER)
-
-    expected_order = sorted(keys, key=get_key_index)
-
-    for actual, expected in zip(keys, expected_order, strict=False):
-        if actual != expected:
-            errors.append(
-                f"Service '{service_name}': key '{actual}' should come after '{expected}'"
-            )
-            break
-
-    return errors
-
-
-def get_networks_used_by_services(content: dict[str, Any]) -> set[str]:
-    """Extract all network names used by services in the compose file."""
-    networks_used: set[str] = set()
-    services = content.get("services", {})
-
-    if isinstance(services, dict):
-        for service_config in services.values():
-            if isinstance(service_config, dict):
-                service_networks = service_config.get("networks", {})
-                if isinstance(service_networks, list):
-                    networks_used.update(service_networks)
-                elif isinstance(service_networks, dict):
-                    networks_used.update(service_networks.keys())
-
-    return networks_used
-
-
-def check_networks_usage(content: dict[str, Any], filepath: Path) -> list[str]:
-    """Check networks usage - infrastructure networks must be defined as external."""
-    errors: list[str] = []
-
-    # Skip infrastructure file - it's supposed to define networks
-    is_infrastructure = "infrastructure" in str(filepath)
-
-    if is_infrastructure:
-        return errors
-
-    networks_used = get_networks_used_by_services(content)
-    infrastructure_networks_used = networks_used.intersection(INFRASTRUCTURE_NETWORKS)
-
-    # Check that infrastructure networks are properly defined as external
-    root_networks = content.get("networks", {})
-    if not isinstance(root_networks, dict):
-        root_networks = {}
-
-    for net_name in infrastructure_networks_used:
-        if net_name not in root_networks:
-            errors.append(
-                f"Network '{net_name}' is used by services but not defined at root level "
-                f"(must be defined with external: true)"
-            )
-        elif not root_networks[net_name] or root_networks[net_name].get("external") is not True:
-            errors.append(
-                f"Network '{net_name}' must be defined with external: true "
-                f"(managed by infrastructure stack)"
-            )
-
-    # Check for unknown networks in services
-    if "services" in content and isinstance(content["services"], dict):
-        for service_name, service_config in content["services"].items():
-            if isinstance(service_config, dict) and "networks" in service_config:
-                service_networks = service_config["networks"]
-                if isinstance(service_networks, dict):
-                    for net_name in service_networks:
-                        if net_name not in INFRASTRUCTURE_NETWORKS and net_name != "default":
-                            errors.append(
-                                f"Service '{service_name}' uses unknown network '{net_name}'"
-                            )
-
-    return errors
-
-
-def check_extends_usage(content: dict[str, Any], filepath: Path) -> tuple[list[str], list[str]]:
-    """Check if services use extends from common.yml."""
-    errors: list[str] = []
-    warnings: list[str] = []
-
-    if filepath.name == "infrastructure/docker-compose.yml" or "infrastructure" in str(filepath):
-        return errors, warnings
-
-    if "services" in content and isinstance(content["services"], dict):
-        for service_name, service_config in content["services"].items():
-            if isinstance(service_config, dict):
-                if "extends" not in service_config:
-                    warnings.append(
-                        f"Service '{service_name}' does not use extends (optional but recommended)"
-                    )
-                elif isinstance(service_config["extends"], dict):
-                    extends = service_config["extends"]
-                    if extends.get("file") != "../common.yml":
-                        file_val = extends.get("file")
-                        errors.append(f"Service '{service_name}' extends wrong file: {file_val}")
-                    if extends.get("service") != "common-config":
-                        svc_val = extends.get("service")
-                        errors.append(f"Service '{service_name}' extends wrong service: {svc_val}")
-
-    return errors, warnings
-
-
-def validate_file(filepath: Path) -> tuple[list[str], list[str]]:
+# Index, Traefik labels, memory limits and finding positions share the stack cache.
+STACK_CACHE_KINDS = 4
+
+
+def check_file(
+    filepath: Path,
+    store: DocumentStore,
+    engine: RuleEngine,
+    cache: ResultCache | None = None,
+) -> FileResult:
+    """Run all rules on a file, reusing cached findings when its content is unchanged."""
+    profiler = engine.profiler
+    if not profiler.enabled:
+        return _check_file(filepath, store, engine, cache)
+
+    start = time.perf_counter()
+    result = _check_file(filepath, store, engine, cache)
+    profiler.add_file(filepath, time.perf_counter() - start)
+    return result
+
+
+def _check_file(
+    filepath: Path, store: DocumentStore, engine: RuleEngine, cache: ResultCache | None
+) -> FileResult:
+    profiler = engine.profiler
+    if cache is None:
+        with profiler.phase("parse"):
+            document = store.load(filepath)
+        return engine.check(document)
+
+    with profiler.phase("cache"):
+        data = filepath.read_bytes()
+        key = dependency_key(filepath, data, cache)
+        findings = cache.get(key)
+    if findings is not None:
+        return FileResult(filepath, findings)
+
+    with profiler.phase("parse"):
+        document = store.load(filepath, data.decode())
+    result = engine.check(document)
+    cache.put(key, result.findings)
+    return result
+
+
+def validate_file(
+    filepath: Path,
+    store: DocumentStore | None = None,
+    engine: RuleEngine | None = None,
+    cache: ResultCache | None = None,
+) -> tuple[list[str], list[str]]:
     """Validate a single Docker Compose file. Returns (errors, warnings)."""
-    errors: list[str] = []
-    warnings: list[str] = []
-
+    result = check_file(
+        filepath,
+        store if store is not None else DocumentStore(),
+        engine or RuleEngine(),
+        cache,
+    )
+    return result.errors, result.warnings
+
+
+def _check_source(filepath: Path, text: str) -> FileResult:
+    """Process pool worker: parse and check one file from its contents."""
+    return RuleEngine().check(parse_document(filepath, text))
+
+
+def iter_results(
+    compose_files: list[Path],
+    cache: ResultCache | None = None,
+    jobs: int = 1,
+    store: DocumentStore | None = None,
+    profiler: Profiler | None = None,
+) -> Iterator[FileResult]:
+    """Yield one result per file, in the order of ``compose_files``.
+
+    With ``jobs > 1`` cache misses are parsed and checked in a process pool;
+    cache lookups and updates stay in this process.
+    """
+    if jobs <= 1:
+        store = store if store is not None else DocumentStore()
+        engine = RuleEngine(profiler=profiler)
+        for filepath in compose_files:
+            yield check_file(filepath, store, engine, cache)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: list[tuple[str | None, FileResult | Future[FileResult]]] = []
+        for filepath in compose_files:
+            data = filepath.read_bytes()
+            key = dependency_key(filepath, data, cache) if cache is not None else None
+            findings = cache.get(key) if cache is not None and key is not None else None
+            if findings is not None:
+                pending.append((None, FileResult(filepath, findings)))
+            else:
+                pending.append((key, pool.submit(_check_source, filepath, data.decode())))
+
+        for key, item in pending:
+            result = item if isinstance(item, FileResult) else item.result()
+            if cache is not None and key is not None:
+                cache.put(key, result.findings)
+            yield result
+
+
+def cross_stack_findings(
+    compose_files: list[Path],
+    store: DocumentStore,
+    stack_cache: JsonCache | None = None,
+    profiler: Profiler | None = None,
+    budget: int | None = None,
+    reported: Collection[Path] | None = None,
+) -> dict[Path, list[Finding]]:
+    """Find resources claimed by several stacks, broken Traefik routes and memory overcommit.
+
+    What each file contributes is cached by content in ``stack_cache``, so
+    only changed files are parsed. The memory check only runs with a host
+    ``budget`` in bytes. Findings are kept for the ``reported`` files only,
+    all of them by default, except an over-budget error, which concerns the
+    whole run.
+    """
+    profiler = profiler or Profiler()
+    findings: dict[Path, list[Finding]] = {}
+    with profiler.phase("conflicts"):
+        conflicts = conflict_findings(build_index(compose_files, store, stack_cache))
+    with profiler.phase("traefik"):
+        routes = graph_findings(build_graph(collect_routes(compose_files, store, stack_cache)))
+    memory: dict[Path, list[Finding]] = {}
+    if budget is not None:
+        with profiler.phase("memory"):
+            report = build_memory_report(compose_files, store, stack_cache)
+            memory = budget_findings(report, budget)
+    for extra in (conflicts, routes, memory):
+        for path, found in extra.items():
+            if reported is not None and path not in reported:
+                # The whole run is over budget, whichever files it validates.
+                found = [f for f in found if f.rule_id == "memory" and f.severity == ERROR]
+            if found:
+                findings.setdefault(path, []).extend(found)
+    with profiler.phase("positions"):
+        return {path: _located(path, found, store, stack_cache) for path, found in findings.items()}
+
+
+def _located(
+    path: Path, findings: list[Finding], store: DocumentStore, cache: JsonCache | None
+) -> list[Finding]:
+    """Fill in positions, parsing the file only for key paths not cached for its content."""
+    if cache is None:
+        return with_positions(store.load(path), findings)
+
+    data = path.read_bytes()
+    key = f"positions:{content_key(path, data)}"
+    known: dict[str, list[int | None]] = cache.get_value(key) or {}
+    missing = [f for f in findings if f.key_path and json.dumps(f.key_path) not in known]
+    if missing:
+        for finding in with_positions(store.load(path, data.decode()), missing):
+            known[json.dumps(finding.key_path)] = [finding.line, finding.column]
+        cache.put_value(key, known)
+
+    located = []
+    for finding in findings:
+        line, column = known.get(json.dumps(finding.key_path), [None, None])
+        located.append(replace(finding, line=line, column=column) if line is not None else finding)
+    return located
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore and do not update the on-disk result cache",
+    )
+    parser.add_argument(
+        "--cache-file",
+        type=Path,
+        default=DEFAULT_CACHE_FILE,
+        help=f"result cache location (default: {DEFAULT_CACHE_FILE})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes, 0 for one per CPU (default: 1)",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REF",
+        help="only validate stacks affected by changes since REF (e.g. origin/main)",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="only validate stacks affected by changes staged in the git index",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        help="output format: human text, one JSON object per finding, or SARIF 2.1.0 "
+        "(default: text)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="table",
+        choices=("table", "json"),
+        help="print time spent per phase, per rule and on the slowest files to stderr, "
+        "as a table (default) or JSON",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_SLOWEST,
+        metavar="N",
+        help=f"number of slowest files to list with --profile (default: {DEFAULT_SLOWEST})",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        metavar="SIZE",
+        help="fail when the services' memory limits add up to more than SIZE (e.g. 16G), "
+        f"and warn about services without a limit (default: ${BUDGET_ENV})",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and revalidate files and their dependents when they change",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="with --watch, poll file stats instead of using inotify",
+    )
+    args = parser.parse_args(argv)
     try:
-        with open(filepath) as f:
-            content: dict[str, Any] = yaml.safe_load(f)
-    except yaml.YAMLError as e:
-        return [f"YAML parsing error: {e}"], []
+        args.memory_budget = (
+            memory_budget() if args.memory_budget is None else _budget(args.memory_budget)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def _budget(value: str) -> int:
+    budget = parse_size(value)
+    if budget is None:
+        raise ValueError(f"--memory-budget {value} is not a size (e.g. 16G)")
+    return budget
+
+
+def print_delta(delta: FileDelta) -> None:
+    """Print the findings that appeared (+) or were resolved (-) in a file."""
+    print(f"\n{delta.path} (+{len(delta.added)} -{len(delta.resolved)})")
+    for finding in delta.added:
+        print(f"  + {finding.severity.upper()}: {finding.message}")
+    for finding in delta.resolved:
+        print(f"  - {finding.severity.upper()}: {finding.message}")
+
+
+def watch(poll: bool = False) -> None:
+    """Validate everything once, then report finding changes as files are saved."""
+    session = WatchSession(discover_compose_files)
+    for delta in session.check_all():
+        if delta.added:
+            print_delta(delta)
+
+    watcher = make_watcher(
+        Path("."), discover_compose_files, [Path("common.yml")], force_polling=poll
+    )
+    logger.info(
+        "Watching %d compose files with %s (Ctrl-C to stop)",
+        len(session.files),
+        type(watcher).__name__,
+    )
 
-    if not content:
-        return [], ["Empty file"]
-
-    # Check root keys order
-    root_errors = check_root_keys_order(content)
-    errors.extend(root_errors)
-
-    # Check services order
-    if "services" in content and isinstance(content["services"], dict):
-        for service_name, service_config in content["services"].items():
-            service_errors = check_service_keys_order(service_name, service_config)
-            errors.extend(service_errors)
+    try:
+        while True:
+            changed = watcher.wait()
+            start = time.perf_counter()
+            deltas = session.update(changed)
+            if not session.last_checked:
+                continue
+            for delta in deltas:
+                print_delta(delta)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(
+                f"[{time.strftime('%H:%M:%S')}] revalidated {session.last_checked} file(s) "
+                f"in {elapsed:.1f} ms"
+            )
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
-    # Check networks usage
-    network_errors = check_networks_usage(content, filepath)
-    errors.extend(network_errors)
 
-    # Check extends usage
-    extends_errors, extends_warnings = check_extends_usage(content, filepath)
-    errors.extend(extends_errors)
-    warnings.extend(extends_warnings)
+def main() -> None:
+    """Main entry point."""
+    args = parse_args()
+    if args.watch:
+        watch(args.poll)
+        return
 
-    return errors, warnings
+    profiler = Profiler(args.profile is not None, args.profile_top)
+    with profiler.phase("discovery"):
+        all_files = compose_files = discover_compose_files()
 
+    store = DocumentStore()
+    if args.since is not None or args.staged:
+        try:
+            with profiler.phase("git"):
+                changed = changed_paths(since=args.since, staged=args.staged)
+                compose_files = affected_compose_files(compose_files, changed, store)
+        except subprocess.CalledProcessError as e:
+            logger.error("git failed: %s", e.stderr.strip() if e.stderr else e)
+            sys.exit(1)
+
+    logger.info("YAML backend: %s", YAML_BACKEND)
+    logger.info("Validating %d compose files\n", len(compose_files))
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    if profiler.enabled and jobs > 1:
+        logger.warning("--profile only sees this process, running with --jobs 1")
+        jobs = 1
+
+    cache = stack_cache = None
+    if not args.no_cache:
+        with profiler.phase("cache"):
+            fingerprint = rules_fingerprint(Path(__file__).resolve(), Path("common.yml"))
+            cache = ResultCache(args.cache_file, fingerprint)
+            # Holds what every file contributes to the index, Traefik graph and memory total.
+            stack_cache = JsonCache(
+                args.cache_file.with_name("stacks.json"),
+                fingerprint,
+                max_entries=STACK_CACHE_KINDS * DEFAULT_MAX_ENTRIES,
+            )
 
-def main() -> None:
-    """Main entry point."""
-    compose_files = sorted(Path(".").rglob("docker-compose.yml"))
-    compose_files = [f for f in compose_files if ".venv" not in str(f)]
-
-    logger.info("Validating %d docker-compose.yml files\n", len(compose_files))
-
-    total_errors = 0
-    total_warnings = 0
-    files_with_issues: list[str] = []
-
-    for filepath in compose_files:
-        file_errors, file_warnings = validate_file(filepath)
-
-        if file_errors or file_warnings:
-            rel_path = filepath.relative_to(Path("."))
-            print(f"\n{rel_path}")
-
-            for error in file_errors:
-                print(f"  ERROR: {error}")
-                total_errors += 1
-
-            for warning in file_warnings:
-                print(f"  WARNING: {warning}")
-                total_warnings += 1
-
-            files_with_issues.append(str(rel_path))
-
-    print(f"\n{'=' * 60}")
-    print("SUMMARY:")
-    print(f"  Files checked: {len(compose_files)}")
-    print(f"  Files with issues: {len(files_with_issues)}")
-    print(f"  Total errors: {total_errors}")
-    print(f"  Total warnings: {total_warnings}")
-
-    if total_errors > 0:
-        print("\nFiles with errors:")
-        for f in files_with_issues:
-            print(f"  - {f}")
-        sys.exit(1)
-    else:
-        print("\nAll files passed validation!")
-        sys.exit(0)
+    # Conflicts, Traefik routes and the memory total involve other stacks, so
+    # they are computed over every file, from per-file extractions cached apart.
+    conflicts = cross_stack_findings(
+        all_files, store, stack_cache, profiler, args.memory_budget, set(compose_files)
+    )
+
+    rule_ids = [rule.rule_id for rule in RuleEngine().rules] + ["conflicts", "traefik", "memory"]
+    reporter = make_reporter(args.format, sys.stdout, rule_ids)
+    reporter.start()
+    for result in iter_results(compose_files, cache, jobs, store, profiler):
+        extra = conflicts.get(result.path, [])
+        with profiler.phase("output"):
+            reporter.report(FileResult(result.path, result.findings + extra) if extra else result)
+    # An over-budget error found in a file this run does not validate.
+    for path in sorted(set(conflicts) - set(compose_files)):
+        with profiler.phase("output"):
+            reporter.report(FileResult(path, conflicts[path]))
+
+    with profiler.phase("cache"):
+        if stack_cache is not None:
+            stack_cache.save()
+        if cache is not None:
+            cache.save()
+            logger.debug("Result cache: %d hits, %d misses", cache.hits, cache.misses)
+
+    with profiler.phase("output"):
+        reporter.finish(len(compose_files))
+    if profiler.enabled:
+        print(profiler.render(args.profile), file=sys.stderr)
+    sys.exit(1 if reporter.total_errors > 0 else 0)
 
 
 if __name__ == "__main__":
@@ -1,26 +1,27 @@
 #!/usr/bin/env bash
 set -e
 
-export DOMAIN=example.com
-export MEDIA=/tmp/media
-export PUID=1000
-export PGID=1000
-export TZ=Europe/Paris
-export CF_API_EMAIL=email@example.com
-export CF_DNS_API_TOKEN=token123
-export TRAEFIK_DASHBOARD_CREDENTIALS=admin:$$apr1$$H6uskkkW$$IgXLP6ewTrSuBkTrqE8wj/
+script_dir="$(cd "$(dirname "$0")" && pwd)"
 
-for f in "$@"; do
-    echo "Validating $f..."
+# Placeholder host environment, also read by the Python resolver.
+set -a
+# shellcheck source=placeholder.env
+. "$script_dir/placeholder.env"
+set +a
 
-    if [ "$f" = "komodo/docker-compose.yml" ]; then
-        echo "Skipping $f (empty file)"
-        continue
-    fi
+if command -v uv > /dev/null 2>&1; then
+    python=(uv run python)
+else
+    python=(python3)
+fi
 
-    if docker compose -f "$f" config > /dev/null 2>&1; then
-        echo "OK: $f"
-    else
-        echo "WARNING: $f failed validation (missing .env or other issue)"
-    fi
-done
+# Interpolation, extends and schema checks for every file in one process.
+args=()
+if [ "${VALIDATE_WITH_DOCKER:-0}" = "1" ]; then
+    # Slow: also fork `docker compose config` once per file.
+    args+=(--docker)
+fi
+
+if [ "$#" -gt 0 ]; then
+    "${python[@]}" "$script_dir/resolve_compose.py" "${args[@]}" "$@"
+fi
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""Remédiation appelée par le webhook autoheal lorsqu'un conteneur est unhealthy.
+
+Pour chaque service surveillé réellement unhealthy, on régénère son .env via
+Infisical puis on recrée sa stack. Les stacks indépendantes sont traitées en
+parallèle (au plus AUTOHEAL_PARALLELISM à la fois), la santé de Gluetun est
+suivie via le flux d'événements Docker et réveille d'un coup tous les services
+qui passent par le VPN, et un seul jeton Infisical est partagé, mis en cache
+jusqu'à son expiration.
+"""
+
+import base64
+import fcntl
+import http.client
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(message)s",
+    datefmt="%H:%M:%S",
+    stream=sys.stdout,
+)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(os.environ.get("AUTOHEAL_BASE_DIR", "/etc/komodo/repos/fight-club"))
+STATE_DIR = Path(os.environ.get("AUTOHEAL_STATE_DIR", "/tmp/autoheal"))
+GLUETUN_CONTAINER = "gluetun"
+INFISICAL_CONTAINER = "infisical-backend"
+# API Docker écoutée pour les événements de santé, p. ex. tcp://socket-proxy:2375.
+EVENTS_HOST = os.environ.get(
+    "AUTOHEAL_EVENTS_HOST", os.environ.get("DOCKER_HOST", "unix:///var/run/docker.sock")
+)
+
+# Service -> dépend de Gluetun (son réseau passe par le VPN).
+SERVICES = {
+    "qbittorrent": True,
+    "nicotine": True,
+    "znc": True,
+}
+
+MAX_PARALLEL = int(os.environ.get("AUTOHEAL_PARALLELISM", "3"))
+HEALTH_TIMEOUT_SECONDS = 300
+# Intervalle d'interrogation quand le flux d'événements est indisponible.
+POLL_SECONDS = 5
+# Durée de vie supposée d'un jeton dont on ne peut pas lire l'expiration.
+DEFAULT_TOKEN_TTL = int(os.environ.get("INF_TOKEN_TTL", "600"))
+# On renouvelle le jeton un peu avant son expiration.
+TOKEN_MARGIN_SECONDS = 60
+
+STOPPED_STATUSES = {"exited", "dead", "removing", "paused"}
+# Événements de cycle de vie suivis, et le statut qu'ils donnent au conteneur.
+EVENT_STATUSES = {"start": "starting", "die": "exited", "stop": "exited", "destroy": "removing"}
+
+
+class RemediationError(Exception):
+    """Un service n'a pas pu être remis en état."""
+
+
+def docker(*args: str, cwd: Path | None = None) -> str:
+    """Lance une commande docker et renvoie sa sortie standard.
+
+    Raises:
+        RemediationError: si la commande échoue.
+    """
+    result = subprocess.run(["docker", *args], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RemediationError(f"docker {args[0]} a échoué: {result.stderr.strip()}")
+    return result.stdout
+
+
+def get_status(container: str) -> str:
+    """Statut de santé d'un conteneur, ou son état s'il n'a pas de healthcheck."""
+    try:
+        return docker(
+            "inspect",
+            "-f",
+            "{{if .State.Health}}{{.State.Health.Status}}{{else}}{{.State.Status}}{{end}}",
+            container,
+        ).strip()
+    except RemediationError:
+        return "unknown"
+
+
+def write_private(path: Path, data: str) -> None:
+    """Remplace un fichier de façon atomique, lisible par son seul propriétaire."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+# --- Santé des conteneurs -----------------------------------------------------
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """Connexion HTTP à l'API Docker via sa socket Unix."""
+
+    def __init__(self, path: str, timeout: float | None = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def docker_api(timeout: float | None = 10) -> http.client.HTTPConnection:
+    """Connexion à l'API Docker de EVENTS_HOST (socket Unix ou tcp://hôte:port).
+
+    Raises:
+        RemediationError: si l'adresse n'est pas reconnue.
+    """
+    if EVENTS_HOST.startswith("unix://"):
+        return _UnixHTTPConnection(EVENTS_HOST.removeprefix("unix://"), timeout)
+    if EVENTS_HOST.startswith(("tcp://", "http://")):
+        address = urllib.parse.urlsplit(EVENTS_HOST)
+        return http.client.HTTPConnection(address.hostname or "", address.port or 2375, timeout)
+    raise RemediationError(f"Adresse Docker non supportée: {EVENTS_HOST}")
+
+
+def _api_status(container: str) -> str:
+    """Statut d'un conteneur lu une seule fois via l'API, comme get_status."""
+    connection = docker_api()
+    try:
+        connection.request("GET", f"/containers/{urllib.parse.quote(container)}/json")
+        response = connection.getresponse()
+        body = response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        return "unknown"
+    state = json.loads(body).get("State") or {}
+    health = state.get("Health") or {}
+    return str(health.get("Status") or state.get("Status") or "unknown")
+
+
+def _event_status(event: dict[str, Any]) -> str | None:
+    """Statut qu'un événement Docker donne au conteneur."""
+    action = str(event.get("Action") or event.get("status") or "")
+    if action.startswith("health_status:"):
+        return action.partition(":")[2].strip()
+    return EVENT_STATUSES.get(action)
+
+
+class HealthWatcher:
+    """Santé de conteneurs suivie via le flux d'événements Docker.
+
+    Un seul abonnement à /events est ouvert pour tous les conteneurs suivis;
+    chaque conteneur n'est inspecté qu'une fois, après l'abonnement pour ne
+    rater aucune transition, puis tous ceux qui l'attendent sont réveillés
+    dès qu'un événement health_status le rend healthy. Si l'API n'est pas
+    joignable, on revient à l'interrogation périodique avec docker inspect.
+    """
+
+    def __init__(self, containers: Iterable[str]) -> None:
+        self.containers = sorted(set(containers))
+        self._condition = threading.Condition()
+        self._status: dict[str, str] = {}
+        self._subscribed = False
+        self._stream_error: str | None = None
+
+    def wait_healthy(self, container: str, timeout: float = HEALTH_TIMEOUT_SECONDS) -> None:
+        """Bloque jusqu'à ce qu'un conteneur suivi soit healthy.
+
+        Raises:
+            RemediationError: si le conteneur est arrêté ou pas healthy à temps.
+        """
+        deadline = time.monotonic() + timeout
+        logger.info("Vérification de l'état de %s...", container)
+        if not self._wait_events(container, deadline):
+            self._poll(container, deadline)
+        logger.info("✅ %s est healthy.", container)
+
+    def _wait_events(self, container: str, deadline: float) -> bool:
+        """Attend via le flux; False si le flux est indisponible ou interrompu."""
+        with self._condition:
+            if not self._subscribed and self._stream_error is None:
+                self._subscribe()
+            while self._stream_error is None:
+                status = self._status.get(container, "unknown")
+                if status == "healthy":
+                    return True
+                self._check(container, status, deadline)
+                logger.info("En attente que %s devienne healthy (statut: %s)", container, status)
+                self._condition.wait(deadline - time.monotonic())
+            return False
+
+    def _check(self, container: str, status: str, deadline: float) -> None:
+        if status in STOPPED_STATUSES:
+            raise RemediationError(f"{container} n'est pas en cours d'exécution (statut: {status})")
+        if time.monotonic() >= deadline:
+            raise RemediationError(
+                f"{container} n'est pas healthy à temps (dernier statut: {status})"
+            )
+
+    def _subscribe(self) -> None:
+        filters = json.dumps(
+            {
+                "type": ["container"],
+                "container": self.containers,
+                "event": ["health_status", *EVENT_STATUSES],
+            }
+        )
+        try:
+            # Pas de timeout de lecture: le flux reste silencieux entre deux événements.
+            connection = docker_api(timeout=None)
+            connection.request("GET", "/events?filters=" + urllib.parse.quote(filters))
+            response = connection.getresponse()
+            if response.status != 200:
+                raise RemediationError(f"/events a répondu {response.status}")
+            for container in self.containers:
+                self._status[container] = _api_status(container)
+        except (OSError, http.client.HTTPException, ValueError, RemediationError) as e:
+            logger.warning(
+                "Flux d'événements Docker indisponible (%s), interrogation périodique", e
+            )
+            self._stream_error = str(e)
+            return
+
+        threading.Thread(target=self._read, args=(response,), daemon=True).start()
+        self._subscribed = True
+
+    def _read(self, response: http.client.HTTPResponse) -> None:
+        buffer = b""
+        error = "flux fermé"
+        try:
+            while chunk := response.read1(65536):
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        self._handle(json.loads(line))
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            error = str(e)
+        logger.warning("Flux d'événements Docker interrompu (%s), interrogation périodique", error)
+        with self._condition:
+            self._stream_error = error
+            self._condition.notify_all()
+
+    def _handle(self, event: dict[str, Any]) -> None:
+        name = str(((event.get("Actor") or {}).get("Attributes") or {}).get("name", ""))
+        status = _event_status(event)
+        if name in self.containers and status is not None:
+            with self._condition:
+                self._status[name] = status
+                self._condition.notify_all()
+
+    def _poll(self, container: str, deadline: float) -> None:
+        status = get_status(container)
+        while status != "healthy":
+            self._check(container, status, deadline)
+            logger.info("En attente que %s devienne healthy (statut: %s)", container, status)
+            time.sleep(POLL_SECONDS)
+            status = get_status(container)
+
+
+# --- Infisical ----------------------------------------------------------------
+
+
+def _token_expiry(token: str, now: float) -> float:
+    """Date d'expiration lue dans le jeton (JWT), ou la durée par défaut."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return now + DEFAULT_TOKEN_TTL
+
+
+class InfisicalToken:
+    """Jeton Infisical partagé par tous les services et entre les appels du webhook."""
+
+    def __init__(self, cache_file: Path = STATE_DIR / "infisical-token.json") -> None:
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._token: str | None = None
+        self._expires_at = 0.0
+
+    def get(self) -> str:
+        """Renvoie un jeton valide, en ne se connectant que si nécessaire.
+
+        Raises:
+            RemediationError: si la connexion à Infisical échoue.
+        """
+        with self._lock:
+            now = time.time()
+            if self._token is None or self._expires_at - TOKEN_MARGIN_SECONDS <= now:
+                self._load()
+            if self._token is None or self._expires_at - TOKEN_MARGIN_SECONDS <= now:
+                self._login(now)
+            assert self._token is not None
+            return self._token
+
+    def _load(self) -> None:
+        try:
+            cached = json.loads(self.cache_file.read_text())
+            self._token, self._expires_at = str(cached["token"]), float(cached["expires_at"])
+        except (OSError, KeyError, TypeError, ValueError):
+            pass
+
+    def _login(self, now: float) -> None:
+        logger.info("Connexion à Infisical...")
+        token = docker(
+            "exec",
+            INFISICAL_CONTAINER,
+            "infisical",
+            "login",
+            "--method=universal-auth",
+            f"--client-id={os.environ['INF_CLIENT_ID']}",
+            f"--client-secret={os.environ['INF_CLIENT_SECRET']}",
+            f"--domain={os.environ['INF_DOMAIN']}",
+            "--silent",
+            "--plain",
+        ).strip()
+        if not token:
+            raise RemediationError("infisical login n'a pas renvoyé de jeton")
+        self._token, self._expires_at = token, _token_expiry(token, now)
+        try:
+            write_private(
+                self.cache_file, json.dumps({"token": token, "expires_at": self._expires_at})
+            )
+        except OSError as e:
+            logger.warning("Impossible de mettre le jeton en cache: %s", e)
+
+
+# --- Remédiation --------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Stack:
+    """Une stack à recréer et les services surveillés qu'elle contient."""
+
+    directory: Path
+    services: tuple[str, ...]
+    needs_gluetun: bool
+
+
+@contextmanager
+def stack_lock(stack: Stack) -> Iterator[bool]:
+    """Verrou par stack entre appels concurrents du webhook; False si déjà pris."""
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(STATE_DIR / f"{stack.directory.name}.lock", "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+
+def export_env(service: str, directory: Path, token: InfisicalToken) -> None:
+    """Régénère le .env d'un service à partir d'Infisical."""
+    logger.info("Génération du fichier .env via Infisical pour %s...", service)
+    dotenv = docker(
+        "exec",
+        INFISICAL_CONTAINER,
+        "infisical",
+        "export",
+        "--format=dotenv",
+        f"--domain={os.environ['INF_DOMAIN']}",
+        f"--token={token.get()}",
+        f"--projectId={os.environ['INF_PROJECT_ID']}",
+        "--env=prod",
+        f"--path=/{service}",
+    )
+    # Un export raté ne doit pas laisser un .env vide ou tronqué.
+    write_private(directory / ".env", dotenv)
+
+
+def remediate(stack: Stack, token: InfisicalToken, health: HealthWatcher) -> None:
+    """Régénère les .env d'une stack puis la recrée.
+
+    Raises:
+        RemediationError: si une étape échoue.
+    """
+    with stack_lock(stack) as acquired:
+        if not acquired:
+            logger.info("%s est déjà en cours de traitement, on passe.", stack.directory.name)
+            return
+        if stack.needs_gluetun:
+            health.wait_healthy(GLUETUN_CONTAINER)
+        if not stack.directory.is_dir():
+            raise RemediationError(f"❌ Répertoire {stack.directory} non trouvé.")
+
+        for service in stack.services:
+            export_env(service, stack.directory, token)
+
+        logger.info("Re-création de la stack %s...", stack.directory.name)
+        docker("compose", "up", "-d", "--force-recreate", cwd=stack.directory)
+        logger.info("✅ %s a été recréé.", ", ".join(stack.services))
+
+
+def unhealthy_stacks(services: dict[str, bool]) -> list[Stack]:
+    """Regroupe par stack les services surveillés détectés comme unhealthy."""
+    by_directory: dict[Path, list[str]] = {}
+    for service in services:
+        status = get_status(service)
+        if status != "unhealthy":
+            logger.info(
+                "Saut de %s car il n'est pas détecté comme unhealthy (statut: %s).", service, status
+            )
+            continue
+        logger.info("Traitement de %s (statut: %s)...", service, status)
+        by_directory.setdefault(BASE_DIR / service, []).append(service)
+
+    return [
+        Stack(directory, tuple(names), any(services[name] for name in names))
+        for directory, names in by_directory.items()
+    ]
+
+
+def main() -> None:
+    """Point d'entrée: les services peuvent être passés en arguments."""
+    names = sys.argv[1:] or list(SERVICES)
+    services = {name: SERVICES.get(name, False) for name in names}
+
+    logger.info("--- Début du traitement Autoheal ---")
+    stacks = unhealthy_stacks(services)
+    token = InfisicalToken()
+    health = HealthWatcher([GLUETUN_CONTAINER])
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, MAX_PARALLEL)) as pool:
+        futures = {pool.submit(remediate, stack, token, health): stack for stack in stacks}
+        for future, stack in futures.items():
+            try:
+                future.result()
+            except (RemediationError, KeyError) as e:
+                logger.error("Échec pour %s: %s", stack.directory.name, e)
+                failed += 1
+
+    logger.info("--- Fin du traitement Autoheal ---")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()